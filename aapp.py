@@ -7,297 +7,242 @@ Installation Required:
 pip install streamlit pandas numpy yfinance requests beautifulsoup4 ta
 
 Run with:
-streamlit run rfactor_dashboard.py
+streamlit run aapp.py
 """
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 import time
-import yfinance as yf
+import threading
+import functools
 import requests
 from io import StringIO
 
-# ============================================================================
-# NSE F&O STOCK LIST (220+ STOCKS) - EXACT SYMBOLS
-# ============================================================================
-FNO_STOCKS = [
-    "360ONE", "AARTIIND", "ABB", "ABBOTINDIA", "ABCAPITAL", "ACC", "ADANIENSOL",
-    "ADANIENT", "ADANIGREEN", "ADANIPORTS", "ADANIPOWER", "ALKEM", "AMBERENTERP",
-    "AMBUJACEM", "ANGELONE", "APOLLOHOSP", "APOLLOTYRE", "ASHOKLEY", "ASIANPAINT",
-    "ASTRAL", "ATGL", "ATUL", "AUBANK", "AUROPHARMA", "AXISBANK", "BAJAJ-AUTO",
-    "BAJAJFINSV", "BAJFINANCE", "BALKRISIND", "BANDHANBNK", "BANKBARODA", "BATAINDIA",
-    "BEL", "BERGEPAINT", "BHARATFORG", "BHARTIARTL", "BHEL", "BIOCON", "BOSCHLTD",
-    "BPCL", "BRITANNIA", "BSE", "BSOFT", "CANBK", "CANFINHOME", "CHAMBLFERT",
-    "CHOLAFIN", "CIPLA", "COALINDIA", "COFORGE", "COLPAL", "CONCOR", "COROMANDEL",
-    "CROMPTON", "CUB", "CUMMINSIND", "CYIENT", "DABUR", "DALBHARAT", "DEEPAKNTR",
-    "DELHIVERY", "DIVISLAB", "DIXON", "DLF", "DMART", "DRREDDY", "EICHERMOT",
-    "ESCORTS", "EXIDEIND", "FEDERALBNK", "GAIL", "GLENMARK", "GMRAIRPORT", "GMRINFRA",
-    "GNFC", "GODREJCP", "GODREJPROP", "GRASIM", "GUJGASLTD", "HAL", "HAVELLS",
-    "HCLTECH", "HDFCAMC", "HDFCBANK", "HDFCLIFE", "HEROMOTOCO", "HINDALCO",
-    "HINDCOPPER", "HINDPETRO", "HINDUNILVR", "HINDZINC", "ICICIBANK", "ICICIGI",
-    "ICICIPRULI", "IDEA", "IDFCFIRSTB", "IEX", "IGL", "INDHOTEL", "INDIAMART",
-    "INDIANB", "INDIGO", "INDUSINDBK", "INDUSTOWER", "INFY", "IOC", "IPCALAB",
-    "IRB", "IRCTC", "IRFC", "ITC", "JINDALSTEL", "JIOFIN", "JKCEMENT", "JSL",
-    "JSWENERGY", "JSWSTEEL", "JUBLFOOD", "KAJARIACER", "KAYNES", "KEI", "KFINTECH",
-    "KOTAKBANK", "KPITTECH", "LALPATHLAB", "LAURUSLABS", "LICHSGFIN", "LICI",
-    "LTIM", "LT", "LTTS", "LUPIN", "M&M", "M&MFIN", "MANAPPURAM", "MARICO",
-    "MARUTI", "MAXHEALTH", "MCX", "METROPOLIS", "MFSL", "MGL", "MOTHERSON",
-    "MPHASIS", "MRF", "MUTHOOTFIN", "NATIONALUM", "NAUKRI", "NAVINFLUOR",
-    "NESTLEIND", "NHPC", "NMDC", "NTPC", "OBEROIRLTY", "OFSS", "OIL", "ONGC",
-    "PAGEIND", "PAYTM", "PEL", "PERSISTENT", "PETRONET", "PFC", "PGEL",
-    "PIDILITIND", "PIIND", "PNB", "POLICYBZR", "POLYCAB", "POWERGRID", "PRESTIGE",
-    "PVRINOX", "RAMCOCEM", "RBLBANK", "RECLTD", "RELIANCE", "SAIL", "SBICARD",
-    "SBILIFE", "SBIN", "SHREECEM", "SHRIRAMFIN", "SIEMENS", "SJVN", "SONACOMS",
-    "SONATSOFTW", "STARHEALTH", "SUNPHARMA", "SUNTV", "SYNGENE", "TATACHEM",
-    "TATACOMM", "TATACONSUM", "TATAELXSI", "TATAMOTORS", "TATAPOWER", "TATASTEEL",
-    "TCS", "TECHM", "TIINDIA", "TITAN", "TORNTPHARM", "TRENT", "TVSMOTOR",
-    "UBL", "ULTRACEMCO", "UNIONBANK", "UPL", "VBL", "VEDL", "VOLTAS", "WIPRO",
-    "YESBANK", "ZEEL", "ZOMATO", "ZYDUSLIFE"
-]
+from rfactor import fetcher
+from rfactor.universe import FNO_STOCKS, TOTAL_FNO_STOCKS, TEST_STOCKS
+from rfactor.fetcher import FETCH_WORKERS, format_failed
+from rfactor.calculator import SIGNAL_LABELS, DIRECTION_LABELS
+from rfactor.processing import process_stock_data, scan_symbols
+from rfactor.baseline import Baseline
+from rfactor.publish import PUBLISHER
+from rfactor.scheduler import PRIORITY_BUDGET, PriorityRefreshScheduler, RefreshScheduler
+from rfactor.intraday import IntradayEngine
+from rfactor.metrics import METRICS
+from rfactor.snapshots import SNAPSHOTS
+from rfactor.timeframes import TIMEFRAME_COLUMNS, TIMEFRAMES, scan_timeframes
+from rfactor.views import VIEWS, ScanView
+
+# Progressive rendering while a scan runs
+STREAM_RENDER_EVERY = 10     # Redraw after this many new results...
+STREAM_RENDER_INTERVAL = 1.0 # ...or after this many seconds
+
+# Sidebar fetch defaults - a fresh session looks for a shared scan made with them
+DEFAULT_SCAN_ARGS = {'bulk': True, 'chunk_size': 50, 'max_workers': FETCH_WORKERS}
 
-# Total stocks in F&O
-TOTAL_FNO_STOCKS = len(FNO_STOCKS)  # 220 stocks
+# Background auto-refresh
+SNAPSHOT_POLL_INTERVAL = 5   # Seconds between checks for a newer snapshot
+
+# Streamlit 1.50+ builds the download data on click when given a callable
+DEFERRED_DOWNLOADS = tuple(int(part) for part in st.__version__.split('.')[:2]) >= (1, 50)
 
 # ============================================================================
-# LIVE DATA FETCHER - REAL NSE DATA
+# LIVE DATA FETCHER - STREAMLIT CACHING
 # ============================================================================
 
-class LiveDataFetcher:
-    """Fetch real-time data from NSE via yfinance"""
+# Set inside the cached function - it only runs on a cache miss
+_cache_miss = threading.local()
+
+class LiveDataFetcher(fetcher.LiveDataFetcher):
+    """Fetch real-time data from NSE via yfinance (single lookups cached per app)"""
     
     @staticmethod
-    @st.cache_data(ttl=60)  # Cache for 60 seconds
     def fetch_stock_data(symbol):
         """
         Fetch live data for a single stock from NSE via yfinance
         Returns: dict with price, volume, ATR data
         """
-        try:
-            # All NSE symbols need .NS suffix
-            ticker_symbol = f"{symbol}.NS"
-            ticker = yf.Ticker(ticker_symbol)
-            
-            # Get historical data (1 month for ATR calculation)
-            hist = ticker.history(period="1mo")
-            
-            if hist.empty or len(hist) < 14:
-                # Not enough data
-                return None
-            
-            # Current price and previous close
-            current_price = hist['Close'].iloc[-1]
-            prev_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
-            
-            # Calculate ATR (14-period)
-            atr = LiveDataFetcher.calculate_atr(
-                hist['High'].values,
-                hist['Low'].values,
-                hist['Close'].values
-            )
-            
-            # Volume data
-            current_volume = hist['Volume'].iloc[-1]
-            avg_volume = hist['Volume'].rolling(window=20).mean().iloc[-1]
-            
-            # Check if data is valid
-            if np.isnan(current_price) or np.isnan(prev_close) or current_price == 0:
-                return None
-            
-            return {
-                'symbol': symbol,
-                'current_price': float(current_price),
-                'prev_close': float(prev_close),
-                'atr': float(atr),
-                'current_volume': float(current_volume),
-                'avg_volume': float(avg_volume),
-                'success': True,
-                'timestamp': datetime.now()
-            }
-            
-        except Exception as e:
-            # Silent fail - will show in progress
-            return None
+        _cache_miss.flag = False
+        data = LiveDataFetcher._cached_stock_data(symbol)
+        METRICS.inc('rfactor_cache_total', layer='st_cache', result='miss' if _cache_miss.flag else 'hit')
+        return data
     
     @staticmethod
-    def calculate_atr(high, low, close, period=14):
-        """Calculate Average True Range"""
-        try:
-            tr_list = []
-            for i in range(1, len(high)):
-                tr = max(
-                    high[i] - low[i],
-                    abs(high[i] - close[i-1]),
-                    abs(low[i] - close[i-1])
-                )
-                tr_list.append(tr)
-            
-            if len(tr_list) >= period:
-                atr = np.mean(tr_list[-period:])
-            else:
-                atr = np.mean(tr_list) if tr_list else 0
-            
-            return atr
-        except:
-            return 0
+    @st.cache_data(ttl=60)  # Cache for 60 seconds
+    def _cached_stock_data(symbol):
+        _cache_miss.flag = True
+        return fetcher.LiveDataFetcher.fetch_stock_data(symbol)
     
     @staticmethod
-    def fetch_multiple_stocks(symbols, progress_bar=None):
-        """Fetch data for multiple stocks with progress tracking"""
-        results = []
-        failed_stocks = []
-        total = len(symbols)
-        
-        for idx, symbol in enumerate(symbols):
-            data = LiveDataFetcher.fetch_stock_data(symbol)
-            if data:
-                results.append(data)
-            else:
-                failed_stocks.append(symbol)
-            
-            # Update progress
-            if progress_bar:
-                progress_bar.progress((idx + 1) / total, 
-                                     text=f"Fetching {symbol}... ({idx+1}/{total}) | Success: {len(results)}")
-            
-            # Small delay to avoid rate limiting
-            time.sleep(0.1)
-        
-        # Show summary of failed stocks if any
-        if failed_stocks and progress_bar:
-            st.warning(f"⚠️ Could not fetch data for {len(failed_stocks)} stocks: {', '.join(failed_stocks[:10])}" + 
-                      (f" and {len(failed_stocks)-10} more..." if len(failed_stocks) > 10 else ""))
-        
-        return results
+    def _warn_failed(failed_stocks):
+        """Show summary of stocks that could not be fetched, grouped by reason"""
+        st.warning(format_failed(failed_stocks))
 
 # ============================================================================
-# R-FACTOR CALCULATION - METHOD 1 (YOUR FRIEND'S METHOD)
+# STREAMLIT DASHBOARD
 # ============================================================================
 
-class RFactorCalculator:
-    """High Accuracy R-Factor Calculator - Method 1"""
+def _poll_snapshots():
+    """Rerun the app once the background scheduler has published a newer snapshot"""
+    scheduler = st.session_state.get('scheduler')
+    snapshot = scheduler.latest() if scheduler is not None else None
+    if snapshot is not None and snapshot.version > st.session_state.get('snapshot_version', 0):
+        st.rerun()
+
+# Fragments rerun on their own timer without holding the script thread (streamlit >= 1.37)
+if hasattr(st, 'fragment'):
+    poll_snapshots = st.fragment(run_every=SNAPSHOT_POLL_INTERVAL)(_poll_snapshots)
+else:
+    poll_snapshots = None
+
+def render_top_signals(view):
+    """Render the Top 10 UPSIDE / DOWNSIDE panels of a ScanView, one markdown call per panel"""
+    col1, col2 = st.columns(2)
     
-    @staticmethod
-    def calculate_rfactor(current_price, prev_close, atr, current_volume, avg_volume):
-        """
-        Method 1: Your Friend's Accurate Method
-        R-Factor = |% Change| × K
-        """
-        try:
-            # Calculate % Change
-            pct_change = ((current_price - prev_close) / prev_close) * 100
-            
-            # Calculate ATR%
-            atr_pct = (atr / current_price) * 100
-            
-            # Calculate Volume Ratio
-            volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1.0
-            
-            # Calculate K Factor (Dynamic based on stock characteristics)
-            volume_boost = np.sqrt(volume_ratio)
-            base_score = 0.75
-            abs_change = abs(pct_change)
-            
-            if abs_change >= 5.0:
-                # High % change stocks (like TATAELXSI 7.98%)
-                k_factor = base_score + (volume_boost - 1) * 0.05
-            elif abs_change >= 2.5:
-                # Medium % change stocks (like SHRIRAMFIN 3.71%)
-                k_factor = base_score + (volume_boost - 1) * 0.25 + (atr_pct * 0.1)
-            else:
-                # Low % change stocks (like HDFCAMC -1.98%)
-                k_factor = 1.0 + (volume_boost - 1) * 0.5 + (atr_pct * 0.15)
-            
-            # Calculate R-Factor
-            rfactor = abs(pct_change) * k_factor
-            
-            # Determine direction and signal
-            direction = "UPSIDE ↑" if pct_change > 0 else "DOWNSIDE ↓"
-            signal = "🟢 ACTIVE" if rfactor >= 4.0 else "🟡 WAIT"
-            
-            return {
-                'rfactor': round(rfactor, 2),
-                'pct_change': round(pct_change, 2),
-                'atr_pct': round(atr_pct, 2),
-                'volume_ratio': round(volume_ratio, 2),
-                'k_factor': round(k_factor, 2),
-                'direction': direction,
-                'signal': signal,
-                'recommendation': RFactorCalculator._get_recommendation(rfactor, direction)
-            }
-            
-        except Exception as e:
-            return {
-                'rfactor': 0,
-                'pct_change': 0,
-                'atr_pct': 0,
-                'volume_ratio': 0,
-                'k_factor': 0,
-                'direction': 'N/A',
-                'signal': '⚫ ERROR',
-                'recommendation': str(e)
-            }
+    with col1:
+        st.markdown("**🟢 Top 10 UPSIDE Signals (CALL Options)**")
+        render_signal_panel(view.top('UPSIDE'), "No upside signals found")
     
-    @staticmethod
-    def _get_recommendation(rfactor, direction):
-        """Get trading recommendation"""
-        if rfactor >= 6.0:
-            action = "CALL" if "UPSIDE" in direction else "PUT"
-            return f"⭐⭐⭐ STRONG {action} - High Probability"
-        elif rfactor >= 4.0:
-            action = "CALL" if "UPSIDE" in direction else "PUT"
-            return f"⭐⭐ {action} Option - Active Signal"
-        elif rfactor >= 3.0:
-            return "⭐ Watch for confirmation"
-        else:
-            return "⚠️ Avoid - Weak momentum"
+    with col2:
+        st.markdown("**🔴 Top 10 DOWNSIDE Signals (PUT Options)**")
+        render_signal_panel(view.top('DOWNSIDE'), "No downside signals found")
 
-# ============================================================================
-# DATA PROCESSING
-# ============================================================================
+def render_signal_panel(top, empty_message):
+    """One batched markdown block for a panel's display rows"""
+    if len(top) == 0:
+        st.warning(empty_message)
+        return
+    
+    rows = zip(top['Symbol'], top['R-Factor'], top['LTP'], top['Change %'], top['Recommendation'])
+    st.markdown("\n".join(
+        f"**#{rank}. {symbol}** - R-Factor: **{rfactor}**  \n"
+        f"LTP: ₹{ltp:.2f} | Change: {change:+.2f}%  \n"
+        f"{recommendation}\n"
+        f"---"
+        for rank, (symbol, rfactor, ltp, change, recommendation) in enumerate(rows, start=1)
+    ))
 
-def process_stock_data(stock_data_list):
-    """Process fetched stock data and calculate R-Factor"""
-    processed_data = []
+def render_live_preview(placeholder, df, done, total):
+    """Redraw partial results in the main area while a scan is still running"""
+    view = ScanView(df, list(SIGNAL_LABELS), list(DIRECTION_LABELS))
     
-    for stock_data in stock_data_list:
-        if not stock_data:
-            continue
-        
-        # Calculate R-Factor
-        result = RFactorCalculator.calculate_rfactor(
-            stock_data['current_price'],
-            stock_data['prev_close'],
-            stock_data['atr'],
-            stock_data['current_volume'],
-            stock_data['avg_volume']
+    with METRICS.stage('render'), placeholder.container():
+        st.subheader(f"⏳ Live Scan - {len(df)} stocks scored ({done}/{total} fetched)")
+        render_top_signals(view)
+        st.dataframe(
+            view.table(['Symbol', 'LTP', 'Change %', 'R-Factor', 'Signal', 'Direction', 'Recommendation']),
+            use_container_width=True,
+            height=300
         )
-        
-        # Combine data
-        processed_data.append({
-            'Symbol': stock_data['symbol'],
-            'LTP': stock_data['current_price'],
-            'Prev Close': stock_data['prev_close'],
-            'Change %': result['pct_change'],
-            'ATR': stock_data['atr'],
-            'ATR %': result['atr_pct'],
-            'Volume': int(stock_data['current_volume']),
-            'Avg Volume': int(stock_data['avg_volume']),
-            'Vol Ratio': result['volume_ratio'],
-            'R-Factor': result['rfactor'],
-            'K Factor': result['k_factor'],
-            'Signal': result['signal'],
-            'Direction': result['direction'],
-            'Recommendation': result['recommendation'],
-            'Timestamp': stock_data['timestamp'].strftime('%H:%M:%S')
-        })
+
+def stream_scan(symbols, live_view, progress_bar, bulk=True, chunk_size=50, max_workers=FETCH_WORKERS,
+                provider=None):
+    """
+    scan_symbols() that draws progress and partial results while it runs
+    Returns: (scored DataFrame, {symbol: reason})
+    """
+    # Results are scored as they arrive
+    stream = LiveDataFetcher.iter_stock_data(
+        symbols,
+        bulk=bulk,
+        chunk_size=chunk_size,
+        max_workers=max_workers,
+        provider=provider
+    )
     
-    return pd.DataFrame(processed_data)
+    scored_parts = []
+    pending = []
+    failed_stocks = {}
+    total = len(symbols)
+    started = last_render = time.monotonic()
+    
+    for done, (symbol, data, reason) in enumerate(stream, start=1):
+        if data:
+            pending.append(data)
+        else:
+            failed_stocks[symbol] = reason
+        
+        progress_bar.progress(done / total,
+                             text=f"Fetching {symbol}... ({done}/{total}) | Success: {done - len(failed_stocks)}")
+        
+        # Score what arrived since the last redraw and refresh the partial view
+        if pending and (len(pending) >= STREAM_RENDER_EVERY or
+                        time.monotonic() - last_render >= STREAM_RENDER_INTERVAL):
+            scored_parts.append(process_stock_data(pending))
+            pending = []
+            render_live_preview(live_view, pd.concat(scored_parts, ignore_index=True), done, total)
+            last_render = time.monotonic()
+    
+    if pending:
+        scored_parts.append(process_stock_data(pending))
+    
+    scored_rows = sum(len(part) for part in scored_parts)
+    scan_seconds = time.monotonic() - started
+    METRICS.observe('rfactor_stage_seconds', scan_seconds, stage='scan')
+    METRICS.set('rfactor_scan_rows_per_second', round(scored_rows / max(scan_seconds, 1e-9), 1))
+    
+    return (pd.concat(scored_parts, ignore_index=True) if scored_parts else pd.DataFrame()), failed_stocks
 
-# ============================================================================
-# STREAMLIT DASHBOARD
-# ============================================================================
+def render_metrics_panel():
+    """Process-wide pipeline metrics for the Debug Tools section, with Prometheus / JSON export"""
+    snapshot = METRICS.snapshot()
+    histograms = snapshot['histograms']
+    counters = snapshot['counters']
+    
+    with st.expander("📈 Pipeline Metrics"):
+        stages = [h for h in histograms if h['name'] == 'rfactor_stage_seconds']
+        if stages:
+            st.caption("Time per stage")
+            st.dataframe(
+                pd.DataFrame([{
+                    'Stage': h['labels']['stage'],
+                    'Calls': h['count'],
+                    'Total s': round(h['sum'], 2),
+                    'p50 ms': round(h['p50'] * 1000, 1),
+                    'p99 ms': round(h['p99'] * 1000, 1),
+                } for h in stages]),
+                hide_index=True,
+                use_container_width=True
+            )
+        
+        for h in histograms:
+            if h['name'] == 'rfactor_fetch_seconds':
+                st.caption(f"Fetch latency per {h['labels']['mode']} request (s) - {h['count']} requests")
+                buckets = pd.DataFrame({'≤ seconds': list(h['buckets']), 'Requests': list(h['buckets'].values())})
+                st.dataframe(buckets[buckets['Requests'] > 0], hide_index=True, use_container_width=True)
+        
+        cache = {}
+        for c in counters:
+            if c['name'] == 'rfactor_cache_total':
+                cache.setdefault(c['labels']['layer'], {})[c['labels']['result']] = c['value']
+        for layer, results in cache.items():
+            hits, misses = results.get('hit', 0), results.get('miss', 0)
+            st.caption(f"Cache {layer}: {hits} hits / {misses} misses ({hits / max(hits + misses, 1):.0%} hit rate)")
+        
+        reasons = [
+            {'Counter': c['name'].replace('rfactor_fetch_', '').replace('_total', ''),
+             'Reason': c['labels']['reason'], 'Count': c['value']}
+            for c in counters if c['name'] in ('rfactor_fetch_retries_total', 'rfactor_fetch_failures_total')
+        ]
+        if reasons:
+            st.dataframe(pd.DataFrame(reasons), hide_index=True, use_container_width=True)
+        
+        rows = sum(c['value'] for c in counters if c['name'] == 'rfactor_rows_scored_total')
+        score_seconds = sum(h['sum'] for h in stages if h['labels']['stage'] == 'score')
+        rate = next((g['value'] for g in snapshot['gauges'] if g['name'] == 'rfactor_scan_rows_per_second'), None)
+        st.caption(
+            f"Rows scored: {rows}"
+            + (f" | scoring: {rows / score_seconds:,.0f} rows/s" if score_seconds else "")
+            + (f" | last scan end-to-end: {rate:,.0f} rows/s" if rate is not None else "")
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("📤 Prometheus", METRICS.to_prometheus(), file_name="rfactor.prom", mime="text/plain")
+        with col2:
+            st.download_button("📤 JSON", METRICS.to_json(), file_name="rfactor_metrics.json", mime="application/json")
+        if st.button("♻️ Reset Metrics"):
+            METRICS.reset()
 
 def main():
     # Page configuration
@@ -322,11 +267,29 @@ def main():
     st.title("📊 R-Factor Live Dashboard - Real NSE Data")
     st.markdown("**Real-time F&O Stock Scanner | Live Prices from Yahoo Finance**")
     
+    # Partial results are drawn here while a scan is running
+    live_view = st.empty()
+    
     # Initialize session state
     if 'data_loaded' not in st.session_state:
         st.session_state.data_loaded = False
         st.session_state.df = pd.DataFrame()
         st.session_state.last_update = None
+        
+        # A fresh session starts from the newest shared scan of its default universe (this minute's,
+        # possibly from another process, else the last one in memory), else the local bar store
+        shared = SNAPSHOTS.get(FNO_STOCKS, **DEFAULT_SCAN_ARGS)
+        if shared is None:
+            shared = SNAPSHOTS.latest(FNO_STOCKS)
+        stored_data = LiveDataFetcher.load_from_store(FNO_STOCKS) if shared is None else None
+        if shared is not None:
+            st.session_state.df = shared.df
+            st.session_state.data_loaded = True
+            st.session_state.last_update = shared.created_at
+        elif stored_data:
+            st.session_state.df = process_stock_data(stored_data)
+            st.session_state.data_loaded = True
+            st.session_state.last_update = max(data['timestamp'] for data in stored_data)
     
     # Sidebar
     with st.sidebar:
@@ -342,13 +305,12 @@ def main():
         )
         
         if scan_mode == "Test 3 Stocks":
-            selected_stocks = ["TATAELXSI", "HDFCAMC", "SHRIRAMFIN"]
+            selected_stocks = TEST_STOCKS
             st.info("Testing: TATAELXSI, HDFCAMC, SHRIRAMFIN")
         elif scan_mode == "Quick Scan (Top 50)":
             selected_stocks = FNO_STOCKS[:50]
         elif scan_mode == "Full Scan (All 220+)":
             selected_stocks = FNO_STOCKS
-            st.warning(f"⏱️ Full scan will take ~10-15 minutes for {TOTAL_FNO_STOCKS} stocks")
         else:
             selected_stocks = st.multiselect(
                 "Select Stocks",
@@ -356,36 +318,181 @@ def main():
                 default=["RELIANCE", "TCS", "INFY", "HDFCBANK", "SBIN"]
             )
         
+        # Bulk download asks Yahoo for many tickers per request
+        bulk_fetch = st.checkbox("⚡ Bulk Download", value=DEFAULT_SCAN_ARGS['bulk'])
+        chunk_size = DEFAULT_SCAN_ARGS['chunk_size']
+        fetch_workers = DEFAULT_SCAN_ARGS['max_workers']
+        if bulk_fetch:
+            chunk_size = st.slider("Symbols per Request", 10, 100, chunk_size, step=10)
+        else:
+            fetch_workers = st.slider("Parallel Workers", 1, 16, fetch_workers)
+        
+        if scan_mode == "Full Scan (All 220+)" and not bulk_fetch:
+            st.warning(f"⏱️ Full scan will take ~10-15 minutes for {TOTAL_FNO_STOCKS} stocks")
+        
+        # Extra timeframes add 'R-Factor 1H'-style columns (see rfactor.timeframes)
+        timeframes = st.multiselect(
+            "🕐 Extra Timeframes",
+            [timeframe for timeframe in TIMEFRAMES if timeframe != '1d'],
+            default=[],
+            format_func=TIMEFRAMES.get,
+            help="Download hourly bars once per request and score the daily table plus these timeframes "
+                 "from them. Always a bulk download."
+        )
+        
         # Fetch data button
-        if st.button("🔄 Fetch Live Data", type="primary", use_container_width=True):
+        fetch_clicked = st.button("🔄 Fetch Live Data", type="primary", use_container_width=True)
+        if fetch_clicked and timeframes:
+            with st.spinner(f'Fetching hourly bars for {len(selected_stocks)} stocks...'):
+                # Not shared through SNAPSHOTS - a daily scan of the same stocks has no timeframe columns
+                df, failed = scan_timeframes(selected_stocks, timeframes, chunk_size=chunk_size)
+                if failed:
+                    LiveDataFetcher._warn_failed(failed)
+                
+                if not df.empty:
+                    st.session_state.df = df
+                    st.session_state.data_loaded = True
+                    st.session_state.last_update = datetime.now()
+                    
+                    st.success(f"✅ Successfully loaded {len(st.session_state.df)} stocks!")
+                    st.balloons()
+                else:
+                    st.error("❌ No data fetched. Please check your internet connection or try again.")
+        elif fetch_clicked:
             with st.spinner(f'Fetching live NSE data for {len(selected_stocks)} stocks...'):
                 progress_bar = st.progress(0, text="Starting fetch...")
                 
-                # Fetch data
-                stock_data_list = LiveDataFetcher.fetch_multiple_stocks(
-                    selected_stocks, 
-                    progress_bar
+                # One scan per universe per minute - other sessions asking for the same
+                # stocks meanwhile join this scan or reuse its snapshot
+                snapshot, source = SNAPSHOTS.get_or_scan(
+                    selected_stocks,
+                    functools.partial(stream_scan, live_view=live_view, progress_bar=progress_bar),
+                    bulk=bulk_fetch,
+                    chunk_size=chunk_size,
+                    max_workers=fetch_workers
                 )
                 
+                live_view.empty()
+                progress_bar.empty()
+                if source != 'scan':
+                    st.info(f"♻️ Shared scan from {snapshot.created_at:%H:%M:%S} (already fetched by another session)")
+                if snapshot.failed:
+                    LiveDataFetcher._warn_failed(snapshot.failed)
+                
                 # Process data
-                if stock_data_list:
-                    st.session_state.df = process_stock_data(stock_data_list)
+                if not snapshot.df.empty:
+                    st.session_state.df = snapshot.df
                     st.session_state.data_loaded = True
-                    st.session_state.last_update = datetime.now()
+                    st.session_state.last_update = snapshot.created_at
                     
-                    progress_bar.empty()
                     st.success(f"✅ Successfully loaded {len(st.session_state.df)} stocks!")
                     st.balloons()
                 else:
                     st.error("❌ No data fetched. Please check your internet connection or try again.")
-                    progress_bar.empty()
         
-        # Auto-refresh
+        # Auto-refresh - scans run on a background thread, never on this one
         st.divider()
-        auto_refresh = st.checkbox("🔄 Auto Refresh (5 min)", value=False)
+        auto_refresh = st.checkbox("🔄 Auto Refresh", value=False)
+        refresh_minutes = 5
+        intraday_mode = False
+        adaptive_mode = False
+        quotes_mode = False
+        refresh_budget = PRIORITY_BUDGET
+        if auto_refresh:
+            intraday_mode = st.checkbox(
+                "⏱️ Intraday (1-min bars)",
+                value=False,
+                help="Seed once from daily bars, then only apply new minute bars on each refresh. "
+                     "Vol Ratio compares today's volume with what a normal session has traded by now."
+            )
+            if not intraday_mode:
+                adaptive_mode = st.checkbox(
+                    "🎯 Adaptive (hot stocks first)",
+                    value=False,
+                    help="Re-scan stocks close to the ACTIVE threshold, volatile, with rising volume "
+                         "or stale every few seconds, and the rest less often, within a fixed budget."
+                )
+                quotes_mode = st.checkbox(
+                    "📋 Quotes only (EOD baseline)",
+                    value=False,
+                    help="Fetch one quote per stock and join it to the end-of-day baseline "
+                         "(python -m rfactor baseline) instead of a month of bars. "
+                         "Stocks missing from the baseline are added on the first refresh."
+                )
+            if adaptive_mode:
+                refresh_budget = st.select_slider("Stocks Re-scanned per Minute", [30, 60, 120, 240, 480],
+                                                  value=PRIORITY_BUDGET)
+            else:
+                refresh_minutes = st.select_slider("Refresh Interval (min)", [1, 2, 5, 10, 15], value=5)
+            if timeframes and (intraday_mode or adaptive_mode or quotes_mode):
+                st.caption("🕐 Only full refreshes keep the extra timeframe columns")
+        
+        # Full refreshes with extra timeframes re-run the timeframe scan
+        timeframe_refresh = bool(timeframes) and not (intraday_mode or adaptive_mode or quotes_mode)
+        refresh_mode = 'intraday' if intraday_mode else ('adaptive' if adaptive_mode else 'full') + (
+            '-quotes' if quotes_mode else '') + ('-' + ','.join(timeframes) if timeframe_refresh else '')
+        scheduler = st.session_state.get('scheduler')
+        if scheduler is not None and st.session_state.get('scheduler_mode', 'full') != refresh_mode:
+            # Switching modes - the other scan function needs its own scheduler
+            scheduler.stop()
+            scheduler = st.session_state.scheduler = None
+            st.session_state.snapshot_version = 0
         
         if auto_refresh and st.session_state.data_loaded:
-            st.info("Auto-refresh enabled. Dashboard will update every 5 minutes.")
+            if scheduler is None:
+                # Daily scans are published by SNAPSHOTS; the others are published here, labelled with their mode
+                if intraday_mode:
+                    scheduler = RefreshScheduler(IntradayEngine().scan,
+                                                 on_snapshot=functools.partial(PUBLISHER.publish, mode='intraday'))
+                elif adaptive_mode:
+                    # Each cycle scans a different handful of stocks - the shared snapshot cache can't help
+                    scan_fn = Baseline.load().scan if quotes_mode else scan_symbols
+                    scheduler = PriorityRefreshScheduler(scan_fn, on_snapshot=functools.partial(
+                        PUBLISHER.publish, mode='adaptive-quotes' if quotes_mode else 'adaptive'))
+                    last_update = st.session_state.last_update
+                    age = (datetime.now() - last_update).total_seconds() if last_update else 0.0
+                    scheduler.seed(st.session_state.df, age=age)
+                elif quotes_mode:
+                    scheduler = RefreshScheduler(Baseline.load().scan,
+                                                 on_snapshot=functools.partial(PUBLISHER.publish, mode='quotes'))
+                elif timeframe_refresh:
+                    scheduler = RefreshScheduler(scan_timeframes,
+                                                 on_snapshot=functools.partial(PUBLISHER.publish, mode='timeframes'))
+                else:
+                    scheduler = RefreshScheduler(SNAPSHOTS.scan)
+                st.session_state.scheduler = scheduler
+                st.session_state.scheduler_mode = refresh_mode
+            
+            # Intraday and quote scans make their own requests - the fetch settings don't apply
+            if intraday_mode or quotes_mode:
+                scan_args = {}
+            elif timeframe_refresh:
+                scan_args = {'timeframes': tuple(timeframes), 'chunk_size': chunk_size}
+            else:
+                scan_args = {'bulk': bulk_fetch, 'chunk_size': chunk_size, 'max_workers': fetch_workers}
+            
+            if adaptive_mode:
+                scheduler.configure(selected_stocks, budget=refresh_budget, **scan_args)
+            else:
+                scheduler.configure(selected_stocks, refresh_minutes * 60, **scan_args)
+            scheduler.start()
+            if adaptive_mode:
+                st.info(f"Adaptive refresh enabled. {refresh_budget:g} stocks per minute are re-scanned in the "
+                        f"background, hottest first.")
+            else:
+                st.info(f"Auto-refresh enabled. Data is re-scanned in the background every {refresh_minutes} minutes.")
+            if scheduler.last_error:
+                st.warning(f"⚠️ Last background scan failed: {scheduler.last_error}")
+        elif scheduler is not None:
+            scheduler.stop()
+        
+        # Pick up the newest background snapshot
+        snapshot = scheduler.latest() if scheduler is not None else None
+        if (snapshot is not None and not snapshot.df.empty and
+                snapshot.version > st.session_state.get('snapshot_version', 0)):
+            st.session_state.df = snapshot.df
+            st.session_state.last_update = snapshot.created_at
+            st.session_state.snapshot_version = snapshot.version
         
         # Filters
         st.divider()
@@ -396,14 +503,16 @@ def main():
         
         signal_filter = st.multiselect(
             "Signal Type",
-            ["🟢 ACTIVE", "🟡 WAIT"],
-            default=["🟢 ACTIVE", "🟡 WAIT"]
+            ["ACTIVE", "WAIT"],
+            default=["ACTIVE", "WAIT"],
+            format_func=SIGNAL_LABELS.get
         )
         
         direction_filter = st.multiselect(
             "Direction",
-            ["UPSIDE ↑", "DOWNSIDE ↓"],
-            default=["UPSIDE ↑", "DOWNSIDE ↓"]  # Show BOTH by default
+            ["UPSIDE", "DOWNSIDE"],
+            default=["UPSIDE", "DOWNSIDE"],  # Show BOTH by default
+            format_func=DIRECTION_LABELS.get
         )
         
         # Show count info
@@ -430,6 +539,8 @@ def main():
                     st.error(f"❌ {debug_symbol} - Not found or error")
                     st.info(f"Try checking: {debug_symbol}.NS on Yahoo Finance")
                     st.markdown(f"[Check on Yahoo Finance](https://finance.yahoo.com/quote/{debug_symbol}.NS)")
+        
+        render_metrics_panel()
     
     # Main content
     if not st.session_state.data_loaded:
@@ -485,16 +596,14 @@ def main():
             - % Change: +3.71%
             - Signal: ACTIVE
             """)
-        
+    
     else:
-        # Apply filters - NO MINIMUM R-FACTOR, just sort by highest
-        df_filtered = st.session_state.df[
-            (st.session_state.df['Signal'].isin(signal_filter)) &
-            (st.session_state.df['Direction'].isin(direction_filter))
-        ]
+        render_started = time.perf_counter()
         
-        # Sort by R-Factor descending (highest first - regardless of direction)
-        df_filtered = df_filtered.sort_values('R-Factor', ascending=False)
+        # Apply filters - NO MINIMUM R-FACTOR, just sort by highest
+        # Memoized per (scan, filters): reruns that change neither reuse every computed piece
+        view = VIEWS.get(st.session_state.df, signal_filter, direction_filter)
+        stats = view.stats
         
         # Statistics
         col1, col2, col3, col4, col5 = st.columns(5)
@@ -502,29 +611,28 @@ def main():
         with col1:
             st.metric(
                 "Total Stocks",
-                len(st.session_state.df),
-                f"{len(df_filtered)} filtered"
+                stats['total'],
+                f"{stats['filtered']} filtered"
             )
         
         with col2:
-            active_count = len(df_filtered[df_filtered['Signal'] == '🟢 ACTIVE'])
+            active_count = stats['active']
             st.metric(
                 "Active Signals",
                 active_count,
-                f"{(active_count/len(st.session_state.df)*100):.1f}%" if len(st.session_state.df) > 0 else "0%"
+                f"{(active_count/stats['total']*100):.1f}%" if stats['total'] > 0 else "0%"
             )
         
         with col3:
-            avg_rfactor = df_filtered['R-Factor'].mean() if len(df_filtered) > 0 else 0
             st.metric(
                 "Avg R-Factor",
-                f"{avg_rfactor:.2f}",
+                f"{stats['avg_rfactor']:.2f}",
                 "Filtered"
             )
         
         with col4:
-            upside_count = len(df_filtered[df_filtered['Direction'] == 'UPSIDE ↑'])
-            upside_pct = (upside_count/len(df_filtered)*100) if len(df_filtered) > 0 else 0
+            upside_count = stats['upside']
+            upside_pct = (upside_count/stats['filtered']*100) if stats['filtered'] > 0 else 0
             st.metric(
                 "Upside (CALL)",
                 upside_count,
@@ -532,8 +640,8 @@ def main():
             )
         
         with col5:
-            downside_count = len(df_filtered[df_filtered['Direction'] == 'DOWNSIDE ↓'])
-            downside_pct = (downside_count/len(df_filtered)*100) if len(df_filtered) > 0 else 0
+            downside_count = stats['downside']
+            downside_pct = (downside_count/stats['filtered']*100) if stats['filtered'] > 0 else 0
             st.metric(
                 "Downside (PUT)",
                 downside_count,
@@ -545,69 +653,53 @@ def main():
         
         st.info("📊 Showing BOTH upside (CALL) and downside (PUT) opportunities sorted by R-Factor")
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("**🟢 Top 10 UPSIDE Signals (CALL Options)**")
-            upside_top = df_filtered[df_filtered['Direction'] == 'UPSIDE ↑'].head(10)
-            
-            if len(upside_top) == 0:
-                st.warning("No upside signals found")
-            else:
-                for idx, row in upside_top.iterrows():
-                    st.markdown(f"""
-                    **#{upside_top.index.get_loc(idx)+1}. {row['Symbol']}** - R-Factor: **{row['R-Factor']}**  
-                    LTP: ₹{row['LTP']:.2f} | Change: {row['Change %']:+.2f}%  
-                    {row['Recommendation']}
-                    ---
-                    """)
-        
-        with col2:
-            st.markdown("**🔴 Top 10 DOWNSIDE Signals (PUT Options)**")
-            downside_top = df_filtered[df_filtered['Direction'] == 'DOWNSIDE ↓'].head(10)
-            
-            if len(downside_top) == 0:
-                st.warning("No downside signals found")
-            else:
-                for idx, row in downside_top.iterrows():
-                    st.markdown(f"""
-                    **#{downside_top.index.get_loc(idx)+1}. {row['Symbol']}** - R-Factor: **{row['R-Factor']}**  
-                    LTP: ₹{row['LTP']:.2f} | Change: {row['Change %']:+.2f}%  
-                    {row['Recommendation']}
-                    ---
-                    """)
+        render_top_signals(view)
         
         # Data table
-        st.subheader(f"📊 Stock Scanner Results ({len(df_filtered)} stocks)")
+        st.subheader(f"📊 Stock Scanner Results ({stats['filtered']} stocks)")
+        
+        # Columns of the extra timeframes scanned, if any (e.g. 'R-Factor 1H', 'Signal 1W')
+        timeframe_columns = [
+            f'{column} {label}'
+            for label in TIMEFRAMES.values() for column, _ in TIMEFRAME_COLUMNS
+            if f'{column} {label}' in st.session_state.df
+        ]
         
         # Format dataframe
-        display_df = df_filtered[[
+        display_df = view.table([
             'Symbol', 'LTP', 'Change %', 'ATR %', 'Vol Ratio', 
             'R-Factor', 'Signal', 'Direction', 'Recommendation', 'Timestamp'
-        ]].copy()
+        ] + timeframe_columns)
         
         # Display with formatting
+        column_config = {
+            'LTP': st.column_config.NumberColumn('LTP', format="₹%.2f"),
+            'Change %': st.column_config.NumberColumn('Change %', format="%.2f%%"),
+            'ATR %': st.column_config.NumberColumn('ATR %', format="%.2f%%"),
+            'Vol Ratio': st.column_config.NumberColumn('Vol Ratio', format="%.2fx"),
+            'R-Factor': st.column_config.NumberColumn('R-Factor', format="%.2f"),
+        }
+        formats = {'Change %': "%.2f%%", 'Vol Ratio': "%.2fx", 'R-Factor': "%.2f"}
+        for column in timeframe_columns:
+            base = column.rsplit(' ', 1)[0]
+            if base in formats:
+                column_config[column] = st.column_config.NumberColumn(column, format=formats[base])
         st.dataframe(
             display_df,
             use_container_width=True,
             height=500,
-            column_config={
-                'LTP': st.column_config.NumberColumn('LTP', format="₹%.2f"),
-                'Change %': st.column_config.NumberColumn('Change %', format="%.2f%%"),
-                'ATR %': st.column_config.NumberColumn('ATR %', format="%.2f%%"),
-                'Vol Ratio': st.column_config.NumberColumn('Vol Ratio', format="%.2fx"),
-                'R-Factor': st.column_config.NumberColumn('R-Factor', format="%.2f"),
-            }
+            column_config=column_config
         )
         
-        # Download button
-        csv = df_filtered.to_csv(index=False)
+        # Download button - the CSV is only built when someone downloads it
         st.download_button(
             label="📥 Download as CSV",
-            data=csv,
+            data=view.csv if DEFERRED_DOWNLOADS else view.csv(),
             file_name=f"rfactor_live_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv"
         )
+        
+        METRICS.observe('rfactor_stage_seconds', time.perf_counter() - render_started, stage='render')
     
     # Footer
     st.divider()
@@ -621,10 +713,9 @@ def main():
     **⚠️ Disclaimer**: Real NSE data with 60-second cache. Use proper risk management.
     """)
     
-    # Auto-refresh logic
-    if auto_refresh and st.session_state.data_loaded:
-        time.sleep(300)  # 5 minutes
-        st.rerun()
+    # Auto-refresh logic - poll for new snapshots without blocking the session
+    if auto_refresh and st.session_state.data_loaded and poll_snapshots is not None:
+        poll_snapshots()
 
 # ============================================================================
 # RUN APPLICATION
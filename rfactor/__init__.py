@@ -0,0 +1,4 @@
+"""
+R-Factor core package
+Shared building blocks for the Streamlit dashboard (aapp.py) and offline jobs
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from rfactor.cli import main
+
+sys.exit(main())
@@ -0,0 +1,411 @@
+"""
+Alert engine - events on R-Factor transitions, delivered to pluggable sinks
+
+AlertEngine keeps the last scored state of every symbol (R-Factor, Signal,
+Direction) and diffs each new scan against it. Only transitions become events:
+
+    active      WAIT -> ACTIVE
+    strong      R-Factor crossed 6.0 (the ⭐⭐⭐ STRONG tier) upwards
+    direction   UPSIDE <-> DOWNSIDE flip of a symbol that is ACTIVE now or was before
+
+Repeats of the same event for a symbol within ALERT_DEDUP seconds are dropped.
+No symbol sends more than ALERT_RATE events per ALERT_RATE_WINDOW. Events that
+survive go to every sink: stdout, a JSON-lines file, or a webhook (JSON POST).
+AlertReceiver is a local stand-in for a webhook receiver. With state_path set,
+the state survives restarts, so cron scans diff against the previous run.
+
+    engine = AlertEngine([WebhookSink(url), FileSink("alerts.jsonl")], state_path="data/alerts.json")
+    events = engine.process(df)                # after every scan
+    RefreshScheduler(scan_fn, on_snapshot=engine.on_snapshot)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque, namedtuple
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from rfactor.calculator import DIRECTION_LABELS, SIGNAL_LABELS
+from rfactor.metrics import METRICS
+
+ALERT_STATE_PATH = os.environ.get("RFACTOR_ALERT_STATE", os.path.join("data", "alerts.json"))
+ALERT_STRONG = 6.0           # R-Factor of the ⭐⭐⭐ STRONG tier
+ALERT_DEDUP = 1800           # Seconds a (symbol, kind, direction) event is not repeated
+ALERT_RATE = 3               # Events per symbol...
+ALERT_RATE_WINDOW = 600      # ...per this many seconds
+ALERT_TIMEOUT = 5.0          # Seconds per webhook POST
+ALERT_RETRIES = 2            # Webhook retries on connection errors and 5xx
+
+# time: ISO timestamp of the scan, previous_*: the symbol's state before it
+AlertEvent = namedtuple('AlertEvent', [
+    'kind', 'symbol', 'rfactor', 'previous_rfactor', 'signal', 'direction', 'previous_direction',
+    'ltp', 'change_pct', 'time', 'version'
+])
+
+# Display labels -> codes, so tables from to_display() can be diffed too
+_SIGNAL_CODES = {**{label: code for code, label in SIGNAL_LABELS.items()}, **{code: code for code in SIGNAL_LABELS}}
+_DIRECTION_CODES = {**{label: code for code, label in DIRECTION_LABELS.items()},
+                    **{code: code for code in DIRECTION_LABELS}}
+
+
+def _codes(values, mapping):
+    return np.array([mapping.get(value, 'N/A') for value in values.astype(object)], dtype=object)
+
+
+class AlertEngine:
+    """
+    Transition detector with per-symbol dedup and rate limits (see module docstring)
+    sinks: objects with send(events) - StdoutSink, FileSink, WebhookSink or your own
+    state_path: JSON file for the per-symbol state and dedup times (None: memory only)
+    """
+    
+    def __init__(self, sinks=(), state_path=None, strong=ALERT_STRONG, dedup=ALERT_DEDUP,
+                 rate=ALERT_RATE, rate_window=ALERT_RATE_WINDOW):
+        self.sinks = list(sinks)
+        self.state_path = state_path
+        self.strong = strong
+        self.dedup = dedup
+        self.rate = rate
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        
+        self.state = pd.DataFrame(columns=['rfactor', 'signal', 'direction'])
+        self._sent = {}              # (symbol, kind, direction) -> epoch seconds last sent
+        self._recent = {}            # symbol -> deque of epoch seconds of its recent events
+        if state_path:
+            self._load()
+    
+    # ------------------------------------------------------------------------
+    # Diffing
+    # ------------------------------------------------------------------------
+    
+    def diff(self, df, now=None, version=None):
+        """
+        Transitions between the stored state and `df` (typed or display scanner table)
+        Symbols seen for the first time only set their state. The state is not updated here.
+        Returns: list of AlertEvent
+        """
+        if df is None or df.empty:
+            return []
+        
+        stamp = (now or datetime.now()).isoformat(timespec='seconds')
+        current = self._state_of(df)
+        previous = self.state.reindex(current.index)
+        known = previous['signal'].notna().to_numpy()
+        
+        rfactor, prev_rfactor = current['rfactor'].to_numpy(), previous['rfactor'].to_numpy(np.float64)
+        active = current['signal'].to_numpy() == 'ACTIVE'
+        was_active = previous['signal'].to_numpy() == 'ACTIVE'
+        direction, prev_direction = current['direction'].to_numpy(), previous['direction'].to_numpy()
+        
+        with np.errstate(invalid='ignore'):
+            transitions = {
+                'active': known & active & (previous['signal'].to_numpy() == 'WAIT'),
+                'strong': known & (rfactor >= self.strong) & (prev_rfactor < self.strong),
+                'direction': known & (active | was_active) & (direction != prev_direction)
+                             & np.isin(direction, ('UPSIDE', 'DOWNSIDE'))
+                             & np.isin(prev_direction, ('UPSIDE', 'DOWNSIDE')),
+            }
+        
+        columns = {
+            'ltp': df['LTP'].to_numpy(np.float64) if 'LTP' in df else np.full(len(df), np.nan),
+            'change_pct': df['Change %'].to_numpy(np.float64) if 'Change %' in df else np.full(len(df), np.nan),
+        }
+        events = []
+        for kind, mask in transitions.items():
+            for i in np.flatnonzero(mask):
+                events.append(AlertEvent(
+                    kind=kind,
+                    symbol=current.index[i],
+                    rfactor=round(float(rfactor[i]), 2),
+                    previous_rfactor=round(float(prev_rfactor[i]), 2),
+                    signal=current['signal'].iat[i],
+                    direction=direction[i],
+                    previous_direction=prev_direction[i],
+                    ltp=round(float(columns['ltp'][i]), 2),
+                    change_pct=round(float(columns['change_pct'][i]), 2),
+                    time=stamp,
+                    version=version
+                ))
+        return events
+    
+    @staticmethod
+    def _state_of(df):
+        """Per-symbol state rows of a scanner table"""
+        return pd.DataFrame({
+            'rfactor': df['R-Factor'].to_numpy(np.float64),
+            'signal': _codes(df['Signal'], _SIGNAL_CODES),
+            'direction': _codes(df['Direction'], _DIRECTION_CODES),
+        }, index=df['Symbol'].to_numpy())
+    
+    def _allow(self, event, now):
+        """Dedup and per-symbol rate limit - Returns: None to send, else the reason it is dropped"""
+        key = (event.symbol, event.kind, event.direction)
+        if now - self._sent.get(key, -np.inf) < self.dedup:
+            return 'duplicate'
+        
+        recent = self._recent.setdefault(event.symbol, deque())
+        while recent and now - recent[0] >= self.rate_window:
+            recent.popleft()
+        if len(recent) >= self.rate:
+            return 'rate_limited'
+        
+        self._sent[key] = now
+        recent.append(now)
+        return None
+    
+    def process(self, df, now=None, version=None):
+        """
+        Diff one scan, update the state, deliver the events that pass dedup and rate limits
+        Symbols missing from `df` (failed fetches, filtered out) keep their previous state
+        Returns: the delivered events
+        """
+        with self._lock:
+            events = self.diff(df, now, version)
+            clock = time.time()
+            
+            delivered = []
+            for event in events:
+                reason = self._allow(event, clock)
+                METRICS.inc('rfactor_alerts_total', kind=event.kind, result=reason or 'sent')
+                if reason is None:
+                    delivered.append(event)
+            
+            if df is not None and not df.empty:
+                current = self._state_of(df)
+                rest = self.state[~self.state.index.isin(current.index)]
+                self.state = pd.concat([rest, current]) if not rest.empty else current
+            
+            if self.state_path:
+                self._save(clock)
+        
+        if delivered:
+            for sink in self.sinks:
+                self._deliver(sink, delivered)
+        return delivered
+    
+    def on_snapshot(self, snapshot):
+        """RefreshScheduler / SnapshotCache hook"""
+        return self.process(snapshot.df, snapshot.created_at, snapshot.version)
+    
+    @staticmethod
+    def _deliver(sink, events):
+        """One sink's delivery; a failing sink never blocks the others"""
+        name = getattr(sink, 'name', type(sink).__name__)
+        try:
+            sink.send(events)
+        except Exception as e:
+            METRICS.inc('rfactor_alert_deliveries_total', sink=name, result='failed')
+            print(f"⚠️ Alert sink {name} failed: {e}", file=sys.stderr)
+            return False
+        METRICS.inc('rfactor_alert_deliveries_total', sink=name, result='sent')
+        return True
+    
+    # ------------------------------------------------------------------------
+    # State file
+    # ------------------------------------------------------------------------
+    
+    def _load(self):
+        try:
+            with open(self.state_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        symbols = saved.get('symbols', {})
+        state = pd.DataFrame.from_dict(symbols, orient='index', columns=['rfactor', 'signal', 'direction'])
+        self.state = state.astype({'rfactor': np.float64})
+        self._sent = {tuple(key.split('|')): sent for key, sent in saved.get('sent', {}).items()}
+        self._recent = {symbol: deque(times) for symbol, times in saved.get('recent', {}).items()}
+    
+    def _save(self, now):
+        """Atomically rewrite the state file, dropping dedup entries that have expired"""
+        self._sent = {key: sent for key, sent in self._sent.items() if now - sent < self.dedup}
+        saved = {
+            'symbols': {
+                symbol: [None if pd.isna(row.rfactor) else float(row.rfactor), row.signal, row.direction]
+                for symbol, row in zip(self.state.index, self.state.itertuples())
+            },
+            'sent': {'|'.join(key): sent for key, sent in self._sent.items()},
+            'recent': {symbol: [t for t in times if now - t < self.rate_window]
+                       for symbol, times in self._recent.items() if times},
+        }
+        
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(saved, f)
+        os.replace(tmp, self.state_path)
+
+
+# ============================================================================
+# SINKS
+# ============================================================================
+
+def format_event(event):
+    """One line per event for people"""
+    arrow = {'UPSIDE': '↑', 'DOWNSIDE': '↓'}.get(event.direction, '')
+    what = {
+        'active': "turned ACTIVE",
+        'strong': f"crossed {ALERT_STRONG:g} (STRONG)",
+        'direction': f"flipped {event.previous_direction} -> {event.direction}",
+    }[event.kind]
+    return (f"🔔 {event.time} {event.symbol} {what}: R-Factor {event.previous_rfactor} -> {event.rfactor} "
+            f"{arrow} LTP {event.ltp} ({event.change_pct:+}%)")
+
+
+class StdoutSink:
+    """Events as readable lines on stdout"""
+    
+    name = "stdout"
+    
+    def __init__(self, stream=None):
+        self.stream = stream
+    
+    def send(self, events):
+        stream = self.stream or sys.stdout
+        for event in events:
+            print(format_event(event), file=stream)
+        stream.flush()
+
+
+class FileSink:
+    """Events appended to a JSON-lines file (one event per line)"""
+    
+    name = "file"
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def send(self, events):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lines = ''.join(json.dumps(event._asdict(), ensure_ascii=False) + '\n' for event in events)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class WebhookSink:
+    """
+    Events POSTed as one JSON batch: {"events": [...]}
+    Retries connection errors and 5xx answers; any other answer is final
+    """
+    
+    name = "webhook"
+    
+    def __init__(self, url, timeout=ALERT_TIMEOUT, retries=ALERT_RETRIES, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+    
+    def send(self, events):
+        body = json.dumps({'events': [event._asdict() for event in events]}, ensure_ascii=False).encode()
+        for attempt in range(self.retries + 1):
+            request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                    return
+            except urllib.error.HTTPError as e:
+                if e.code < 500 or attempt == self.retries:
+                    raise
+            except (urllib.error.URLError, OSError):
+                if attempt == self.retries:
+                    raise
+            time.sleep(0.5 * (2 ** attempt))
+
+
+# ============================================================================
+# LOCAL RECEIVER
+# ============================================================================
+
+class AlertReceiver:
+    """
+    Local stand-in for a webhook receiver, served from a background thread
+    Keeps every event POSTed to it (events) and optionally calls on_events(list of dicts)
+    """
+    
+    def __init__(self, host='127.0.0.1', port=0, on_events=None):
+        self.host = host
+        self.port = port
+        self.on_events = on_events
+        self.events = []
+        self._lock = threading.Lock()
+        self._received = threading.Condition(self._lock)
+        self._server = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/alerts"
+    
+    def start(self):
+        """Start serving on a daemon thread (port 0 picks a free port)"""
+        self._server = _ReceiverHTTPServer((self.host, self.port), _ReceiverHandler)
+        self._server.receiver = self
+        threading.Thread(target=self._server.serve_forever, name='rfactor-alert-receiver', daemon=True).start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def receive(self, events):
+        with self._received:
+            self.events.extend(events)
+            self._received.notify_all()
+        if self.on_events is not None:
+            self.on_events(events)
+    
+    def wait(self, count, timeout=5.0):
+        """Block until at least `count` events have arrived - Returns: whether they did"""
+        with self._received:
+            return self._received.wait_for(lambda: len(self.events) >= count, timeout)
+
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    """POST {"events": [...]} -> 204"""
+    
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    
+    def do_POST(self):
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            events = payload['events']
+        except (ValueError, KeyError, TypeError):
+            self.send_response(400)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        self.server.receiver.receive(events)
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class _ReceiverHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
@@ -0,0 +1,221 @@
+"""
+Historical backtest of the R-Factor signal tiers
+
+Every symbol-day of a multi-year daily history is scored the way the live scan
+would have scored it that evening (close vs previous close, 14-bar ATR,
+20-bar average volume), in one vectorized pass per shard of symbols. Forward
+returns over the next N bars then show whether the >= 4.0 / >= 6.0 tiers in
+RFactorCalculator._get_recommendation actually lead continuation moves.
+
+Shards of symbols are downloaded and scored on a process pool.
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rfactor import indicators
+from rfactor.calculator import RFactorCalculator, RECOMMENDATION_LABELS, SIGNAL_LABELS
+from rfactor.fetcher import FETCH_BACKOFF_BASE, FETCH_MAX_RETRIES, FetchError
+
+# Backtest settings
+BACKTEST_PERIOD = "5y"           # History per symbol
+BACKTEST_HORIZONS = (1, 5)       # Forward returns, in bars
+BACKTEST_WORKERS = os.cpu_count() or 1
+BACKTEST_MIN_BARS = 14           # Same minimum as LiveDataFetcher._build_stock_record
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+def signal_inputs(histories, horizons=BACKTEST_HORIZONS):
+    """
+    Scoring inputs for every symbol-day of {symbol: OHLCV DataFrame}, as the live
+    scan would have seen them that evening
+    Returns: one row per scorable symbol-day - Symbol, Date, Close, Prev Close, ATR,
+    Volume, Avg Volume and 'Fwd <h>d %' (close-to-close return h bars later, NaN past the end)
+    """
+    symbols, index, panels = indicators.build_panel(histories, ('High', 'Low', 'Close', 'Volume'))
+    if not symbols:
+        return pd.DataFrame()
+    
+    high, low, close, volume = panels['High'], panels['Low'], panels['Close'], panels['Volume']
+    
+    # Inputs as of each bar - trailing windows only, nothing from the future
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = indicators.forward_fill(close)[:, :-1]
+    atr = indicators.simple_atr_series(high, low, close)
+    avg_volume = indicators.rolling_mean(volume, 20)
+    bars_seen = np.cumsum(~np.isnan(close), axis=1)
+    
+    with np.errstate(invalid='ignore'):
+        scored = (bars_seen >= BACKTEST_MIN_BARS) & ~np.isnan(prev_close) & (close > 0)
+    rows, cols = np.nonzero(scored)
+    
+    inputs = pd.DataFrame({
+        'Symbol': pd.Categorical.from_codes(rows, categories=symbols),
+        'Date': index[cols],
+        'Close': close[scored],
+        'Prev Close': prev_close[scored],
+        'ATR': atr[scored],
+        'Volume': volume[scored],
+        'Avg Volume': avg_volume[scored],
+    })
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for horizon in horizons:
+            future = np.full_like(close, np.nan)
+            future[:, :-horizon] = close[:, horizon:]
+            inputs[f'Fwd {horizon}d %'] = ((future[scored] / close[scored] - 1) * 100).astype(np.float32)
+    
+    return inputs
+
+def score_histories(histories, horizons=BACKTEST_HORIZONS):
+    """
+    R-Factor for every symbol-day of {symbol: OHLCV DataFrame}
+    Returns: one row per scored symbol-day with the scanner's metric columns
+    and 'Fwd <h>d %' (see signal_inputs)
+    """
+    inputs = signal_inputs(histories, horizons)
+    if inputs.empty:
+        return inputs
+    
+    result = RFactorCalculator.calculate_rfactor_batch(
+        inputs['Close'], inputs['Prev Close'], inputs['ATR'], inputs['Volume'], inputs['Avg Volume'],
+        labels=False
+    )
+    
+    signals = pd.DataFrame({
+        'Symbol': inputs['Symbol'],
+        'Date': inputs['Date'],
+        'Close': inputs['Close'],
+        'Change %': result['pct_change'].to_numpy(np.float32),
+        'Vol Ratio': result['volume_ratio'].to_numpy(np.float32),
+        'R-Factor': result['rfactor'].to_numpy(np.float32),
+        'Signal': result['signal'].array,
+        'Direction': result['direction'].array,
+        'Recommendation': result['recommendation'].array,
+    })
+    for horizon in horizons:
+        signals[f'Fwd {horizon}d %'] = inputs[f'Fwd {horizon}d %']
+    
+    return signals
+
+def summarize(signals, horizons=BACKTEST_HORIZONS, by='Recommendation'):
+    """
+    Forward performance per signal tier
+    Returns are signed by the signal's direction (a DOWNSIDE day that keeps
+    falling counts as a gain); Hit % is the share of days that moved that way
+    Returns: one row per tier plus 'ALL', tiers without days left out
+    """
+    if signals.empty:
+        return pd.DataFrame()
+    
+    downside = (signals['Direction'] == 'DOWNSIDE').to_numpy()
+    columns = {}
+    for horizon in horizons:
+        forward = signals[f'Fwd {horizon}d %'].to_numpy(np.float64)
+        signed = np.where(downside, -forward, forward)
+        columns[f'Avg {horizon}d %'] = signed
+        columns[f'Hit {horizon}d %'] = np.where(np.isnan(signed), np.nan, (signed > 0) * 100.0)
+    
+    frame = pd.DataFrame(columns)
+    tiers = signals[by].reset_index(drop=True)
+    
+    summary = frame.groupby(tiers, observed=False).mean()
+    summary.insert(0, 'Days', tiers.value_counts().reindex(summary.index).fillna(0).astype('int64'))
+    summary.loc['ALL'] = [len(frame)] + frame.mean().tolist()
+    
+    summary = summary[summary['Days'] > 0].round(2)
+    summary['Days'] = summary['Days'].astype('int64')
+    summary.index.name = by
+    return summary
+
+def tier_labels(summary):
+    """Summary with the tier codes replaced by their display labels"""
+    labels = {**SIGNAL_LABELS, **RECOMMENDATION_LABELS}
+    return summary.rename(index=lambda code: labels.get(code, code))
+
+# ============================================================================
+# SHARDED RUN
+# ============================================================================
+
+def _download_shard(provider, symbols, period):
+    """
+    Bars for one shard, retrying transient errors with jittered exponential backoff
+    Returns: ({symbol: hist}, {symbol: reason})
+    """
+    for attempt in range(FETCH_MAX_RETRIES + 1):
+        try:
+            histories = provider.download(symbols, period=period)
+            break
+        except Exception as e:
+            reason = FetchError.classify(e)
+            if reason not in FetchError.TRANSIENT or attempt == FETCH_MAX_RETRIES:
+                return {}, {symbol: reason for symbol in symbols}
+        
+        time.sleep(random.uniform(0, FETCH_BACKOFF_BASE * (2 ** attempt)))
+    
+    failed = {symbol: 'empty_history' for symbol in symbols if symbol not in histories}
+    return histories, failed
+
+def _run_shard(task):
+    """Process pool entry point: download and score one shard"""
+    provider, symbols, period, horizons, score_fn = task
+    histories, failed = _download_shard(provider, symbols, period)
+    
+    signals = score_fn(histories, horizons)
+    scored = set(signals['Symbol'].unique()) if not signals.empty else set()
+    for symbol in histories:
+        if symbol not in scored:
+            failed[symbol] = 'empty_history'
+    
+    return signals, failed
+
+def run_backtest(symbols, provider=None, period=BACKTEST_PERIOD, horizons=BACKTEST_HORIZONS,
+                 workers=BACKTEST_WORKERS, shard_size=None, score_fn=score_histories):
+    """
+    Score `period` of daily bars for every symbol, shards spread over `workers` processes
+    workers=1 runs in this process (no pool)
+    score_fn(histories, horizons) scores one shard - a module-level function so it pickles
+    (signal_inputs returns the raw scoring inputs instead)
+    Returns: (signals DataFrame, {symbol: failure reason})
+    """
+    if provider is None:
+        from rfactor.providers import YFinanceProvider
+        provider = YFinanceProvider()
+    
+    symbols = list(dict.fromkeys(symbols))
+    workers = max(1, int(workers))
+    # A few shards per worker keeps the pool busy when shard times differ
+    shard_size = shard_size or max(1, math.ceil(len(symbols) / (workers * 4)))
+    tasks = [
+        (provider, symbols[i:i + shard_size], period, tuple(horizons), score_fn)
+        for i in range(0, len(symbols), shard_size)
+    ]
+    
+    if workers == 1 or len(tasks) <= 1:
+        results = [_run_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_run_shard, tasks))
+    
+    parts = [signals for signals, _ in results if not signals.empty]
+    failed = {}
+    for _, shard_failed in results:
+        failed.update(shard_failed)
+    
+    if not parts:
+        return pd.DataFrame(), failed
+    
+    # Shards have their own Symbol categories - union them before concatenating
+    categories = [symbol for symbol in symbols if symbol not in failed]
+    for part in parts:
+        part['Symbol'] = part['Symbol'].cat.set_categories(categories)
+    
+    return pd.concat(parts, ignore_index=True), failed
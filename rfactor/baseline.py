@@ -0,0 +1,257 @@
+"""
+End-of-day baseline table and quote-only intraday refresh
+
+Of a symbol's inputs to R-Factor, only today's price, high, low and volume
+change during the session. The previous close, the true ranges and the
+volumes of the completed days are fixed until the next close. So an EOD job
+(`python -m rfactor baseline`) reduces a few months of daily bars to one row
+per symbol:
+
+    Date          last completed session
+    prev_close    its close
+    atr           14-day ATR as of that close (for reference)
+    avg_volume    20-day average volume as of that close (for reference)
+    tr_sum/tr_count          the last 13 true ranges
+    volume_sum/volume_count  the last 19 session volumes
+
+An intraday refresh then downloads one quote (today's daily bar so far) per
+symbol and joins it to the baseline. Today's true range and volume complete
+the 14-bar ATR and 20-day average volume in O(1). The scores are the same as
+LiveDataFetcher's month of bars, at a small fraction of the payload and CPU.
+
+    baseline = Baseline.load()              # or Baseline().build_from(provider, symbols)
+    df, failed = baseline.scan(symbols)     # RefreshScheduler scan_fn
+"""
+
+import os
+import random
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rfactor import fetcher, indicators
+from rfactor.fetcher import FetchError, LiveDataFetcher
+from rfactor.intraday import SESSION_TZ, exchange_time
+from rfactor.metrics import METRICS
+from rfactor.processing import process_stock_data
+
+BASELINE_PATH = os.environ.get("RFACTOR_BASELINE", os.path.join("data", "baseline.parquet"))
+BASELINE_PERIOD = "3mo"      # Daily history read by the EOD job
+BASELINE_ATR_PERIOD = 14     # Same windows as LiveDataFetcher._build_stock_record
+BASELINE_VOLUME_WINDOW = 20
+BASELINE_MIN_BARS = 13       # Completed days needed - _build_stock_record wants 14 bars with today's
+BASELINE_MAX_GAP = 5         # Calendar days from the baseline's session to a quote before it counts as stale
+QUOTE_CHUNK = 200            # Symbols per quote request
+
+COLUMNS = ['Date', 'prev_close', 'atr', 'avg_volume', 'tr_sum', 'tr_count', 'volume_sum', 'volume_count']
+EMPTY_QUOTES = pd.DataFrame(columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+
+
+def _with_retry(request, mode, empty, max_retries=fetcher.FETCH_MAX_RETRIES):
+    """
+    One rate-limited provider request, retrying transient errors like LiveDataFetcher
+    Returns: (result, reason) - (empty, reason) once it gives up
+    """
+    for attempt in range(max_retries + 1):
+        fetcher.RATE_LIMITER.acquire()
+        try:
+            with METRICS.timer('rfactor_fetch_seconds', mode=mode):
+                return request(), None
+        except Exception as e:
+            reason = FetchError.classify(e)
+            if reason not in FetchError.TRANSIENT or attempt == max_retries:
+                return empty, reason
+            METRICS.inc('rfactor_fetch_retries_total', reason=reason)
+        
+        time.sleep(random.uniform(0, fetcher.FETCH_BACKOFF_BASE * (2 ** attempt)))
+    
+    return empty, 'error'
+
+
+def build_baseline(histories, session_date=None, period=BASELINE_ATR_PERIOD, window=BASELINE_VOLUME_WINDOW):
+    """
+    Baseline rows from {symbol: daily OHLCV}
+    Bars dated session_date or later are dropped (default: every bar is a completed session,
+    as after the close)
+    Returns: DataFrame indexed by symbol (see module docstring) - symbols with fewer than
+    BASELINE_MIN_BARS completed days are left out
+    """
+    if session_date is not None:
+        session_date = pd.Timestamp(session_date).normalize()
+        histories = {
+            symbol: hist[exchange_time(hist.index).normalize() < session_date]
+            for symbol, hist in histories.items()
+            if hist is not None and not hist.empty
+        }
+    
+    symbols, index, panels = indicators.build_panel(histories)
+    if not symbols:
+        return pd.DataFrame(columns=COLUMNS).rename_axis('Symbol')
+    
+    # One pass over the (symbols x days) panel; right-aligning skips each symbol's missing days
+    tr, tr_count = indicators.right_align(
+        indicators.true_range(panels['High'], panels['Low'], panels['Close'])
+    )
+    volume, volume_count = indicators.right_align(panels['Volume'])
+    _, bars = indicators.right_align(panels['Close'])
+    
+    last = np.where(~np.isnan(panels['Close']), np.arange(len(index)), -1).max(axis=1)
+    
+    table = pd.DataFrame({
+        'Date': exchange_time(index)[last].normalize(),
+        'prev_close': indicators.forward_fill(panels['Close'])[:, -1],
+        'atr': indicators.last_mean(tr, period, min_periods=1, fill=0.0),
+        'avg_volume': indicators.average_volume(volume, window),
+        # Today's true range and volume complete these windows at refresh time
+        'tr_sum': np.nansum(tr[:, -(period - 1):], axis=1),
+        'tr_count': np.minimum(tr_count, period - 1),
+        'volume_sum': np.nansum(volume[:, -(window - 1):], axis=1),
+        'volume_count': np.minimum(volume_count, window - 1),
+    }, index=pd.Index(symbols, name='Symbol'))
+    
+    return table[bars >= BASELINE_MIN_BARS]
+
+
+class Baseline:
+    """
+    Baseline table plus the quote-only scan over it
+    Symbols missing from the table are added from their daily history on first scan,
+    like IntradayEngine seeds new symbols
+    """
+    
+    def __init__(self, table=None, path=None):
+        self.table = table if table is not None else pd.DataFrame(columns=COLUMNS).rename_axis('Symbol')
+        self.path = path
+    
+    # ------------------------------------------------------------------------
+    # EOD job
+    # ------------------------------------------------------------------------
+    
+    def build_from(self, provider, symbols, period=BASELINE_PERIOD, session_date=None, chunk_size=50):
+        """
+        Download daily history in bulk chunks and (re)build the rows of `symbols`
+        Returns: {symbol: reason} for symbols that could not be added
+        """
+        provider = LiveDataFetcher.get_provider(provider)
+        symbols = list(dict.fromkeys(symbols))
+        failed = {}
+        rows = []
+        
+        for start in range(0, len(symbols), max(1, int(chunk_size))):
+            chunk = symbols[start:start + chunk_size]
+            histories, reason = _with_retry(lambda: provider.download(chunk, period=period), 'chunk', {})
+            with METRICS.stage('indicators'):
+                rows.append(build_baseline(histories, session_date))
+            failed.update({symbol: reason or 'empty_history' for symbol in chunk if symbol not in rows[-1].index})
+        
+        rows = [part for part in rows if not part.empty]
+        if rows:
+            new = pd.concat(rows)
+            self.table = pd.concat([self.table[~self.table.index.isin(new.index)], new]) if not self.table.empty else new
+        return failed
+    
+    def save(self, path=None):
+        """Write the table as Parquet (default: the path it was loaded from, else BASELINE_PATH)"""
+        path = path or self.path or BASELINE_PATH
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        self.table.to_parquet(tmp)
+        os.replace(tmp, path)
+        self.path = path
+        return path
+    
+    @staticmethod
+    def load(path=BASELINE_PATH):
+        """Baseline saved by the EOD job (an empty one if the file does not exist yet)"""
+        if not os.path.exists(path):
+            return Baseline(path=path)
+        return Baseline(pd.read_parquet(path), path=path)
+    
+    # ------------------------------------------------------------------------
+    # Intraday refresh
+    # ------------------------------------------------------------------------
+    
+    def records(self, quotes, now=None):
+        """
+        Fetch-style records (see LiveDataFetcher._build_stock_record) from quotes joined to the baseline
+        quotes: DataProvider.quotes() frame
+        Returns: (records, {symbol: reason}) - 'stale_quote' when the quote is not from a session
+        after the baseline's, 'stale_baseline' when the baseline is older than BASELINE_MAX_GAP days
+        """
+        joined = self.table.join(quotes.rename(columns={'Date': 'quote_date'}), how='inner')
+        if joined.empty:
+            return [], {}
+        
+        quote_date = exchange_time(joined['quote_date']).normalize()
+        gap = (quote_date - pd.DatetimeIndex(joined['Date'])).days
+        failed = {symbol: 'stale_quote' for symbol in joined.index[gap <= 0]}
+        failed.update({symbol: 'stale_baseline' for symbol in joined.index[gap > BASELINE_MAX_GAP]})
+        joined = joined[(gap > 0) & (gap <= BASELINE_MAX_GAP)]
+        
+        price = joined['Close'].to_numpy(np.float64)
+        prev = joined['prev_close'].to_numpy(np.float64)
+        # Feeds without a day range still have a price
+        high = np.fmax(joined['High'].to_numpy(np.float64), price)
+        low = np.fmin(joined['Low'].to_numpy(np.float64), price)
+        volume = np.nan_to_num(joined['Volume'].to_numpy(np.float64))
+        
+        true_range = np.maximum(high, prev) - np.minimum(low, prev)
+        atr = (joined['tr_sum'].to_numpy() + true_range) / (joined['tr_count'].to_numpy() + 1)
+        avg_volume = (joined['volume_sum'].to_numpy() + volume) / (joined['volume_count'].to_numpy() + 1)
+        
+        timestamp = now or datetime.now()
+        records = []
+        for symbol, values in zip(joined.index, zip(price, prev, atr, volume, avg_volume)):
+            if np.isnan(values[0]) or values[0] == 0:
+                failed[symbol] = 'empty_history'
+                continue
+            records.append({
+                'symbol': symbol,
+                'current_price': float(values[0]),
+                'prev_close': float(values[1]),
+                'atr': float(values[2]),
+                'current_volume': float(values[3]),
+                'avg_volume': float(values[4]),
+                'success': True,
+                'timestamp': timestamp
+            })
+        return records, failed
+    
+    def scan(self, symbols, provider=None, chunk_size=QUOTE_CHUNK, session_date=None):
+        """
+        RefreshScheduler scan_fn: add symbols missing from the baseline, fetch one quote each, score
+        session_date: the session being quoted, left out of added rows (default: today)
+        Returns: (scanner table, {symbol: reason}) like processing.scan_symbols
+        """
+        provider = LiveDataFetcher.get_provider(provider)
+        symbols = list(dict.fromkeys(symbols))
+        failed = {}
+        
+        missing = [symbol for symbol in symbols if symbol not in self.table.index]
+        if missing:
+            if session_date is None:
+                session_date = pd.Timestamp.now(tz=SESSION_TZ).date()
+            failed.update(self.build_from(provider, missing, session_date=session_date))
+        
+        known = [symbol for symbol in symbols if symbol in self.table.index]
+        records = []
+        for start in range(0, len(known), max(1, int(chunk_size))):
+            chunk = known[start:start + chunk_size]
+            quotes, reason = _with_retry(lambda: provider.quotes(chunk), 'quote', EMPTY_QUOTES)
+            with METRICS.stage('indicators'):
+                chunk_records, chunk_failed = self.records(quotes)
+            records.extend(chunk_records)
+            failed.update(chunk_failed)
+            failed.update({symbol: reason or 'empty_history' for symbol in chunk
+                           if symbol not in quotes.index and symbol not in failed})
+        
+        for reason in failed.values():
+            METRICS.inc('rfactor_fetch_failures_total', reason=reason)
+        
+        # Keep the input order like fetch_multiple_stocks
+        order = {symbol: i for i, symbol in enumerate(symbols)}
+        records.sort(key=lambda data: order[data['symbol']])
+        return process_stock_data(records), failed
@@ -0,0 +1,315 @@
+"""
+Benchmark suite for the scan pipeline stages
+
+    python -m rfactor bench --out bench.json
+    python -m rfactor bench --sizes 220,2000 --stages process,filter_sort --compare bench.json
+
+Every stage runs against SyntheticProvider data (no network) for universes
+of 3 to 20,000 symbols. Results hold throughput, p50/p99 latency and peak
+traced memory per (stage, size) and are saved as JSON so two commits can
+be compared.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rfactor import fetcher, indicators
+from rfactor.calculator import RFactorCalculator
+from rfactor.fetcher import LiveDataFetcher, TokenBucket
+from rfactor.intraday import IntradayEngine
+from rfactor.processing import filter_results, process_stock_data, to_display
+from rfactor.providers import SyntheticProvider
+from rfactor.views import ScanView, ViewCache
+
+BENCH_SIZES = (3, 50, 220, 2000, 20000)
+BENCH_MIN_RUNS = 3
+BENCH_MAX_RUNS = 100
+BENCH_BUDGET = 1.0           # Seconds per (stage, size) after the minimum runs
+
+# Default dashboard filters: both signals, both directions
+ALL_SIGNALS = ["ACTIVE", "WAIT"]
+ALL_DIRECTIONS = ["UPSIDE", "DOWNSIDE"]
+
+
+class BenchData:
+    """Inputs shared by all stages for one universe size"""
+    
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.provider = SyntheticProvider(bars=30, seed=seed)
+        self.symbols = SyntheticProvider.universe(size)
+        self._records = None
+        self._panel = None
+        self._df = None
+        self._engine = None
+        self.views = None
+    
+    @property
+    def panel(self):
+        """(High, Low, Close, Volume) arrays, one row per symbol"""
+        if self._panel is None:
+            frames = [self.provider.bars_for(symbol) for symbol in self.symbols]
+            self._panel = tuple(
+                np.vstack([frame[field].to_numpy() for frame in frames])
+                for field in ('High', 'Low', 'Close', 'Volume')
+            )
+        return self._panel
+    
+    @property
+    def records(self):
+        """Fetch result dicts, as fetch_multiple_stocks returns them"""
+        if self._records is None:
+            self._records = run_fetch(self)
+        return self._records
+    
+    @property
+    def df(self):
+        """Scored scanner table"""
+        if self._df is None:
+            self._df = process_stock_data(self.records)
+        return self._df
+    
+    @property
+    def engine(self):
+        """IntradayEngine seeded with every symbol's daily bars"""
+        if self._engine is None:
+            self._engine = IntradayEngine()
+            histories = {symbol: self.provider.bars_for(symbol) for symbol in self.symbols}
+            self._engine.seed(histories, session_date=self.provider.end + pd.Timedelta(days=1))
+        return self._engine
+
+
+def run_fetch(data):
+    """Bulk fetch from the synthetic provider with the bar store and rate limit out of the way"""
+    store, limiter = LiveDataFetcher.store, fetcher.RATE_LIMITER
+    LiveDataFetcher.store = None
+    fetcher.RATE_LIMITER = TokenBucket(0, 1)
+    try:
+        return LiveDataFetcher.fetch_multiple_stocks(data.symbols, bulk=True, provider=data.provider)
+    finally:
+        LiveDataFetcher.store = store
+        fetcher.RATE_LIMITER = limiter
+
+
+def stage_fetch(data):
+    return run_fetch(data)
+
+
+def stage_atr(data):
+    high, low, close, _ = data.panel
+    for i in range(data.size):
+        LiveDataFetcher.calculate_atr(high[i], low[i], close[i])
+
+
+def stage_atr_panel(data):
+    high, low, close, volume = data.panel
+    indicators.simple_atr(high, low, close)
+    indicators.average_volume(volume)
+
+
+def stage_rfactor(data):
+    for record in data.records:
+        RFactorCalculator.calculate_rfactor(
+            record['current_price'],
+            record['prev_close'],
+            record['atr'],
+            record['current_volume'],
+            record['avg_volume']
+        )
+
+
+def stage_rfactor_batch(data):
+    RFactorCalculator.calculate_rfactor_batch(pd.DataFrame(data.records))
+
+
+def stage_process(data):
+    process_stock_data(data.records)
+
+
+def stage_filter_sort(data):
+    filter_results(data.df, ALL_SIGNALS, ALL_DIRECTIONS)
+
+
+def stage_csv_export(data):
+    to_display(filter_results(data.df, ALL_SIGNALS, ALL_DIRECTIONS)).to_csv(index=False)
+
+
+# Columns of the dashboard's results table
+VIEW_TABLE_COLUMNS = ['Symbol', 'LTP', 'Change %', 'ATR %', 'Vol Ratio',
+                      'R-Factor', 'Signal', 'Direction', 'Recommendation', 'Timestamp']
+
+
+def render_view(view):
+    """What one dashboard rerun reads from its view"""
+    view.stats
+    view.top('UPSIDE')
+    view.top('DOWNSIDE')
+    view.table(VIEW_TABLE_COLUMNS)
+
+
+def stage_view_build(data):
+    # Filters changed or a new scan arrived: the view is built from scratch
+    render_view(ScanView(data.df, ALL_SIGNALS, ALL_DIRECTIONS))
+
+
+def stage_view_rerun(data):
+    # Any other widget click: the memoized view is reused
+    if data.views is None:
+        data.views = ViewCache()
+    render_view(data.views.get(data.df, ALL_SIGNALS, ALL_DIRECTIONS))
+
+
+def stage_intraday_update(data):
+    # One trade per symbol: O(1) state update plus a scalar rescore
+    timestamp = data.provider.end + pd.Timedelta(hours=11)
+    for symbol, state in data.engine.states.items():
+        data.engine.update(symbol, state.prev_close * 1.01, 1000.0, timestamp)
+
+
+# Inputs each stage needs built before its timed runs
+STAGE_INPUTS = {
+    'atr': 'panel',
+    'atr_panel': 'panel',
+    'rfactor': 'records',
+    'rfactor_batch': 'records',
+    'process': 'records',
+    'filter_sort': 'df',
+    'csv_export': 'df',
+    'view_build': 'df',
+    'view_rerun': 'df',
+    'intraday_update': 'engine',
+}
+
+STAGES = {
+    'fetch': stage_fetch,
+    'atr': stage_atr,
+    'atr_panel': stage_atr_panel,
+    'rfactor': stage_rfactor,
+    'rfactor_batch': stage_rfactor_batch,
+    'process': stage_process,
+    'filter_sort': stage_filter_sort,
+    'csv_export': stage_csv_export,
+    'view_build': stage_view_build,
+    'view_rerun': stage_view_rerun,
+    'intraday_update': stage_intraday_update,
+}
+
+
+def measure(fn, data, min_runs=BENCH_MIN_RUNS, max_runs=BENCH_MAX_RUNS, budget=BENCH_BUDGET):
+    """
+    Time fn(data) repeatedly, then once more under tracemalloc for peak memory
+    Returns: dict with runs, p50/p99/mean latency (ms), symbols per second and peak KiB
+    """
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_runs:
+        t0 = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - t0)
+        if len(timings) >= min_runs and time.perf_counter() - started >= budget:
+            break
+    
+    # Separate run - tracing slows everything down
+    tracemalloc.start()
+    try:
+        fn(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    timings = np.array(timings)
+    p50 = float(np.percentile(timings, 50))
+    return {
+        'runs': len(timings),
+        'p50_ms': round(p50 * 1000, 4),
+        'p99_ms': round(float(np.percentile(timings, 99)) * 1000, 4),
+        'mean_ms': round(float(timings.mean()) * 1000, 4),
+        'throughput_per_s': round(data.size / p50, 1) if p50 > 0 else None,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(sizes=BENCH_SIZES, stages=None, seed=0, budget=BENCH_BUDGET, log=None):
+    """
+    Run every stage for every universe size
+    Returns: JSON-ready dict with environment metadata and one result row per (stage, size)
+    """
+    stages = list(stages or STAGES)
+    results = []
+    
+    for size in sizes:
+        data = BenchData(size, seed)
+        for stage in stages:
+            if stage in STAGE_INPUTS:
+                getattr(data, STAGE_INPUTS[stage])
+            
+            row = {'stage': stage, 'size': size}
+            row.update(measure(STAGES[stage], data, budget=budget))
+            results.append(row)
+            if log:
+                log(format_row(row))
+    
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def format_row(row, baseline=None):
+    """One aligned report line, with the p50 change against a baseline row if given"""
+    line = (f"{row['stage']:<14} {row['size']:>6} | p50 {row['p50_ms']:>10.3f} ms | "
+            f"p99 {row['p99_ms']:>10.3f} ms | {row['throughput_per_s'] or 0:>12,.0f} sym/s | "
+            f"peak {row['peak_kib']:>10,.1f} KiB")
+    if baseline:
+        change = (row['p50_ms'] / baseline['p50_ms'] - 1) * 100 if baseline['p50_ms'] else 0.0
+        line += f" | {change:+.1f}% vs baseline"
+    return line
+
+
+def compare(report, baseline):
+    """Report lines for every (stage, size) present in both runs"""
+    previous = {(row['stage'], row['size']): row for row in baseline['results']}
+    return [
+        format_row(row, previous.get((row['stage'], row['size'])))
+        for row in report['results']
+    ]
+
+
+def save_report(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,218 @@
+"""
+R-Factor scoring - Method 1 (scalar and vectorized)
+"""
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# R-FACTOR CALCULATION - METHOD 1 (YOUR FRIEND'S METHOD)
+# ============================================================================
+
+# Category codes stored in the scanner table -> labels shown to the user
+SIGNAL_LABELS = {
+    'ACTIVE': "🟢 ACTIVE",
+    'WAIT': "🟡 WAIT",
+    'ERROR': "⚫ ERROR",
+}
+
+DIRECTION_LABELS = {
+    'UPSIDE': "UPSIDE ↑",
+    'DOWNSIDE': "DOWNSIDE ↓",
+    'N/A': "N/A",
+}
+
+RECOMMENDATION_LABELS = {
+    'STRONG_CALL': "⭐⭐⭐ STRONG CALL - High Probability",
+    'STRONG_PUT': "⭐⭐⭐ STRONG PUT - High Probability",
+    'CALL': "⭐⭐ CALL Option - Active Signal",
+    'PUT': "⭐⭐ PUT Option - Active Signal",
+    'WATCH': "⭐ Watch for confirmation",
+    'AVOID': "⚠️ Avoid - Weak momentum",
+    'ERROR': "⚫ ERROR - invalid inputs",
+}
+
+class RFactorCalculator:
+    """High Accuracy R-Factor Calculator - Method 1"""
+    
+    @staticmethod
+    def calculate_rfactor(current_price, prev_close, atr, current_volume, avg_volume):
+        """
+        Method 1: Your Friend's Accurate Method
+        R-Factor = |% Change| × K
+        Invalid inputs give a '⚫ ERROR' row, with the exception text under 'error'
+        """
+        try:
+            # Calculate % Change
+            pct_change = ((current_price - prev_close) / prev_close) * 100
+            
+            # Calculate ATR%
+            atr_pct = (atr / current_price) * 100
+            
+            # Calculate Volume Ratio
+            volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1.0
+            
+            # Calculate K Factor (Dynamic based on stock characteristics)
+            volume_boost = np.sqrt(volume_ratio)
+            base_score = 0.75
+            abs_change = abs(pct_change)
+            
+            if abs_change >= 5.0:
+                # High % change stocks (like TATAELXSI 7.98%)
+                k_factor = base_score + (volume_boost - 1) * 0.05
+            elif abs_change >= 2.5:
+                # Medium % change stocks (like SHRIRAMFIN 3.71%)
+                k_factor = base_score + (volume_boost - 1) * 0.25 + (atr_pct * 0.1)
+            else:
+                # Low % change stocks (like HDFCAMC -1.98%)
+                k_factor = 1.0 + (volume_boost - 1) * 0.5 + (atr_pct * 0.15)
+            
+            # Calculate R-Factor
+            rfactor = abs(pct_change) * k_factor
+            
+            # Determine direction and signal
+            direction = "UPSIDE ↑" if pct_change > 0 else "DOWNSIDE ↓"
+            signal = "🟢 ACTIVE" if rfactor >= 4.0 else "🟡 WAIT"
+            
+            return {
+                'rfactor': round(rfactor, 2),
+                'pct_change': round(pct_change, 2),
+                'atr_pct': round(atr_pct, 2),
+                'volume_ratio': round(volume_ratio, 2),
+                'k_factor': round(k_factor, 2),
+                'direction': direction,
+                'signal': signal,
+                'recommendation': RFactorCalculator._get_recommendation(rfactor, direction)
+            }
+        
+        except Exception as e:
+            return {
+                'rfactor': 0,
+                'pct_change': 0,
+                'atr_pct': 0,
+                'volume_ratio': 0,
+                'k_factor': 0,
+                'direction': 'N/A',
+                'signal': '⚫ ERROR',
+                'recommendation': RECOMMENDATION_LABELS['ERROR'],
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _get_recommendation(rfactor, direction):
+        """Get trading recommendation"""
+        if rfactor >= 6.0:
+            action = "CALL" if "UPSIDE" in direction else "PUT"
+            return f"⭐⭐⭐ STRONG {action} - High Probability"
+        elif rfactor >= 4.0:
+            action = "CALL" if "UPSIDE" in direction else "PUT"
+            return f"⭐⭐ {action} Option - Active Signal"
+        elif rfactor >= 3.0:
+            return "⭐ Watch for confirmation"
+        else:
+            return "⚠️ Avoid - Weak momentum"
+    
+    @staticmethod
+    def calculate_rfactor_batch(current_price, prev_close=None, atr=None, current_volume=None, avg_volume=None,
+                                labels=True):
+        """
+        Vectorized Method 1 over whole columns
+        Accepts arrays, or a DataFrame with current_price/prev_close/atr/current_volume/avg_volume
+        Returns: DataFrame with the same keys as calculate_rfactor (no 'error'), one row per input
+        labels=False returns direction/signal/recommendation as Categoricals of the
+        *_LABELS codes (UPSIDE, ACTIVE, STRONG_CALL, ...) instead of display strings
+        """
+        if isinstance(current_price, pd.DataFrame):
+            frame = current_price
+            current_price = frame['current_price']
+            prev_close = frame['prev_close']
+            atr = frame['atr']
+            current_volume = frame['current_volume']
+            avg_volume = frame['avg_volume']
+        
+        price = np.asarray(current_price, dtype=np.float64)
+        prev = np.asarray(prev_close, dtype=np.float64)
+        atr = np.asarray(atr, dtype=np.float64)
+        volume = np.asarray(current_volume, dtype=np.float64)
+        avg = np.asarray(avg_volume, dtype=np.float64)
+        
+        # Rows the scalar path rejects with ZeroDivisionError
+        error = (prev == 0) | (price == 0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct_change = ((price - prev) / prev) * 100
+            atr_pct = (atr / price) * 100
+            volume_ratio = np.where(avg > 0, volume / avg, 1.0)
+            
+            volume_boost = np.sqrt(volume_ratio)
+            base_score = 0.75
+            abs_change = np.abs(pct_change)
+            
+            # Same three tiers as calculate_rfactor
+            k_factor = np.select(
+                [abs_change >= 5.0, abs_change >= 2.5],
+                [
+                    base_score + (volume_boost - 1) * 0.05,
+                    base_score + (volume_boost - 1) * 0.25 + (atr_pct * 0.1)
+                ],
+                default=1.0 + (volume_boost - 1) * 0.5 + (atr_pct * 0.15)
+            )
+            
+            rfactor = abs_change * k_factor
+        
+        upside = pct_change > 0
+        
+        # Integer codes into the *_LABELS key order
+        direction = np.where(upside, 0, 1)
+        signal = np.where(rfactor >= 4.0, 0, 1)
+        recommendation = np.select(
+            [(rfactor >= 6.0) & upside, rfactor >= 6.0,
+             (rfactor >= 4.0) & upside, rfactor >= 4.0,
+             rfactor >= 3.0],
+            [0, 1, 2, 3, 4],
+            default=5
+        )
+        
+        numbers = {
+            # rfactor/k_factor are numpy scalars in the scalar path, the rest Python floats
+            'rfactor': np.round(rfactor, 2),
+            'pct_change': RFactorCalculator._round_half_exact(pct_change),
+            'atr_pct': RFactorCalculator._round_half_exact(atr_pct),
+            'volume_ratio': RFactorCalculator._round_half_exact(volume_ratio),
+            'k_factor': np.round(k_factor, 2),
+        }
+        
+        if error.any():
+            numbers = {key: np.where(error, 0.0, values) for key, values in numbers.items()}
+            direction[error] = list(DIRECTION_LABELS).index('N/A')
+            signal[error] = list(SIGNAL_LABELS).index('ERROR')
+            recommendation[error] = list(RECOMMENDATION_LABELS).index('ERROR')
+        
+        result = pd.DataFrame(numbers)
+        for column, codes, mapping in (
+            ('direction', direction, DIRECTION_LABELS),
+            ('signal', signal, SIGNAL_LABELS),
+            ('recommendation', recommendation, RECOMMENDATION_LABELS)
+        ):
+            categories = list(mapping.values()) if labels else list(mapping)
+            result[column] = pd.Categorical.from_codes(codes, categories=categories)
+            if labels:
+                result[column] = result[column].astype(object)
+        
+        return result
+    
+    @staticmethod
+    def _round_half_exact(values, ndigits=2):
+        """
+        np.round() matching Python's round() for floats
+        np.round scales by 10^ndigits first, so near-halfway values can differ - redo those in Python
+        """
+        rounded = np.round(values, ndigits)
+        with np.errstate(invalid='ignore'):
+            scaled = np.abs(values) * (10 ** ndigits)
+            near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        
+        for i in np.flatnonzero(near_half):
+            rounded[i] = round(float(values[i]), ndigits)
+        
+        return rounded
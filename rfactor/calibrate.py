@@ -0,0 +1,213 @@
+"""
+Parameter-sweep calibration of the R-Factor constants
+
+RFactorCalculator.calculate_rfactor was tuned by hand against three examples.
+This scores a grid of parameter combinations over every symbol-day of a
+multi-year history in one broadcast NumPy computation
+(combinations x symbol-days, chunked to bound memory) and reports, per
+combination, how many ACTIVE signals it fires and how the days after them went.
+
+    inputs, failed = load_inputs(symbols, provider, period="5y")
+    results = sweep(inputs, param_grid(active=(3.5, 4.0, 4.5), base=(0.6, 0.75, 0.9)))
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from rfactor import backtest
+from rfactor.backtest import BACKTEST_HORIZONS, BACKTEST_PERIOD, BACKTEST_WORKERS
+
+# Constants of calculate_rfactor, by parameter name
+DEFAULT_PARAMS = {
+    'high_tier': 5.0,        # |% change| from here: high tier
+    'mid_tier': 2.5,         # |% change| from here: medium tier
+    'base': 0.75,            # K base of the high and medium tiers
+    'low_base': 1.0,         # K base of the low tier
+    'high_volume': 0.05,     # Volume-boost weights per tier
+    'mid_volume': 0.25,
+    'low_volume': 0.5,
+    'mid_atr': 0.1,          # ATR % weights per tier
+    'low_atr': 0.15,
+    'active': 4.0,           # R-Factor from here: ACTIVE
+}
+
+# Default sweep - 3^7 x 4 = 8,748 combinations around the hand-tuned values
+DEFAULT_GRID = {
+    'high_tier': (4.0, 5.0, 6.0),
+    'mid_tier': (2.0, 2.5, 3.0),
+    'base': (0.6, 0.75, 0.9),
+    'mid_volume': (0.15, 0.25, 0.35),
+    'low_volume': (0.3, 0.5, 0.7),
+    'mid_atr': (0.05, 0.1, 0.15),
+    'low_atr': (0.1, 0.15, 0.2),
+    'active': (3.5, 4.0, 4.5, 5.0),
+}
+
+CALIBRATE_CHUNK_BYTES = 256 * 1024 ** 2   # Working memory per chunk of combinations
+CALIBRATE_MIN_SIGNALS = 30                # Fewer signals than this rank last
+
+# ============================================================================
+# GRID
+# ============================================================================
+
+def param_grid(**values):
+    """
+    Every combination of the given parameter values; parameters not given keep DEFAULT_PARAMS
+    Returns: DataFrame with one column per parameter, one row per combination
+    """
+    unknown = set(values) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    
+    axes = {name: np.atleast_1d(np.asarray(values.get(name, default), dtype=np.float64))
+            for name, default in DEFAULT_PARAMS.items()}
+    rows = itertools.product(*axes.values())
+    return pd.DataFrame(list(rows), columns=list(axes))
+
+def parse_grid(specs):
+    """
+    Grid values from 'name=v1,v2,...' or 'name=start:stop:step' (stop included) strings
+    Returns: {name: values} for param_grid
+    """
+    grid = {}
+    for spec in specs:
+        name, _, text = spec.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_PARAMS or not text:
+            raise ValueError(f"Bad grid spec '{spec}' (parameters: {', '.join(DEFAULT_PARAMS)})")
+        if ':' in text:
+            start, stop, step = (float(part) for part in text.split(':'))
+            grid[name] = tuple(round(float(value), 10) for value in np.arange(start, stop + step / 2, step))
+        else:
+            grid[name] = tuple(float(part) for part in text.split(','))
+    return grid
+
+# ============================================================================
+# SWEEP
+# ============================================================================
+
+def load_inputs(symbols, provider=None, period=BACKTEST_PERIOD, horizons=BACKTEST_HORIZONS,
+                workers=BACKTEST_WORKERS, shard_size=None):
+    """
+    Scoring inputs for every symbol-day (backtest.signal_inputs), downloaded in shards on a process pool
+    Returns: (inputs DataFrame, {symbol: failure reason})
+    """
+    return backtest.run_backtest(
+        symbols, provider, period, horizons, workers, shard_size, score_fn=backtest.signal_inputs
+    )
+
+def _features(inputs):
+    """Per symbol-day values the parameters act on - the same arithmetic as calculate_rfactor_batch"""
+    price = inputs['Close'].to_numpy(np.float64)
+    prev = inputs['Prev Close'].to_numpy(np.float64)
+    atr = inputs['ATR'].to_numpy(np.float64)
+    volume = inputs['Volume'].to_numpy(np.float64)
+    avg = inputs['Avg Volume'].to_numpy(np.float64)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_change = ((price - prev) / prev) * 100
+        atr_pct = (atr / price) * 100
+        volume_ratio = np.where(avg > 0, volume / avg, 1.0)
+    
+    # Days the live scan could not score (zero previous close, missing inputs) take no part
+    valid = (prev > 0) & np.isfinite(pct_change) & np.isfinite(atr_pct) & np.isfinite(volume_ratio)
+    return np.abs(pct_change), atr_pct, np.sqrt(volume_ratio) - 1, pct_change > 0, valid
+
+def sweep(inputs, grid=None, horizons=BACKTEST_HORIZONS, chunk_bytes=CALIBRATE_CHUNK_BYTES):
+    """
+    Score every combination of `grid` (param_grid frame, default: DEFAULT_GRID) on every symbol-day
+    Forward returns are signed by direction like backtest.summarize
+    Returns: grid plus Signals, Signal % and per horizon Avg <h>d % / Hit <h>d % of the ACTIVE days
+    """
+    if grid is None:
+        grid = param_grid(**DEFAULT_GRID)
+    grid = grid.reset_index(drop=True)
+    
+    abs_change, atr_pct, boost, upside, valid = _features(inputs)
+    abs_change, atr_pct, boost, upside = abs_change[valid], atr_pct[valid], boost[valid], upside[valid]
+    days = len(abs_change)
+    
+    # Per horizon: signed forward return (NaN as 0), known flag, hit flag - as matrix columns,
+    # so one (combinations x days) @ (days x 3H) product gives every statistic
+    columns = []
+    for horizon in horizons:
+        forward = inputs[f'Fwd {horizon}d %'].to_numpy(np.float64)[valid]
+        signed = np.where(upside, forward, -forward)
+        known = ~np.isnan(signed)
+        columns += [np.where(known, signed, 0.0), known, known & (signed > 0)]
+    outcomes = np.column_stack(columns).astype(np.float32) if columns else np.zeros((days, 0), np.float32)
+    
+    # R-Factor does not depend on the ACTIVE threshold: score each distinct shape of the
+    # other parameters once and compare it against every threshold
+    shape_names = [name for name in DEFAULT_PARAMS if name != 'active']
+    shape_codes = grid.groupby(shape_names, sort=False).ngroup().to_numpy()
+    shapes = grid[shape_names].drop_duplicates()
+    thresholds = np.unique(grid['active'].to_numpy(np.float64))
+    params = {name: shapes[name].to_numpy(np.float64)[:, None] for name in shape_names}
+    
+    signals = np.zeros((len(shapes), len(thresholds)), dtype=np.int64)
+    stats = np.zeros((len(shapes), len(thresholds), outcomes.shape[1]))
+    
+    # ~5 float64 (shapes x days) temporaries are alive at once
+    chunk = max(1, int(chunk_bytes // (max(days, 1) * 8 * 5)))
+    for start in range(0, len(shapes), chunk):
+        p = {name: values[start:start + chunk] for name, values in params.items()}
+        end = start + len(p['base'])
+        
+        with np.errstate(invalid='ignore'):
+            # Same three tiers as calculate_rfactor, one row per parameter shape
+            k_factor = np.where(
+                abs_change >= p['high_tier'],
+                p['base'] + boost * p['high_volume'],
+                np.where(
+                    abs_change >= p['mid_tier'],
+                    p['base'] + boost * p['mid_volume'] + atr_pct * p['mid_atr'],
+                    p['low_base'] + boost * p['low_volume'] + atr_pct * p['low_atr']
+                )
+            )
+            rfactor = abs_change * k_factor
+        del k_factor
+        
+        for t, threshold in enumerate(thresholds):
+            active = (rfactor >= threshold).astype(np.float32)
+            signals[start:end, t] = np.count_nonzero(active, axis=1)
+            stats[start:end, t] = active @ outcomes
+    
+    # Back to one row per grid combination
+    t_index = np.searchsorted(thresholds, grid['active'].to_numpy(np.float64))
+    signals = signals[shape_codes, t_index]
+    stats = stats[shape_codes, t_index]
+    
+    results = grid.copy()
+    results['Signals'] = signals
+    results['Signal %'] = np.round(signals / max(days, 1) * 100, 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i, horizon in enumerate(horizons):
+            total, count, hits = stats[:, 3 * i], stats[:, 3 * i + 1], stats[:, 3 * i + 2]
+            results[f'Avg {horizon}d %'] = np.round(total / count, 3)
+            results[f'Hit {horizon}d %'] = np.round(hits / count * 100, 2)
+    return results
+
+def rank(results, by=None, min_signals=CALIBRATE_MIN_SIGNALS):
+    """
+    Results best first by `by` (default: Avg % of the longest horizon);
+    combinations with fewer than min_signals signals go last
+    """
+    if by is None:
+        horizons = [int(column.split()[1][:-1]) for column in results if column.startswith('Avg ')]
+        by = f'Avg {max(horizons)}d %'
+    
+    enough = results['Signals'] >= min_signals
+    return pd.concat([
+        results[enough].sort_values(by, ascending=False),
+        results[~enough].sort_values(by, ascending=False)
+    ])
+
+def is_default(results):
+    """Mask of the rows that use calculate_rfactor's current constants"""
+    mask = np.ones(len(results), dtype=bool)
+    for name, value in DEFAULT_PARAMS.items():
+        mask &= np.isclose(results[name].to_numpy(np.float64), value)
+    return mask
@@ -0,0 +1,374 @@
+"""
+Yahoo chart endpoint over pooled keep-alive HTTP (asyncio, standard library only)
+
+Every yfinance Ticker.history() call pays for its own session setup, DataFrame
+and timezone handling, so per-symbol latency - not bandwidth - bounds a scan.
+ChartProvider (rfactor.providers) instead sends every request of a download
+through one event loop and a small pool of keep-alive connections: many
+symbols are in flight at once without a thread or a TLS handshake each. The
+JSON chart payload is parsed straight into NumPy arrays (parse_chart).
+
+ChartServer is a local stand-in for the endpoint. It serves recorded payloads
+(<TICKER>-<interval>.json) or payloads rendered from any DataProvider, for
+tests, benchmarks and air-gapped boxes:
+
+    server = ChartServer(SyntheticProvider(latency=0.05)).start()
+    provider = ChartProvider(server.url)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import ssl
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from rfactor.fetcher import FetchError
+from rfactor.metrics import METRICS
+
+CHART_URL = os.environ.get("RFACTOR_CHART_URL", "https://query1.finance.yahoo.com")
+CHART_PATH = "/v8/finance/chart/"
+CHART_CONNECTIONS = 8        # Keep-alive connections per host = requests in flight
+CHART_TIMEOUT = 10.0         # Seconds per request, connect included
+CHART_GMTOFFSET = 19800      # Seconds east of UTC of the exchange (NSE: +05:30)
+CHART_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# One chart payload as arrays - timestamps in epoch seconds, OHLCV float64 (null -> NaN)
+ChartBars = namedtuple('ChartBars', 'timestamps gmtoffset open high low close volume')
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+
+def parse_chart(body):
+    """
+    Arrays of one chart payload, adjusted for splits and dividends like yfinance's auto_adjust
+    Raises: FetchError - 'empty_history' for unknown symbols and empty ranges
+    Returns: ChartBars
+    """
+    try:
+        chart = json.loads(body)['chart']
+    except (ValueError, KeyError, TypeError) as e:
+        raise FetchError('error', f"Bad chart payload: {e}") from e
+    
+    error = chart.get('error')
+    if error:
+        reason = 'empty_history' if error.get('code') == 'Not Found' else 'error'
+        raise FetchError(reason, error.get('description') or error.get('code') or 'chart error')
+    
+    result = (chart.get('result') or [None])[0]
+    timestamps = (result or {}).get('timestamp')
+    if not timestamps:
+        raise FetchError('empty_history', "No bars in range")
+    
+    indicators = result.get('indicators') or {}
+    quote = (indicators.get('quote') or [{}])[0]
+    missing = [None] * len(timestamps)
+    open_, high, low, close, volume = (
+        np.asarray(quote.get(name) or missing, dtype=np.float64)
+        for name in ('open', 'high', 'low', 'close', 'volume')
+    )
+    
+    adjclose = (indicators.get('adjclose') or [{}])[0].get('adjclose')
+    if adjclose is not None:
+        adjclose = np.asarray(adjclose, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = adjclose / close
+        open_, high, low, close = open_ * ratio, high * ratio, low * ratio, adjclose
+    
+    gmtoffset = int((result.get('meta') or {}).get('gmtoffset', CHART_GMTOFFSET))
+    return ChartBars(np.asarray(timestamps, dtype=np.int64), gmtoffset, open_, high, low, close, volume)
+
+def bars_frame(bars, intraday=False):
+    """
+    DataFrame like DataProvider.history() from ChartBars - naive exchange-local dates
+    (or bar start times when intraday), oldest first, bars without a close dropped
+    """
+    local = bars.timestamps + bars.gmtoffset
+    keep = ~np.isnan(bars.close)
+    if intraday:
+        stamps, name = local, 'Datetime'
+    else:
+        stamps, name = local // 86400 * 86400, 'Date'
+        # The forming bar can repeat the last session's date - the newest wins
+        keep &= np.append(stamps[1:] != stamps[:-1], True)
+    
+    index = pd.DatetimeIndex(stamps[keep].astype('datetime64[s]'), name=name)
+    return pd.DataFrame(
+        {column: values[keep] for column, values in zip(COLUMNS, bars[2:])},
+        index=index
+    )
+
+def chart_payload(hist, ticker, gmtoffset=CHART_GMTOFFSET):
+    """Chart JSON bytes for a DataProvider frame (naive exchange-local index) - what ChartServer serves"""
+    timestamps = pd.DatetimeIndex(hist.index).as_unit('s').asi8 - gmtoffset
+    quote = {}
+    for column in COLUMNS:
+        values = hist[column].to_numpy(np.float64)
+        quote[column.lower()] = np.where(np.isnan(values), None, values).tolist()
+    
+    return json.dumps({'chart': {
+        'result': [{
+            'meta': {'symbol': ticker, 'gmtoffset': gmtoffset},
+            'timestamp': timestamps.tolist(),
+            'indicators': {'quote': [quote], 'adjclose': [{'adjclose': quote['close']}]},
+        }],
+        'error': None,
+    }}).encode()
+
+def error_payload(code, description):
+    """Chart JSON bytes of a failed request (Yahoo answers unknown symbols this way with a 404)"""
+    return json.dumps({'chart': {'result': None, 'error': {'code': code, 'description': description}}}).encode()
+
+# ============================================================================
+# HTTP CLIENT
+# ============================================================================
+
+class AsyncHTTPClient:
+    """
+    Minimal HTTP/1.1 GET client with a keep-alive connection pool per host
+    Use from one event loop; at most `connections` requests per host are in flight
+    """
+    
+    def __init__(self, connections=CHART_CONNECTIONS, timeout=CHART_TIMEOUT, headers=None):
+        self.connections = max(1, int(connections))
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._idle = {}    # (scheme, host, port) -> [(reader, writer)] ready for reuse
+        self._slots = {}   # (scheme, host, port) -> Semaphore bounding requests in flight
+        self._ssl = None
+    
+    async def get(self, url):
+        """
+        One GET request, on an idle pooled connection when there is one
+        Raises: TimeoutError, ConnectionError / OSError
+        Returns: (status code, body bytes) - gzip bodies are decompressed
+        """
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        
+        slots = self._slots.setdefault(origin, asyncio.Semaphore(self.connections))
+        async with slots:
+            return await asyncio.wait_for(self._request(origin, parts.netloc, target), self.timeout)
+    
+    async def _request(self, origin, host, target):
+        idle = self._idle.setdefault(origin, [])
+        while idle:
+            reader, writer = idle.pop()
+            if writer.is_closing() or reader.at_eof():
+                writer.close()
+                continue
+            try:
+                response = await self._exchange(origin, reader, writer, host, target)
+                METRICS.inc('rfactor_http_connections_total', result='reused')
+                return response
+            except (ConnectionError, EOFError):
+                # The server dropped the idle connection - GET is safe to send again
+                continue
+        
+        reader, writer = await self._open(origin)
+        METRICS.inc('rfactor_http_connections_total', result='new')
+        return await self._exchange(origin, reader, writer, host, target)
+    
+    async def _open(self, origin):
+        scheme, host, port = origin
+        context = None
+        if scheme == 'https':
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        return await asyncio.open_connection(host, port, ssl=context)
+    
+    async def _exchange(self, origin, reader, writer, host, target):
+        """Send one request and read the whole response; the connection goes back to the pool if it can"""
+        lines = [f"GET {target} HTTP/1.1", f"Host: {host}", "Accept-Encoding: gzip", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        
+        try:
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("Connection closed before the response")
+            version, status = status_line.split(None, 2)[:2]
+            status = int(status)
+            
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            if status < 200 or status in (204, 304):
+                body = b''
+            elif headers.get('transfer-encoding', '').lower() == 'chunked':
+                body = await self._read_chunked(reader)
+            elif 'content-length' in headers:
+                body = await reader.readexactly(int(headers['content-length']))
+            else:
+                # Delimited by the server closing the connection
+                body = await reader.read()
+                headers['connection'] = 'close'
+        except BaseException:
+            # Half-read responses (timeouts, cancellation) leave the connection unusable
+            writer.close()
+            raise
+        
+        if version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close':
+            self._idle[origin].append((reader, writer))
+        else:
+            writer.close()
+        
+        if headers.get('content-encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return status, body
+    
+    @staticmethod
+    async def _read_chunked(reader):
+        parts = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Trailer headers up to the blank line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    
+    def close(self):
+        """Close every idle connection"""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+# ============================================================================
+# LOCAL STAND-IN SERVER
+# ============================================================================
+
+class _ChartHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler answering chart GETs via server.chart.respond()"""
+    
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes - without this every response waits on a delayed ACK
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        status, body = self.server.chart.respond(parts.path, query)
+        
+        encoding = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if encoding:
+            body = gzip.compress(body, compresslevel=1)
+        
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if encoding:
+                self.send_header('Content-Encoding', 'gzip')
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timed out) - nothing to answer
+            self.close_connection = True
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class _ChartHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # A pooled client opens all its connections at once
+    request_queue_size = 128
+
+
+class ChartServer:
+    """
+    Local stand-in for the chart endpoint, served from a background thread
+    source: DataProvider that renders the payloads (replay recordings, synthetic bars)
+    directory: recorded payloads, <dir>/<TICKER>-<interval>.json (see ChartProvider record_dir)
+    suffix: stripped from tickers before asking `source` ("TCS.NS" -> "TCS")
+    """
+    
+    STATUS = {'rate_limited': 429, 'timeout': 504, 'connection': 503}
+    
+    def __init__(self, source=None, directory=None, host='127.0.0.1', port=0, suffix='.NS'):
+        if source is None and directory is None:
+            raise ValueError("ChartServer needs a source provider or a payload directory")
+        self.source = source
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.suffix = suffix
+        self._server = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        """Start serving on a daemon thread (port 0 picks a free port)"""
+        self._server = _ChartHTTPServer((self.host, self.port), _ChartHandler)
+        self._server.chart = self
+        threading.Thread(target=self._server.serve_forever, name='rfactor-chart-server', daemon=True).start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def respond(self, path, query):
+        """Returns: (status code, chart JSON bytes) for one GET"""
+        if not path.startswith(CHART_PATH):
+            return 404, error_payload('Not Found', f"Unknown path {path}")
+        ticker = unquote(path[len(CHART_PATH):])
+        interval = query.get('interval', '1d')
+        
+        if self.directory is not None:
+            try:
+                with open(os.path.join(self.directory, f"{ticker}-{interval}.json"), 'rb') as f:
+                    return 200, f.read()
+            except OSError:
+                return 404, error_payload('Not Found', "No data found, symbol may be delisted")
+        
+        symbol = ticker[:-len(self.suffix)] if self.suffix and ticker.endswith(self.suffix) else ticker
+        try:
+            if interval != '1d':
+                hist = self.source.intraday([symbol], interval, period=query.get('range', '1d')).get(symbol)
+            elif 'period1' in query:
+                hist = self.source.history(symbol, start=pd.Timestamp(int(query['period1']), unit='s').normalize())
+            else:
+                hist = self.source.history(symbol, period=query.get('range', '1mo'))
+        except FetchError as e:
+            code = self.STATUS.get(e.reason, 404)
+            return code, error_payload('Not Found' if code == 404 else e.reason, str(e))
+        except (ValueError, NotImplementedError) as e:
+            return 400, error_payload('Bad Request', str(e))
+        
+        if hist is None or hist.empty:
+            return 404, error_payload('Not Found', "No data found, symbol may be delisted")
+        return 200, chart_payload(hist, ticker)
@@ -0,0 +1,891 @@
+"""
+Headless scanner entry point
+
+    python -m rfactor scan --universe fno --out results.parquet
+    python -m rfactor scan --symbols TCS,INFY --offline --out -
+    python -m rfactor scan --universe fno --shared --out results.csv
+    python -m rfactor scan --universe fno --publish data/published --out results.parquet
+    python -m rfactor serve --dir data/published --port 8780
+    python -m rfactor scan --provider synthetic --count 10000 --out big.parquet
+    python -m rfactor scan --universe-file nse_all.csv --processes 8 --listen 0.0.0.0:8790 --remote-workers 16 --authkey "$KEY"
+    python -m rfactor worker --connect coordinator-host:8790 --authkey "$KEY"
+    python -m rfactor record --universe fno --period 1y --dir recordings/
+    python -m rfactor scan --provider replay --replay-dir recordings/ --as-of 2025-03-31
+    python -m rfactor chart-server --provider synthetic --latency 0.05 --port 8765
+    python -m rfactor scan --provider chart --chart-url http://127.0.0.1:8765 --no-bulk --out -
+    python -m rfactor bench --out bench.json
+    python -m rfactor backtest --period 5y --workers 8 --out signals.parquet
+    python -m rfactor calibrate --grid active=3.5:5:0.25 --grid base=0.6,0.75,0.9 --out calibration.csv
+    python -m rfactor intraday --universe fno --every 30 --top 15
+    python -m rfactor baseline --universe fno            # after the close
+    python -m rfactor scan --universe fno --quotes --out results.csv
+    python -m rfactor scan --universe fno --timeframes 1h,1wk --out results.parquet
+    python -m rfactor universe --file watchlist.txt --forget all
+    python -m rfactor intraday --universe fno --alert-webhook http://127.0.0.1:8795/alerts --alert-stdout
+    python -m rfactor alert-receiver --port 8795 --out alerts.jsonl
+
+Heavy modules (pandas, yfinance) are imported inside the commands, and
+Streamlit/plotly never are, so the CLI runs from cron or CI without the
+dashboard runtime.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from rfactor.universe import FNO_DATA_CSV, UNIVERSES
+
+OUTPUT_FORMATS = ('csv', 'json', 'parquet')
+LIVE_PROVIDERS = ('yfinance', 'chart')    # Network sources: bar store and rate limit on by default
+
+
+def resolve_symbols(universe=None, symbols=None, provider=None, count=None, universe_file=None):
+    """
+    Symbols from --symbols (comma separated), else a universe file, else a named universe,
+    else the provider's own (recorded / generated) symbols, else the F&O list
+    """
+    from rfactor.universe import load_universe, normalize_symbols
+    
+    if symbols:
+        return normalize_symbols(symbols.split(','))
+    if universe_file:
+        try:
+            return load_universe(universe_file)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"❌ Could not read {universe_file}: {e}")
+    if universe:
+        return list(UNIVERSES[universe])
+    
+    name = getattr(provider, 'name', None)
+    if name == 'replay':
+        return provider.symbols()
+    if name == 'synthetic':
+        return provider.universe(count or len(UNIVERSES['fno']))
+    return list(UNIVERSES['fno'])
+
+
+def build_provider(args):
+    """DataProvider from the --provider options"""
+    from rfactor.providers import ChartProvider, ReplayProvider, SyntheticProvider, YFinanceProvider
+    
+    if args.provider == 'chart':
+        return ChartProvider(args.chart_url, record_dir=args.chart_record)
+    if args.provider == 'replay':
+        if not args.replay_dir:
+            raise SystemExit("--provider replay needs --replay-dir")
+        return ReplayProvider(args.replay_dir, as_of=args.as_of)
+    if args.provider == 'synthetic':
+        return SyntheticProvider(
+            bars=args.bars,
+            seed=args.seed,
+            latency=args.latency,
+            failure_rate=args.failure_rate,
+            end=args.as_of
+        )
+    return YFinanceProvider()
+
+
+def _configure_fetcher(args):
+    """Point the bar store at --store and set the rate limit; local providers skip both unless asked"""
+    from rfactor import fetcher
+    if args.store:
+        # Opened on first use, like the default path
+        fetcher.LiveDataFetcher.store = args.store
+    elif args.provider not in LIVE_PROVIDERS:
+        # Keep replayed / generated bars out of the live store
+        fetcher.LiveDataFetcher.store = None
+    
+    # Local providers are not throttled unless asked to be
+    rate_limit = args.rate_limit
+    if rate_limit is None and args.provider not in LIVE_PROVIDERS:
+        rate_limit = 0
+    if rate_limit is not None:
+        fetcher.RATE_LIMITER = fetcher.TokenBucket(rate_limit, fetcher.FETCH_BURST)
+    
+    return fetcher.LiveDataFetcher
+
+
+def write_results(df, out, fmt=None):
+    """
+    Write the scanner table as CSV, JSON (records) or Parquet; '-' writes to stdout
+    CSV/JSON get the display labels, Parquet keeps the typed columns
+    """
+    if fmt is None:
+        ext = os.path.splitext(out)[1].lower().lstrip('.')
+        fmt = ext if ext in OUTPUT_FORMATS else 'csv'
+    
+    if out == '-':
+        if fmt == 'parquet':
+            raise ValueError("parquet output needs a file path")
+        out = sys.stdout
+    elif os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    
+    if fmt != 'parquet':
+        from rfactor.processing import to_display
+        df = to_display(df)
+    
+    if fmt == 'csv':
+        df.to_csv(out, index=False)
+    elif fmt == 'json':
+        df.to_json(out, orient='records', force_ascii=False, indent=2)
+    else:
+        df.to_parquet(out, index=False)
+
+
+def _write_metrics(args):
+    """Export the pipeline metrics to --metrics-out, if given"""
+    if not args.metrics_out:
+        return
+    from rfactor.metrics import METRICS
+    try:
+        METRICS.write(args.metrics_out)
+    except OSError as e:
+        print(f"⚠️ Could not write metrics to {args.metrics_out}: {e}", file=sys.stderr)
+
+
+def _parse_address(text):
+    """'host:port' (or ':port' for 127.0.0.1 - other hosts must be named) -> (host, port)"""
+    host, _, port = text.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise SystemExit(f"❌ Bad address {text!r}, expected host:port")
+
+
+def _build_coordinator(args):
+    """ScanCoordinator from --processes / --listen (None: scan in this process)"""
+    if args.processes <= 1 and not args.listen:
+        return None
+    from rfactor.coordinator import QueueExecutor, ScanCoordinator
+    
+    if not args.listen:
+        return ScanCoordinator(workers=args.processes)
+    
+    local = args.processes if args.processes > 1 else 0
+    try:
+        executor = QueueExecutor(_parse_address(args.listen), args.authkey, local_workers=local)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    if not args.authkey and args.remote_workers:
+        print("⚠️ No --authkey: only this host's --processes workers can connect", file=sys.stderr)
+    host, port = executor.address
+    print(f"✅ Shard queue on {host}:{port} - start workers with "
+          f"`python -m rfactor worker --connect HOST:{port}`", file=sys.stderr)
+    return ScanCoordinator(workers=local + args.remote_workers, executor=executor)
+
+
+def _format_shard_report(report):
+    """One summary line of ScanCoordinator.last_report"""
+    seconds = sorted(report['shard_seconds'].values())
+    median = seconds[len(seconds) // 2] if seconds else 0.0
+    line = (f"✅ {report['shards']} shards on {len(report['workers'])} workers in {report['seconds']:.1f}s "
+            f"(median shard {median:.2f}s, slowest {seconds[-1] if seconds else 0.0:.2f}s, "
+            f"{report['duplicates']} straggler copies, {report['retries']} retries)")
+    return line
+
+
+def _publish(directory, df, symbols, failed, duration, provider, mode):
+    """Publish one scan for the query service under its universe (rfactor.publish); failures only warn"""
+    from datetime import datetime
+    from rfactor.publish import SnapshotPublisher
+    from rfactor.scheduler import Snapshot
+    from rfactor.snapshots import SnapshotCache
+    
+    publisher = SnapshotPublisher(directory)
+    snapshot = Snapshot(0, df, tuple(symbols), dict(failed), datetime.now(), duration)
+    universe = SnapshotCache.universe_id(symbols, provider)
+    version = publisher.publish(snapshot, universe=universe, mode=mode)
+    if version:
+        print(f"✅ Published {mode} version {version} -> {os.path.join(directory, universe)} "
+              f"(serve --universe {universe})", file=sys.stderr)
+    elif not df.empty:
+        print(f"⚠️ Could not publish to {directory}: {publisher.last_error}", file=sys.stderr)
+
+
+def _build_alerts(args):
+    """AlertEngine for the --alert-* options (None when no sink is given)"""
+    if not (args.alert_webhook or args.alert_file or args.alert_stdout):
+        return None
+    from rfactor.alerts import AlertEngine, FileSink, StdoutSink, WebhookSink
+    
+    sinks = [WebhookSink(url) for url in args.alert_webhook or []]
+    if args.alert_file:
+        sinks.append(FileSink(args.alert_file))
+    if args.alert_stdout:
+        # Tables and CSV may be on stdout - alerts then go to stderr
+        sinks.append(StdoutSink(sys.stderr if getattr(args, 'out', None) == '-' else None))
+    return AlertEngine(sinks, state_path=args.alert_state)
+
+
+def cmd_scan(args):
+    """Fetch (or load from the bar store), score and write one scan"""
+    LiveDataFetcher = _configure_fetcher(args)
+    
+    from rfactor.fetcher import format_failed
+    from rfactor.processing import process_stock_data, scan_symbols
+    
+    if args.timeframes and (args.offline or args.quotes or args.shared or args.processes > 1 or args.listen):
+        print("❌ --timeframes downloads its own bars - it does not combine with --offline, --quotes, "
+              "--shared, --processes or --listen", file=sys.stderr)
+        return 2
+    
+    provider = build_provider(args)
+    symbols = resolve_symbols(args.universe, args.symbols, provider, args.count, args.universe_file)
+    started = time.perf_counter()
+    
+    if args.offline:
+        stock_data_list = LiveDataFetcher.load_from_store(symbols)
+        df = process_stock_data(stock_data_list)
+        loaded = {data['symbol'] for data in stock_data_list}
+        failed = {symbol: 'not_stored' for symbol in symbols if symbol not in loaded}
+    elif args.timeframes:
+        # One download of the finest bars, resampled to the daily table plus the extra timeframes
+        from rfactor.timeframes import scan_timeframes
+        try:
+            df, failed = scan_timeframes(
+                symbols,
+                timeframes=args.timeframes.split(','),
+                provider=provider,
+                chunk_size=args.chunk_size,
+                interval=args.timeframe_interval,
+                period=args.timeframe_period
+            )
+        except (ValueError, NotImplementedError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+    elif args.quotes:
+        # One quote per symbol joined to the EOD baseline; symbols it lacks are added and saved
+        from rfactor.baseline import Baseline
+        baseline = Baseline.load(args.baseline)
+        known = len(baseline.table)
+        df, failed = baseline.scan(symbols, provider=provider, session_date=args.as_of)
+        if len(baseline.table) > known:
+            baseline.save()
+    else:
+        coordinator = _build_coordinator(args)
+        scan_fn = coordinator.scan if coordinator is not None else scan_symbols
+        try:
+            if args.shared:
+                # Reuse this minute's snapshot of the universe if the dashboard (or another cron run) has one
+                from rfactor.snapshots import SnapshotCache
+                df, failed = SnapshotCache(args.snapshot_dir).scan(
+                    symbols,
+                    scan_fn,
+                    bulk=args.bulk,
+                    chunk_size=args.chunk_size,
+                    max_workers=args.workers,
+                    provider=provider
+                )
+            else:
+                df, failed = scan_fn(
+                    symbols,
+                    bulk=args.bulk,
+                    chunk_size=args.chunk_size,
+                    max_workers=args.workers,
+                    provider=provider
+                )
+        finally:
+            if coordinator is not None:
+                coordinator.close()
+        if coordinator is not None and coordinator.last_report:
+            print(_format_shard_report(coordinator.last_report), file=sys.stderr)
+    
+    if not df.empty:
+        df = df.sort_values('R-Factor', ascending=False)
+    
+    if args.publish:
+        mode = 'offline' if args.offline else 'timeframes' if args.timeframes else 'quotes' if args.quotes else 'daily'
+        _publish(args.publish, df, symbols, failed, time.perf_counter() - started, provider, mode)
+    
+    alerts = _build_alerts(args)
+    if alerts is not None:
+        events = alerts.process(df)
+        print(f"✅ {len(events)} alerts sent", file=sys.stderr)
+    
+    try:
+        write_results(df, args.out, args.format)
+    except (ImportError, ValueError) as e:
+        print(f"❌ Could not write {args.out}: {e}", file=sys.stderr)
+        return 2
+    
+    print(f"✅ Scored {len(df)} of {len(symbols)} stocks -> {args.out}", file=sys.stderr)
+    if failed:
+        print(format_failed(failed), file=sys.stderr)
+    
+    _write_metrics(args)
+    return 0 if len(df) else 1
+
+
+def cmd_record(args):
+    """Save daily bars from a provider as replay files"""
+    from rfactor.fetcher import FetchError, format_failed
+    from rfactor.providers import ReplayProvider
+    
+    provider = build_provider(args)
+    symbols = resolve_symbols(args.universe, args.symbols, provider, args.count, args.universe_file)
+    
+    failed = {}
+    for symbol in symbols:
+        try:
+            hist = provider.history(symbol, period=args.period)
+        except Exception as e:
+            failed[symbol] = FetchError.classify(e)
+            continue
+        ReplayProvider.record(args.dir, symbol, hist)
+    
+    print(f"✅ Recorded {len(symbols) - len(failed)} of {len(symbols)} stocks -> {args.dir}", file=sys.stderr)
+    if failed:
+        print(format_failed(failed), file=sys.stderr)
+    return 0 if len(failed) < len(symbols) else 1
+
+
+def cmd_baseline(args):
+    """EOD job: reduce daily history to the baseline table that scan --quotes joins quotes to"""
+    _configure_fetcher(args)
+    from rfactor.baseline import Baseline
+    from rfactor.fetcher import format_failed
+    
+    provider = build_provider(args)
+    symbols = resolve_symbols(args.universe, args.symbols, provider, args.count, args.universe_file)
+    
+    # Rebuilt from scratch - rows of symbols that dropped out of the universe go too
+    baseline = Baseline(path=args.out)
+    failed = baseline.build_from(provider, symbols, args.period, args.session_date, args.chunk_size)
+    if baseline.table.empty:
+        print("❌ No baseline rows built", file=sys.stderr)
+        if failed:
+            print(format_failed(failed), file=sys.stderr)
+        return 1
+    
+    try:
+        baseline.save()
+    except (ImportError, OSError, ValueError) as e:
+        print(f"❌ Could not write {args.out}: {e}", file=sys.stderr)
+        return 2
+    
+    sessions = baseline.table['Date'].max().date()
+    print(f"✅ Baseline of {len(baseline.table)} of {len(symbols)} stocks as of {sessions} -> {args.out}",
+          file=sys.stderr)
+    if failed:
+        print(format_failed(failed), file=sys.stderr)
+    return 0
+
+
+def cmd_alert_receiver(args):
+    """Local webhook receiver that prints (and optionally saves) the alerts POSTed to it"""
+    import json
+    from rfactor.alerts import AlertEvent, AlertReceiver, format_event
+    
+    def show(events):
+        for event in events:
+            try:
+                print(format_event(AlertEvent(**event)), flush=True)
+            except (TypeError, KeyError):
+                print(json.dumps(event, ensure_ascii=False), flush=True)
+        if args.out:
+            with open(args.out, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events))
+    
+    receiver = AlertReceiver(args.host, args.port, on_events=show).start()
+    print(f"✅ Receiving alerts on {receiver.url} (--alert-webhook {receiver.url}), Ctrl-C stops", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop()
+    return 0
+
+
+def cmd_chart_server(args):
+    """Serve recorded or generated chart payloads on a local stand-in for the chart endpoint"""
+    from rfactor.chart import ChartServer
+    
+    source = None if args.payload_dir else build_provider(args)
+    server = ChartServer(source, directory=args.payload_dir, host=args.host, port=args.port).start()
+    what = args.payload_dir or f"{args.provider} bars"
+    print(f"✅ Serving {what} on {server.url} (--provider chart --chart-url {server.url}), Ctrl-C stops",
+          file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+def cmd_worker(args):
+    """Scan shards for a remote coordinator (scan --listen) until it stops"""
+    _configure_fetcher(args)
+    from rfactor.coordinator import run_worker
+    
+    if not args.authkey:
+        print("❌ A worker needs the coordinator's --authkey (or $RFACTOR_COORDINATOR_AUTHKEY)", file=sys.stderr)
+        return 2
+    
+    address = _parse_address(args.connect)
+    print(f"✅ Worker pulling shards from {address[0]}:{address[1]}, Ctrl-C stops", file=sys.stderr)
+    try:
+        run_worker(address, args.authkey, reconnect=args.reconnect)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_serve(args):
+    """Serve the newest published scan of one universe as read-only JSON until interrupted"""
+    from rfactor.publish import published_universes
+    from rfactor.service import QueryService
+    
+    universe = args.universe
+    if universe is None:
+        # Only one universe published - no need to name it
+        universes = published_universes(args.dir)
+        if len(universes) != 1:
+            print(f"❌ {len(universes)} universes published in {args.dir} - choose one with --universe:",
+                  file=sys.stderr)
+            for name, meta in universes.items():
+                print(f"   {name}  {meta.get('mode')}  {meta.get('symbols')} symbols  {meta.get('created_at')}",
+                      file=sys.stderr)
+            return 2
+        universe, = universes
+    
+    service = QueryService(args.dir, universe, host=args.host, port=args.port).start()
+    print(f"✅ Serving {universe} from {args.dir} on {service.url} (/v1/scan, /v1/snapshot, /v1/universes), "
+          f"Ctrl-C stops", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+    return 0
+
+
+def cmd_bench(args):
+    """Time the pipeline stages on synthetic universes and save the report"""
+    from rfactor import bench
+    
+    sizes = [int(size) for size in args.sizes.split(',')] if args.sizes else bench.BENCH_SIZES
+    stages = args.stages.split(',') if args.stages else None
+    unknown = set(stages or []) - set(bench.STAGES)
+    if unknown:
+        print(f"❌ Unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(bench.STAGES)})",
+              file=sys.stderr)
+        return 2
+    
+    baseline = bench.load_report(args.compare) if args.compare else None
+    log = None if baseline else (lambda line: print(line, file=sys.stderr))
+    report = bench.run_benchmarks(sizes, stages, seed=args.seed, budget=args.budget, log=log)
+    
+    if baseline:
+        for line in bench.compare(report, baseline):
+            print(line, file=sys.stderr)
+    
+    if args.out:
+        bench.save_report(report, args.out)
+        print(f"✅ Saved {len(report['results'])} results -> {args.out}", file=sys.stderr)
+    return 0
+
+
+def cmd_backtest(args):
+    """Score years of daily bars per signal tier and print the forward-return summary"""
+    from rfactor import backtest
+    from rfactor.fetcher import format_failed
+    from rfactor.universe import load_csv
+    
+    provider = build_provider(args)
+    if args.symbols or args.universe or args.universe_file or args.provider not in LIVE_PROVIDERS:
+        symbols = resolve_symbols(args.universe, args.symbols, provider, args.count, args.universe_file)
+    else:
+        symbols = load_csv(args.universe_csv)
+    
+    try:
+        horizons = tuple(int(h) for h in args.horizons.split(','))
+    except ValueError:
+        print(f"❌ Bad --horizons: {args.horizons}", file=sys.stderr)
+        return 2
+    
+    started = time.perf_counter()
+    signals, failed = backtest.run_backtest(
+        symbols,
+        provider=provider,
+        period=args.period,
+        horizons=horizons,
+        workers=args.workers,
+        shard_size=args.shard_size
+    )
+    elapsed = time.perf_counter() - started
+    
+    summary = backtest.tier_labels(backtest.summarize(signals, horizons, by=args.by))
+    print(summary.to_string() if not summary.empty else "No symbol-days scored")
+    
+    print(f"✅ Scored {len(signals)} symbol-days for {len(symbols) - len(failed)} of {len(symbols)} "
+          f"stocks in {elapsed:.1f}s", file=sys.stderr)
+    if failed:
+        print(format_failed(failed), file=sys.stderr)
+    
+    if args.out and not signals.empty:
+        try:
+            write_results(signals, args.out, args.format)
+        except (ImportError, ValueError) as e:
+            print(f"❌ Could not write {args.out}: {e}", file=sys.stderr)
+            return 2
+    
+    return 0 if len(signals) else 1
+
+
+def cmd_calibrate(args):
+    """Sweep a grid of R-Factor constants over years of bars and rank the combinations"""
+    from rfactor import calibrate
+    from rfactor.fetcher import format_failed
+    from rfactor.universe import load_csv
+    
+    provider = build_provider(args)
+    if args.symbols or args.universe or args.universe_file or args.provider not in LIVE_PROVIDERS:
+        symbols = resolve_symbols(args.universe, args.symbols, provider, args.count, args.universe_file)
+    else:
+        symbols = load_csv(args.universe_csv)
+    
+    try:
+        horizons = tuple(int(h) for h in args.horizons.split(','))
+        grid = calibrate.param_grid(**(calibrate.parse_grid(args.grid) if args.grid else calibrate.DEFAULT_GRID))
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    
+    started = time.perf_counter()
+    inputs, failed = calibrate.load_inputs(
+        symbols,
+        provider=provider,
+        period=args.period,
+        horizons=horizons,
+        workers=args.workers,
+        shard_size=args.shard_size
+    )
+    if failed:
+        print(format_failed(failed), file=sys.stderr)
+    if inputs.empty:
+        print("❌ No symbol-days to calibrate on", file=sys.stderr)
+        return 1
+    
+    loaded = time.perf_counter()
+    results = calibrate.rank(calibrate.sweep(inputs, grid, horizons), by=args.sort, min_signals=args.min_signals)
+    print(f"✅ {len(results)} combinations x {len(inputs)} symbol-days: data {loaded - started:.1f}s, "
+          f"sweep {time.perf_counter() - loaded:.1f}s", file=sys.stderr)
+    
+    print(results.head(args.top).to_string(index=False))
+    current = results[calibrate.is_default(results)]
+    if not current.empty:
+        print(f"\nCurrent constants (rank {results.index.get_loc(current.index[0]) + 1} of {len(results)}):")
+        print(current.to_string(index=False))
+    
+    if args.out:
+        try:
+            write_results(results, args.out, args.format)
+        except (ImportError, ValueError) as e:
+            print(f"❌ Could not write {args.out}: {e}", file=sys.stderr)
+            return 2
+    return 0
+
+
+def cmd_intraday(args):
+    """Seed from daily bars once, then keep polling minute bars and print the top signals"""
+    from rfactor.fetcher import FetchError, format_failed
+    from rfactor.intraday import IntradayEngine
+    from rfactor.processing import to_display
+    
+    provider = build_provider(args)
+    symbols = resolve_symbols(args.universe, args.symbols, provider, args.count, args.universe_file)
+    
+    alerts = _build_alerts(args)
+    engine = IntradayEngine()
+    try:
+        skipped = engine.seed_from(provider, symbols, session_date=args.as_of)
+    except Exception as e:
+        print(f"❌ Could not load daily bars: {FetchError.classify(e)}", file=sys.stderr)
+        return 1
+    failed = {symbol: 'empty_history' for symbol in skipped}
+    if failed:
+        print(format_failed(failed), file=sys.stderr)
+    if not engine.states:
+        return 1
+    
+    while True:
+        started = time.perf_counter()
+        try:
+            applied = engine.poll(provider, interval=args.interval)
+        except Exception as e:
+            print(f"⚠️ Poll failed: {FetchError.classify(e)}", file=sys.stderr)
+            applied = {}
+        
+        df = engine.snapshot()
+        if not df.empty:
+            top = to_display(df.sort_values('R-Factor', ascending=False).head(args.top))
+            print(top[['Symbol', 'LTP', 'Change %', 'Vol Ratio', 'R-Factor', 'Signal', 'Direction', 'Timestamp']]
+                  .to_string(index=False))
+            if args.out:
+                write_results(df, args.out, args.format)
+            if args.publish:
+                _publish(args.publish, df, symbols, failed, time.perf_counter() - started, provider, 'intraday')
+            if alerts is not None:
+                alerts.process(df)
+        
+        print(f"✅ {sum(applied.values())} bars applied for {len(df)} stocks in "
+              f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+        _write_metrics(args)
+        if args.once:
+            return 0 if len(df) else 1
+        time.sleep(args.every)
+
+
+def cmd_universe(args):
+    """Check a universe file and show (or reset) the negative cache of failing symbols"""
+    from datetime import datetime
+    from rfactor.universe import load_universe
+    
+    rejected = {}
+    try:
+        symbols = load_universe(args.file, args.column, rejected=rejected)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read {args.file}: {e}", file=sys.stderr)
+        return 2
+    
+    # Normalised symbols on stdout, one per line, so the list can be piped or saved
+    print('\n'.join(symbols))
+    print(f"✅ {len(symbols)} symbols in {args.file}", file=sys.stderr)
+    for raw, reason in rejected.items():
+        print(f"   {reason}: {raw}", file=sys.stderr)
+    
+    LiveDataFetcher = _configure_fetcher(args)
+    store = LiveDataFetcher.get_store()
+    if store is None:
+        return 0
+    
+    if args.forget:
+        forget = list(store.failures()) if args.forget == 'all' else args.forget.upper().split(',')
+        store.clear_failures(symbol.strip() for symbol in forget)
+    
+    failures = store.failures()
+    dead = LiveDataFetcher.dead_symbols(failures)
+    print(f"🚫 {len(dead)} symbols skipped by the negative cache, {len(failures) - len(dead)} watched",
+          file=sys.stderr)
+    for symbol, (reason, count, checked_at) in sorted(failures.items()):
+        state = 'skipped' if symbol in dead else 'watched'
+        print(f"   {symbol}: {reason} x{count}, last checked {datetime.fromtimestamp(checked_at):%Y-%m-%d %H:%M} "
+              f"({state})", file=sys.stderr)
+    return 0
+
+
+def _add_source_arguments(parser):
+    """Universe and provider options shared by scan and record"""
+    parser.add_argument('--universe', choices=sorted(UNIVERSES),
+                        help="Named symbol universe (default: fno, or the provider's symbols)")
+    parser.add_argument('--symbols', help="Comma separated symbols, overrides --universe")
+    parser.add_argument('--universe-file',
+                        help="Symbol file (.csv with a 'symbol' column, or one per line), overrides --universe")
+    parser.add_argument('--provider', choices=('yfinance', 'chart', 'replay', 'synthetic'), default='yfinance',
+                        help="Market-data source; chart: Yahoo's chart endpoint over pooled connections (default: yfinance)")
+    parser.add_argument('--chart-url', default=os.environ.get('RFACTOR_CHART_URL', 'https://query1.finance.yahoo.com'),
+                        help="Chart endpoint root for --provider chart, e.g. a chart-server (default: $RFACTOR_CHART_URL or Yahoo)")
+    parser.add_argument('--chart-record', help="Also save the raw chart payloads here (serve them with chart-server --payload-dir)")
+    parser.add_argument('--replay-dir', help="Recorded bars for --provider replay")
+    parser.add_argument('--as-of', help="Replay / generate the market as of this date")
+    parser.add_argument('--count', type=int, help="Number of generated symbols for --provider synthetic")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for --provider synthetic")
+    parser.add_argument('--bars', type=int, default=260, help="Bars per symbol for --provider synthetic")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per request")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Simulated share of failed requests")
+
+
+def _add_alert_arguments(parser):
+    """Alert sinks shared by scan and intraday"""
+    parser.add_argument('--alert-webhook', action='append', metavar='URL',
+                        help="POST ACTIVE / STRONG / direction-flip alerts here as JSON; repeatable")
+    parser.add_argument('--alert-file', help="Append alerts to this JSON-lines file")
+    parser.add_argument('--alert-stdout', action='store_true', help="Print alerts")
+    parser.add_argument('--alert-state', default=os.environ.get('RFACTOR_ALERT_STATE', os.path.join('data', 'alerts.json')),
+                        help="Previous scan state the alerts diff against (default: $RFACTOR_ALERT_STATE or data/alerts.json)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rfactor', description="R-Factor F&O scanner")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    scan = commands.add_parser('scan', help="Run one scan and write the results")
+    _add_source_arguments(scan)
+    scan.add_argument('--out', default='-', help="Output file (.csv/.json/.parquet) or '-' for stdout")
+    scan.add_argument('--format', choices=OUTPUT_FORMATS, help="Output format (default: from --out)")
+    scan.add_argument('--offline', action='store_true',
+                      help="Score the bars already in the local store, no network")
+    scan.add_argument('--store', help="Bar store path (default: $RFACTOR_BAR_STORE or data/bars.sqlite)")
+    scan.add_argument('--shared', action='store_true',
+                      help="Share scans with the dashboard and other processes: at most one per universe per minute")
+    scan.add_argument('--snapshot-dir', default=os.environ.get('RFACTOR_SNAPSHOT_DIR', os.path.join('data', 'snapshots')),
+                      help="Shared snapshot directory for --shared (default: $RFACTOR_SNAPSHOT_DIR or data/snapshots)")
+    scan.add_argument('--quotes', action='store_true',
+                      help="Fetch one quote per symbol and join it to the EOD baseline (see `baseline`)")
+    scan.add_argument('--baseline', default=os.environ.get('RFACTOR_BASELINE', os.path.join('data', 'baseline.parquet')),
+                      help="Baseline table for --quotes (default: $RFACTOR_BASELINE or data/baseline.parquet)")
+    scan.add_argument('--timeframes', metavar='LIST',
+                      help="Also score these timeframes (1h, 1wk), resampled from one download of "
+                           "--timeframe-interval bars, as extra columns such as 'R-Factor 1W'")
+    scan.add_argument('--timeframe-interval', default='60m',
+                      help="Finest bars downloaded for --timeframes (default: 60m)")
+    scan.add_argument('--timeframe-period', default='6mo',
+                      help="History downloaded for --timeframes - covers the weekly windows (default: 6mo)")
+    scan.add_argument('--no-bulk', dest='bulk', action='store_false',
+                      help="Per-symbol requests on a thread pool instead of bulk downloads")
+    scan.add_argument('--chunk-size', type=int, default=50, help="Symbols per bulk request")
+    scan.add_argument('--workers', type=int, default=8, help="Parallel workers for --no-bulk")
+    scan.add_argument('--processes', type=int, default=1,
+                      help="Split the universe into shards scanned by this many worker processes (default: 1)")
+    scan.add_argument('--listen', metavar='HOST:PORT',
+                      help="Also hand shards to `rfactor worker` processes on other hosts through this address "
+                           "(':PORT' listens on 127.0.0.1 only; name the interface, with --authkey, for other hosts)")
+    scan.add_argument('--remote-workers', type=int, default=0,
+                      help="Remote workers expected with --listen (shards in flight = --processes + this)")
+    scan.add_argument('--authkey', default=os.environ.get('RFACTOR_COORDINATOR_AUTHKEY'),
+                      help="Shared secret of --listen and its workers, required off loopback - the channel "
+                           "carries pickles, so the key holder can run code on both ends "
+                           "(default: $RFACTOR_COORDINATOR_AUTHKEY)")
+    scan.add_argument('--rate-limit', type=float,
+                      help="Requests per second, 0 for unlimited (default: 5, unlimited for local providers)")
+    scan.add_argument('--publish', metavar='DIR', help="Also publish the scan as a versioned Arrow/Parquet snapshot here, for `serve`")
+    scan.add_argument('--metrics-out',
+                      help="Export pipeline metrics: .prom (Prometheus text), .json, or .jsonl (appended)")
+    _add_alert_arguments(scan)
+    scan.set_defaults(func=cmd_scan)
+    
+    record = commands.add_parser('record', help="Save daily bars as replay files")
+    _add_source_arguments(record)
+    record.add_argument('--dir', required=True, help="Directory for <SYMBOL>.csv recordings")
+    record.add_argument('--period', default='1y', help="History to record (default: 1y)")
+    record.set_defaults(func=cmd_record)
+    
+    chart_server = commands.add_parser('chart-server', help="Local stand-in for the chart endpoint")
+    _add_source_arguments(chart_server)
+    chart_server.add_argument('--payload-dir',
+                              help="Serve recorded <TICKER>-<interval>.json payloads instead of --provider bars")
+    chart_server.add_argument('--host', default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    chart_server.add_argument('--port', type=int, default=8765, help="Port (default: 8765)")
+    chart_server.set_defaults(func=cmd_chart_server)
+    
+    alert_receiver = commands.add_parser('alert-receiver', help="Local stand-in receiver for --alert-webhook")
+    alert_receiver.add_argument('--host', default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    alert_receiver.add_argument('--port', type=int, default=8795, help="Port (default: 8795)")
+    alert_receiver.add_argument('--out', help="Also append the received alerts to this JSON-lines file")
+    alert_receiver.set_defaults(func=cmd_alert_receiver)
+    
+    worker = commands.add_parser('worker', help="Scan shards for a coordinator started with scan --listen")
+    worker.add_argument('--connect', required=True, metavar='HOST:PORT', help="Coordinator address")
+    worker.add_argument('--authkey', default=os.environ.get('RFACTOR_COORDINATOR_AUTHKEY'),
+                        help="Shared secret of the coordinator, required - the channel carries pickles, so "
+                             "the coordinator runs code here (default: $RFACTOR_COORDINATOR_AUTHKEY)")
+    worker.add_argument('--reconnect', type=float, default=5.0,
+                        help="Seconds between connection attempts while no coordinator is up (default: 5)")
+    worker.add_argument('--store', help="Bar store path (default: $RFACTOR_BAR_STORE or data/bars.sqlite)")
+    worker.add_argument('--rate-limit', type=float, help="Requests per second of this worker (default: 5)")
+    worker.set_defaults(func=cmd_worker, provider='yfinance')
+    
+    serve = commands.add_parser('serve', help="Read-only JSON query service over published scans")
+    serve.add_argument('--dir', default=os.environ.get('RFACTOR_PUBLISH_DIR', os.path.join('data', 'published')),
+                       help="Publish directory (default: $RFACTOR_PUBLISH_DIR or data/published)")
+    serve.add_argument('--universe', metavar='KEY',
+                       help="Published universe to serve, as `scan --publish` prints it "
+                            "(default: the only one in --dir)")
+    serve.add_argument('--host', default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    serve.add_argument('--port', type=int, default=8780, help="Port (default: 8780)")
+    serve.set_defaults(func=cmd_serve)
+    
+    bench = commands.add_parser('bench', help="Benchmark pipeline stages on synthetic data")
+    bench.add_argument('--sizes', help="Comma separated universe sizes (default: 3,50,220,2000,20000)")
+    bench.add_argument('--stages', help="Comma separated stages (default: all)")
+    bench.add_argument('--budget', type=float, default=1.0,
+                       help="Seconds of repeat runs per stage and size after the first 3 (default: 1)")
+    bench.add_argument('--seed', type=int, default=0, help="Synthetic data seed")
+    bench.add_argument('--out', help="Save the JSON report here")
+    bench.add_argument('--compare', help="Earlier JSON report to compare p50 latency against")
+    bench.set_defaults(func=cmd_bench)
+    
+    backtest = commands.add_parser('backtest', help="Forward returns per R-Factor signal tier over years of bars")
+    _add_source_arguments(backtest)
+    backtest.add_argument('--universe-csv', default=FNO_DATA_CSV,
+                          help="Symbol list used when no --universe/--symbols is given (default: fno_data.csv)")
+    backtest.add_argument('--period', default='5y', help="History per symbol (default: 5y)")
+    backtest.add_argument('--horizons', default='1,5', help="Comma separated forward horizons in bars (default: 1,5)")
+    backtest.add_argument('--by', choices=('Recommendation', 'Signal'), default='Recommendation',
+                          help="Tier column to summarize by (default: Recommendation)")
+    backtest.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help="Worker processes (default: CPU count, 1 runs in-process)")
+    backtest.add_argument('--shard-size', type=int, help="Symbols per worker task (default: ~4 shards per worker)")
+    backtest.add_argument('--out', help="Save every scored symbol-day (.csv/.json/.parquet)")
+    backtest.add_argument('--format', choices=OUTPUT_FORMATS, help="Output format (default: from --out)")
+    backtest.set_defaults(func=cmd_backtest, bars=1300)
+    
+    calibrate = commands.add_parser('calibrate', help="Sweep R-Factor constants and rank them by forward returns")
+    _add_source_arguments(calibrate)
+    calibrate.add_argument('--universe-csv', default=FNO_DATA_CSV,
+                           help="Symbol list used when no --universe/--symbols is given (default: fno_data.csv)")
+    calibrate.add_argument('--period', default='5y', help="History per symbol (default: 5y)")
+    calibrate.add_argument('--horizons', default='1,5', help="Comma separated forward horizons in bars (default: 1,5)")
+    calibrate.add_argument('--grid', action='append',
+                           help="Parameter values, 'name=v1,v2' or 'name=start:stop:step'; repeatable "
+                                "(default: ~8.7k combinations around the current constants)")
+    calibrate.add_argument('--sort', help="Rank by this column (default: Avg %% of the longest horizon)")
+    calibrate.add_argument('--min-signals', type=int, default=30,
+                           help="Combinations with fewer ACTIVE days rank last (default: 30)")
+    calibrate.add_argument('--top', type=int, default=20, help="Combinations printed (default: 20)")
+    calibrate.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                           help="Download / input worker processes (default: CPU count)")
+    calibrate.add_argument('--shard-size', type=int, help="Symbols per worker task (default: ~4 shards per worker)")
+    calibrate.add_argument('--out', help="Save every combination (.csv/.json/.parquet)")
+    calibrate.add_argument('--format', choices=OUTPUT_FORMATS, help="Output format (default: from --out)")
+    calibrate.set_defaults(func=cmd_calibrate, bars=1300)
+    
+    intraday = commands.add_parser('intraday', help="Keep R-Factor live from minute bars")
+    _add_source_arguments(intraday)
+    intraday.add_argument('--interval', default='1m', help="Intraday bar interval (default: 1m)")
+    intraday.add_argument('--every', type=float, default=60.0, help="Seconds between polls (default: 60)")
+    intraday.add_argument('--top', type=int, default=20, help="Rows printed per poll (default: 20)")
+    intraday.add_argument('--once', action='store_true', help="Poll once and exit")
+    intraday.add_argument('--out', help="Rewrite the full table here after every poll (.csv/.json/.parquet)")
+    intraday.add_argument('--format', choices=OUTPUT_FORMATS, help="Output format (default: from --out)")
+    intraday.add_argument('--publish', metavar='DIR', help="Publish every poll as a versioned snapshot here, for `serve`")
+    intraday.add_argument('--metrics-out',
+                          help="Export pipeline metrics after every poll: .prom, .json or .jsonl (appended)")
+    _add_alert_arguments(intraday)
+    intraday.set_defaults(func=cmd_intraday)
+    
+    baseline = commands.add_parser('baseline', help="EOD job: build the baseline table for scan --quotes")
+    _add_source_arguments(baseline)
+    baseline.add_argument('--out', default=os.environ.get('RFACTOR_BASELINE', os.path.join('data', 'baseline.parquet')),
+                          help="Baseline table (default: $RFACTOR_BASELINE or data/baseline.parquet)")
+    baseline.add_argument('--period', default='3mo', help="Daily history per symbol (default: 3mo)")
+    baseline.add_argument('--session-date',
+                          help="Leave out bars from this date on, the session quotes will come from "
+                               "(default: none - every bar is a completed session, as after the close)")
+    baseline.add_argument('--chunk-size', type=int, default=50, help="Symbols per bulk request")
+    baseline.add_argument('--rate-limit', type=float,
+                          help="Requests per second, 0 for unlimited (default: 5, unlimited for local providers)")
+    baseline.set_defaults(func=cmd_baseline, store=None)
+    
+    universe = commands.add_parser('universe', help="Check a universe file and the negative cache")
+    universe.add_argument('--file', default=FNO_DATA_CSV, help="Universe file (default: fno_data.csv)")
+    universe.add_argument('--column', default='symbol', help="Symbol column of a CSV file (default: symbol)")
+    universe.add_argument('--store', help="Bar store path (default: $RFACTOR_BAR_STORE or data/bars.sqlite)")
+    universe.add_argument('--forget', help="Comma separated symbols to re-check on the next scan, or 'all'")
+    universe.set_defaults(func=cmd_universe, provider='yfinance', rate_limit=None)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
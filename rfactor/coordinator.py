@@ -0,0 +1,427 @@
+"""
+Sharded scan coordinator - one universe scanned by many processes or hosts
+
+processing.scan_symbols fetches and scores a universe on one core.
+ScanCoordinator.scan splits the universe into shards (a few per worker) and
+runs scan_symbols on each shard in worker processes. The workers are either a
+local process pool, or processes on any host that pull shards from the
+coordinator's TCP queue (QueueExecutor / run_worker).
+
+Shards are handed out one at a time as workers free up, so fast workers take
+more of them. Once every shard is out, a shard running far longer than the
+median is issued again to an idle worker, and the first copy to finish wins.
+A shard whose worker crashed is retried. The partial frames are merged into
+one table ranked by R-Factor; last_report (and the progress callback) give
+the per-shard timings, the workers used and the stragglers.
+
+A drop-in scan_fn for RefreshScheduler / SnapshotCache:
+
+    coordinator = ScanCoordinator(workers=8)
+    df, failed = coordinator.scan(symbols, bulk=True)
+
+Remote workers, on any host with the same code and network access:
+
+    python -m rfactor worker --connect coordinator-host:8790 --authkey secret
+
+The coordinator and its workers exchange pickled objects, so whoever holds the
+key can run code on the other side. There is no default key: a listener on a
+non-loopback address needs one ($RFACTOR_COORDINATOR_AUTHKEY), and a loopback
+listener without one uses a random key that only its own local workers get.
+"""
+
+import ipaddress
+import os
+import queue
+import socket
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, wait
+from multiprocessing import AuthenticationError, Process
+from multiprocessing.connection import Client, Listener
+
+import pandas as pd
+
+from rfactor import fetcher
+from rfactor.fetcher import LiveDataFetcher, TokenBucket
+from rfactor.metrics import METRICS
+from rfactor.processing import scan_symbols
+
+COORDINATOR_WORKERS = os.cpu_count() or 1
+COORDINATOR_SHARDS_PER_WORKER = 4   # Small shards let fast workers take more of them
+COORDINATOR_STRAGGLER_FACTOR = 3.0  # A shard this many times slower than the median is issued again...
+COORDINATOR_STRAGGLER_MIN = 2.0     # ...once it has run at least this many seconds
+COORDINATOR_RETRIES = 1             # Re-runs of a shard whose worker crashed
+COORDINATOR_POLL = 0.2              # Seconds between straggler checks
+COORDINATOR_PORT = 8790
+COORDINATOR_AUTHKEY = os.environ.get("RFACTOR_COORDINATOR_AUTHKEY")   # No default - see the module docstring
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def _init_worker(rate, burst, store_path):
+    """
+    Pool initializer: this worker's share of the rate limit, and the parent's bar store
+    (store_path None: no store, like a local provider in the parent)
+    """
+    fetcher.RATE_LIMITER = TokenBucket(rate, burst)
+    LiveDataFetcher.store = store_path or None
+
+
+def _scan_shard(symbols, scan_args, provider):
+    """
+    Worker entry point: scan_symbols() on one shard
+    Returns: (scored DataFrame, {symbol: reason}, {'worker': host:pid, 'seconds': duration})
+    """
+    started = time.perf_counter()
+    df, failed = scan_symbols(symbols, provider=provider, **scan_args)
+    stats = {'worker': f"{socket.gethostname()}:{os.getpid()}", 'seconds': time.perf_counter() - started}
+    return df, failed, stats
+
+
+def run_worker(address, authkey=COORDINATOR_AUTHKEY, reconnect=None):
+    """
+    Pull shards from a coordinator's QueueExecutor and send back the results
+    Returns when the coordinator sends the stop sentinel, or - unless reconnect
+    (seconds between attempts) is set - when it cannot be reached
+    """
+    if not authkey:
+        raise ValueError("A worker needs the coordinator's authkey (--authkey or $RFACTOR_COORDINATOR_AUTHKEY)")
+    authkey = authkey.encode() if isinstance(authkey, str) else authkey
+    while True:
+        try:
+            with Client(tuple(address), authkey=authkey) as conn:
+                while True:
+                    task = conn.recv()
+                    if task is None:
+                        return
+                    fn, args = task
+                    try:
+                        conn.send((True, fn(*args)))
+                    except Exception as e:
+                        conn.send((False, f"{type(e).__name__}: {e}"))
+        except (OSError, EOFError, AuthenticationError):
+            if reconnect is None:
+                return
+        time.sleep(reconnect)
+
+
+def is_loopback(host):
+    """True for 'localhost' and loopback IP addresses"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _local_worker(address, authkey, rate, burst, store_path):
+    _init_worker(rate, burst, store_path)
+    run_worker(address, authkey)
+
+
+def _worker_share(workers):
+    """(rate, burst, bar store path) for one of `workers` processes on this host"""
+    limiter = fetcher.RATE_LIMITER
+    rate = limiter.rate / workers if limiter.rate > 0 else 0
+    burst = max(1.0, limiter.capacity / workers)
+    store = LiveDataFetcher.store
+    # Still a path if the parent has not opened it yet
+    return rate, burst, store if store is None or isinstance(store, str) else store.path
+
+# ============================================================================
+# QUEUE EXECUTOR (MULTI-HOST)
+# ============================================================================
+
+class QueueExecutor:
+    """
+    Executor whose tasks are pulled over TCP by run_worker() processes on any host
+    One connection per worker: it is sent a task only when it is free, and a worker
+    that disconnects mid-task fails just that task (the coordinator retries it)
+    address: (host, port) to listen on - port 0 picks a free one (see .address)
+    authkey: required unless the host is loopback, where None means a random key for local_workers only
+    local_workers: also start this many worker processes on this host
+    Raises: ValueError for a non-loopback address without an authkey
+    """
+    
+    def __init__(self, address=('127.0.0.1', COORDINATOR_PORT), authkey=COORDINATOR_AUTHKEY, local_workers=0):
+        if not authkey:
+            if not is_loopback(address[0]):
+                raise ValueError(f"Listening on {address[0]} needs an authkey (--authkey or "
+                                 f"$RFACTOR_COORDINATOR_AUTHKEY) - workers run whatever the coordinator sends")
+            authkey = os.urandom(32)
+        self.authkey = authkey.encode() if isinstance(authkey, str) else authkey
+        self.connected = 0
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        self._listener = Listener(tuple(address), authkey=self.authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept, name='rfactor-queue', daemon=True).start()
+        
+        self._processes = []
+        for _ in range(local_workers):
+            process = Process(
+                target=_local_worker,
+                args=(self.address, self.authkey, *_worker_share(local_workers)),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+    
+    def submit(self, fn, *args):
+        """Queue fn(*args) for the next free worker (fn must be importable on the workers)"""
+        if self._closed:
+            raise RuntimeError("QueueExecutor is shut down")
+        future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+    
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            threading.Thread(target=self._serve, args=(conn,), name='rfactor-queue-worker', daemon=True).start()
+    
+    def _serve(self, conn):
+        """Feed one worker connection until shutdown or disconnect"""
+        with self._lock:
+            self.connected += 1
+        future = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    conn.send(None)
+                    return
+                future, fn, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                
+                conn.send((fn, args))
+                ok, value = conn.recv()
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RuntimeError(value))
+                future = None
+        except (OSError, EOFError) as e:
+            if future is not None and not future.done():
+                future.set_exception(ConnectionError(f"Worker lost: {e}"))
+        finally:
+            with self._lock:
+                self.connected -= 1
+            conn.close()
+    
+    def shutdown(self, wait=True, cancel_futures=False):
+        """Stop every connected worker (remote ones too) and stop listening"""
+        self._closed = True
+        if cancel_futures:
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    task[0].cancel()
+        with self._lock:
+            connected = self.connected
+        for _ in range(connected):
+            self._tasks.put(None)
+        self._listener.close()
+        if wait:
+            for process in self._processes:
+                process.join(timeout=5)
+
+# ============================================================================
+# COORDINATOR
+# ============================================================================
+
+class ScanCoordinator:
+    """
+    Shards scans over worker processes (see module docstring)
+    executor: concurrent.futures-style executor (submit -> Future); default: a local process
+              pool of `workers` processes, created on the first scan and kept for later ones
+    workers: shards in flight at once - the pool size, or the worker count across all hosts
+    """
+    
+    def __init__(self, workers=COORDINATOR_WORKERS, executor=None, shard_size=None,
+                 straggler_factor=COORDINATOR_STRAGGLER_FACTOR, straggler_min=COORDINATOR_STRAGGLER_MIN,
+                 retries=COORDINATOR_RETRIES):
+        self.workers = max(1, int(workers))
+        self.executor = executor
+        self.shard_size = shard_size
+        self.straggler_factor = straggler_factor
+        self.straggler_min = straggler_min
+        self.retries = retries
+        self.last_report = None
+        self._own_executor = executor is None
+        self._lock = threading.Lock()
+    
+    def _executor(self):
+        with self._lock:
+            if self.executor is None:
+                # Each process gets its share of the fetch rate limit
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=_worker_share(self.workers)
+                )
+            return self.executor
+    
+    def _reset_executor(self):
+        """Replace a broken process pool (a worker died) with a fresh one"""
+        with self._lock:
+            if self._own_executor and self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+    
+    def close(self):
+        """Shut the executor down"""
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+    
+    def shards(self, symbols):
+        size = self.shard_size or max(1, -(-len(symbols) // (self.workers * COORDINATOR_SHARDS_PER_WORKER)))
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+    
+    def scan(self, symbols, provider=None, progress=None, **scan_args):
+        """
+        scan_symbols() over shards of `symbols`, spread over the workers
+        progress(report): called after every finished shard (report as in last_report)
+        Returns: (DataFrame ranked by R-Factor, {symbol: reason})
+        """
+        symbols = list(dict.fromkeys(symbols))
+        shards = self.shards(symbols)
+        started = time.monotonic()
+        
+        report = {
+            'shards': len(shards), 'done': 0, 'rows': 0, 'seconds': 0.0,
+            'shard_seconds': {}, 'workers': Counter(), 'stragglers': [],
+            'duplicates': 0, 'retries': 0,
+        }
+        results = {}
+        
+        with METRICS.stage('scan'):
+            if self.workers == 1 or len(shards) <= 1:
+                # Nothing to spread - skip the pool round trip
+                for i, shard in enumerate(shards):
+                    results[i] = _scan_shard(shard, scan_args, provider)
+                    self._record(report, i, results[i], progress)
+            else:
+                self._run(shards, provider, scan_args, report, results, progress)
+            
+            df, failed = self._merge(shards, results)
+        
+        report['rows'] = len(df)
+        report['seconds'] = round(time.monotonic() - started, 3)
+        self.last_report = report
+        if self.workers > 1 and len(shards) > 1:
+            # Scored in other processes - count the rows here
+            METRICS.inc('rfactor_rows_scored_total', len(df))
+        METRICS.set('rfactor_scan_rows_per_second', round(len(df) / max(report['seconds'], 1e-9), 1))
+        return df, failed
+    
+    def _run(self, shards, provider, scan_args, report, results, progress):
+        """Hand out shards as workers free up; re-issue stragglers and crashed shards"""
+        pending = deque(range(len(shards)))
+        running = {}                 # Future -> (shard index, start time)
+        attempts = Counter()
+        duplicated = set()
+        
+        def submit(i):
+            try:
+                future = self._executor().submit(_scan_shard, shards[i], scan_args, provider)
+            except BrokenExecutor:
+                self._reset_executor()
+                future = self._executor().submit(_scan_shard, shards[i], scan_args, provider)
+            running[future] = (i, time.monotonic())
+        
+        while len(results) < len(shards):
+            while pending and len(running) < self.workers:
+                submit(pending.popleft())
+            
+            now = time.monotonic()
+            durations = list(report['shard_seconds'].values())
+            threshold = max(self.straggler_min, self.straggler_factor * statistics.median(durations)) if durations else None
+            report['stragglers'] = sorted(
+                i for i, since in running.values() if threshold is not None and now - since > threshold
+            )
+            
+            # Idle workers take a second copy of the slowest stragglers
+            for i in report['stragglers']:
+                if pending or len(running) >= self.workers:
+                    break
+                if i not in duplicated and i not in results:
+                    duplicated.add(i)
+                    report['duplicates'] += 1
+                    METRICS.inc('rfactor_shards_total', result='duplicate')
+                    submit(i)
+            
+            done, _ = wait(list(running), timeout=COORDINATOR_POLL, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, since = running.pop(future)
+                if i in results:
+                    # The other copy finished first
+                    continue
+                
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenExecutor):
+                        self._reset_executor()
+                    if any(j == i for j, _ in running.values()):
+                        # Another copy is still running
+                        continue
+                    attempts[i] += 1
+                    if attempts[i] <= self.retries:
+                        report['retries'] += 1
+                        METRICS.inc('rfactor_shards_total', result='retried')
+                        pending.appendleft(i)
+                        continue
+                    METRICS.inc('rfactor_shards_total', result='failed')
+                    result = (pd.DataFrame(), {symbol: 'worker_error' for symbol in shards[i]},
+                              {'worker': None, 'seconds': time.monotonic() - since})
+                
+                results[i] = result
+                self._record(report, i, result, progress)
+        
+        # Losing copies of duplicated shards finish in the background and are ignored
+        for future in running:
+            future.cancel()
+    
+    @staticmethod
+    def _record(report, i, result, progress):
+        _, _, stats = result
+        report['done'] += 1
+        report['shard_seconds'][i] = round(stats['seconds'], 3)
+        if stats['worker']:
+            report['workers'][stats['worker']] += 1
+            METRICS.inc('rfactor_shards_total', result='done')
+        if progress is not None:
+            progress(report)
+    
+    @staticmethod
+    def _merge(shards, results):
+        """One table ranked by R-Factor (highest first), failures in universe order"""
+        failed = {}
+        parts = []
+        for i in range(len(shards)):
+            df, shard_failed, _ = results[i]
+            failed.update(shard_failed)
+            if not df.empty:
+                parts.append(df)
+        
+        if not parts:
+            return pd.DataFrame(), failed
+        
+        df = pd.concat(parts, ignore_index=True)
+        return df.sort_values('R-Factor', ascending=False, kind='stable', ignore_index=True), failed
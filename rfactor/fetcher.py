@@ -0,0 +1,516 @@
+"""
+Live NSE data fetcher with rate limiting, retries and the local bar store
+
+Bars come from a DataProvider (rfactor.providers, yfinance by default).
+Nothing here imports Streamlit, and yfinance is only imported on the first
+network call, so runs served from the bar store start fast.
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from rfactor import indicators
+from rfactor.metrics import METRICS
+from rfactor.store import BarStore
+
+# Fetch engine settings
+FETCH_WORKERS = 8            # Parallel requests in flight
+FETCH_RATE_LIMIT = 5.0       # Requests per second shared by all sessions
+FETCH_BURST = 10             # Token bucket capacity
+FETCH_MAX_RETRIES = 3        # Retries for transient errors
+FETCH_BACKOFF_BASE = 0.5     # Seconds, doubled on every retry
+
+# Local bar store - only the missing range is downloaded
+BAR_STORE_PATH = os.environ.get("RFACTOR_BAR_STORE", os.path.join("data", "bars.sqlite"))
+STORE_MAX_AGE = 60           # Seconds before a stored symbol is refreshed again
+
+# Negative cache - symbols that keep coming back empty (delisted, renamed) are skipped
+DEAD_REASONS = ('empty_history',)   # Permanent-looking failures; network errors and too_few_bars never count
+DEAD_AFTER = 2               # Consecutive failed scans before a symbol is skipped
+DEAD_RECHECK = 24 * 3600     # Seconds until a skipped symbol is tried again...
+DEAD_RECHECK_MAX = 7 * 24 * 3600  # ...doubling after every failed re-check, up to this
+
+# ============================================================================
+# RATE LIMITING & ERROR CLASSIFICATION
+# ============================================================================
+
+class TokenBucket:
+    """Thread-safe token bucket shared by all fetch workers (rate <= 0 disables limiting)"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until one request token is available"""
+        if self.rate <= 0:
+            return
+        
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                
+                wait = (1.0 - self.tokens) / self.rate
+            
+            time.sleep(wait)
+
+
+class FetchError(Exception):
+    """Fetch failure with a reason code (timeout, empty_history, rate_limited, ...)"""
+    
+    TRANSIENT = ('timeout', 'rate_limited', 'connection')
+    
+    def __init__(self, reason, message=""):
+        super().__init__(message or reason)
+        self.reason = reason
+    
+    @property
+    def transient(self):
+        return self.reason in FetchError.TRANSIENT
+    
+    @staticmethod
+    def classify(exc):
+        """Map an exception raised by yfinance/requests to a reason code"""
+        if isinstance(exc, FetchError):
+            return exc.reason
+        
+        name = type(exc).__name__.lower()
+        message = str(exc).lower()
+        
+        if 'ratelimit' in name or 'too many requests' in message or 'rate limit' in message:
+            return 'rate_limited'
+        if isinstance(exc, TimeoutError) or 'timeout' in name or 'timed out' in message:
+            return 'timeout'
+        if isinstance(exc, ConnectionError) or 'connection' in name:
+            return 'connection'
+        return 'error'
+
+
+# Shared by every session in this process
+RATE_LIMITER = TokenBucket(FETCH_RATE_LIMIT, FETCH_BURST)
+# ============================================================================
+# LIVE DATA FETCHER - REAL NSE DATA
+# ============================================================================
+
+class LiveDataFetcher:
+    """Fetch real-time data from NSE via a DataProvider (yfinance by default)"""
+    
+    # Persistent bar store: a path is opened on first use (see get_store),
+    # None disables it and always downloads a full month
+    store = BAR_STORE_PATH
+    
+    # Default DataProvider (None means YFinanceProvider, created on first use)
+    provider = None
+    
+    _store_lock = threading.Lock()
+    
+    @staticmethod
+    def get_store():
+        """The bar store, opened on first use - importing the fetcher creates no files (None if disabled)"""
+        if isinstance(LiveDataFetcher.store, str):
+            with LiveDataFetcher._store_lock:
+                if isinstance(LiveDataFetcher.store, str):
+                    LiveDataFetcher.store = BarStore(LiveDataFetcher.store)
+        return LiveDataFetcher.store
+    
+    @staticmethod
+    def get_provider(provider=None):
+        """The provider to use: the one passed in, else the class default"""
+        if provider is not None:
+            return provider
+        if LiveDataFetcher.provider is None:
+            from rfactor.providers import YFinanceProvider
+            LiveDataFetcher.provider = YFinanceProvider()
+        return LiveDataFetcher.provider
+    
+    @staticmethod
+    def fetch_stock_data(symbol, provider=None):
+        """
+        Fetch live data for a single stock from NSE
+        Returns: dict with price, volume, ATR data
+        """
+        try:
+            return LiveDataFetcher._load_stock_data(symbol, provider)
+        except Exception as e:
+            # Silent fail - will show in progress
+            return None
+    
+    @staticmethod
+    def _load_stock_data(symbol, provider=None):
+        """
+        Fetch live data for a single stock without caching
+        Raises: FetchError with the failure reason
+        """
+        hist = LiveDataFetcher._get_history(symbol, provider)
+        
+        with METRICS.stage('indicators'):
+            data = LiveDataFetcher._build_stock_record(symbol, hist)
+        if data is None:
+            # A recent listing has bars, just not 14 of them yet - not a dead symbol
+            reason = 'empty_history' if hist is None or hist.empty else 'too_few_bars'
+            raise FetchError(reason, f"{symbol}: {0 if hist is None else len(hist)} bars")
+        
+        return data
+    
+    @staticmethod
+    def _get_history(symbol, provider=None):
+        """
+        1 month of daily bars for one symbol
+        With the bar store only the range after the last stored bar is downloaded
+        """
+        store = LiveDataFetcher.get_store()
+        if store is not None:
+            fresh = store.is_fresh(symbol, STORE_MAX_AGE)
+            METRICS.inc('rfactor_cache_total', layer='bar_store', result='hit' if fresh else 'miss')
+            if fresh:
+                return store.load(symbol, months=1)
+        
+        last_date = store.last_date(symbol) if store is not None else None
+        provider = LiveDataFetcher.get_provider(provider)
+        
+        try:
+            if last_date is None:
+                # Get historical data (1 month for ATR calculation)
+                hist = provider.history(symbol, period="1mo")
+            else:
+                # Re-fetch the last stored bar too - it may still be forming
+                hist = provider.history(symbol, start=last_date)
+        except Exception as e:
+            reason = FetchError.classify(e)
+            
+            # Nothing new since the last stored bar - serve what is on disk
+            if not (reason == 'empty_history' and last_date is not None):
+                raise FetchError(reason, str(e)) from e
+            hist = None
+        
+        if store is None:
+            return hist
+        
+        store.merge(symbol, hist)
+        return store.load(symbol, months=1)
+    
+    @staticmethod
+    def load_from_store(symbols):
+        """
+        Build fetch results straight from the bar store (no network)
+        Returns: same list of dicts as fetch_multiple_stocks
+        """
+        store = LiveDataFetcher.get_store()
+        if store is None:
+            return []
+        
+        results = []
+        for symbol in symbols:
+            fetched_at = store.fetched_at(symbol)
+            if fetched_at is None:
+                continue
+            
+            data = LiveDataFetcher._build_stock_record(symbol, store.load(symbol, months=1))
+            if data:
+                data['timestamp'] = datetime.fromtimestamp(fetched_at)
+                results.append(data)
+        
+        return results
+    
+    @staticmethod
+    def _fetch_with_retry(symbol, limiter=None, max_retries=FETCH_MAX_RETRIES, provider=None):
+        """
+        Fetch one stock, retrying transient errors with jittered exponential backoff
+        Returns: (data, reason) - reason is None on success
+        """
+        limiter = limiter or RATE_LIMITER
+        
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                with METRICS.timer('rfactor_fetch_seconds', mode='symbol'):
+                    return LiveDataFetcher._load_stock_data(symbol, provider), None
+            except Exception as e:
+                reason = FetchError.classify(e)
+                if reason not in FetchError.TRANSIENT or attempt == max_retries:
+                    return None, reason
+                METRICS.inc('rfactor_fetch_retries_total', reason=reason)
+            
+            # Full jitter: sleep somewhere in [0, base * 2^attempt]
+            time.sleep(random.uniform(0, FETCH_BACKOFF_BASE * (2 ** attempt)))
+        
+        return None, 'error'
+    
+    @staticmethod
+    def _short_reason(hist):
+        """Reason code for a history _build_stock_record could not score"""
+        if hist is None:
+            return 'error'
+        return 'empty_history' if hist.empty else 'too_few_bars'
+    
+    @staticmethod
+    def _build_stock_record(symbol, hist):
+        """
+        Turn one symbol's daily OHLCV history into the fetch result dict
+        Returns: dict with price, volume, ATR data (None if not enough data)
+        """
+        if hist is None or hist.empty or len(hist) < 14:
+            # Not enough data
+            return None
+        
+        # Current price and previous close
+        current_price = hist['Close'].iloc[-1]
+        prev_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
+        
+        # Calculate ATR (14-period)
+        atr = LiveDataFetcher.calculate_atr(
+            hist['High'].values,
+            hist['Low'].values,
+            hist['Close'].values
+        )
+        
+        # Volume data
+        current_volume = hist['Volume'].iloc[-1]
+        avg_volume = indicators.average_volume(hist['Volume'].values, window=20)[0]
+        
+        # Check if data is valid
+        if np.isnan(current_price) or np.isnan(prev_close) or current_price == 0:
+            return None
+        
+        return {
+            'symbol': symbol,
+            'current_price': float(current_price),
+            'prev_close': float(prev_close),
+            'atr': float(atr),
+            'current_volume': float(current_volume),
+            'avg_volume': float(avg_volume),
+            'success': True,
+            'timestamp': datetime.now()
+        }
+    
+    @staticmethod
+    def calculate_atr(high, low, close, period=14):
+        """Calculate Average True Range (single-symbol wrapper over the panel kernel)"""
+        try:
+            return indicators.simple_atr(high, low, close, period)[0]
+        except:
+            return 0
+    
+    @staticmethod
+    def dead_symbols(failures=None, now=None):
+        """
+        Symbols the negative cache currently skips (needs the bar store)
+        failures: BarStore.failures() if already loaded
+        Returns: {symbol: reason of the last failure}
+        """
+        store = LiveDataFetcher.get_store()
+        if failures is None:
+            failures = store.failures() if store is not None else {}
+        
+        now = time.time() if now is None else now
+        dead = {}
+        for symbol, (reason, count, checked_at) in failures.items():
+            if count < DEAD_AFTER:
+                continue
+            recheck = min(DEAD_RECHECK * 2 ** (count - DEAD_AFTER), DEAD_RECHECK_MAX)
+            if now - checked_at < recheck:
+                dead[symbol] = reason
+        return dead
+    
+    @staticmethod
+    def iter_stock_data(symbols, bulk=False, chunk_size=50, max_workers=FETCH_WORKERS, provider=None):
+        """
+        Stream fetch results in completion order
+        Symbols in the negative cache come first, unfetched, with reason 'dead_symbol'
+        Yields: (symbol, data, reason) - data is None and reason set for failed stocks
+        """
+        store = LiveDataFetcher.get_store()
+        failures = store.failures() if store is not None else {}
+        dead = LiveDataFetcher.dead_symbols(failures)
+        
+        for symbol in symbols:
+            if symbol in dead:
+                METRICS.inc('rfactor_cache_total', layer='negative', result='hit')
+                yield symbol, None, 'dead_symbol'
+        
+        live = [symbol for symbol in symbols if symbol not in dead]
+        if bulk:
+            stream = LiveDataFetcher._iter_stock_data_bulk(live, chunk_size, provider)
+        else:
+            stream = LiveDataFetcher._iter_stock_data_threaded(live, max_workers, provider)
+        
+        recovered = []
+        for symbol, data, reason in stream:
+            if store is not None:
+                if data is None and reason in DEAD_REASONS:
+                    store.record_failure(symbol, reason)
+                elif data is not None and symbol in failures:
+                    recovered.append(symbol)
+            yield symbol, data, reason
+        
+        if recovered:
+            store.clear_failures(recovered)
+    
+    @staticmethod
+    def _iter_stock_data_threaded(symbols, max_workers=FETCH_WORKERS, provider=None):
+        """Stream results of per-symbol requests on a thread pool"""
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+            futures = {
+                executor.submit(LiveDataFetcher._fetch_with_retry, symbol, provider=provider): symbol
+                for symbol in symbols
+            }
+            
+            # Consumers run on this (script) thread as futures complete
+            for future in as_completed(futures):
+                data, reason = future.result()
+                if data is None:
+                    METRICS.inc('rfactor_fetch_failures_total', reason=reason)
+                yield futures[future], data, reason
+    
+    @staticmethod
+    def _iter_stock_data_bulk(symbols, chunk_size=50, provider=None):
+        """Stream results with one bulk download request per chunk"""
+        chunk_size = max(1, int(chunk_size))
+        
+        for start in range(0, len(symbols), chunk_size):
+            chunk = list(symbols[start:start + chunk_size])
+            histories, reasons = LiveDataFetcher._download_chunk_with_retry(chunk, provider=provider)
+            
+            for symbol in chunk:
+                with METRICS.stage('indicators'):
+                    data = LiveDataFetcher._build_stock_record(symbol, histories.get(symbol))
+                # A symbol left out without a reason is an error, one with too few bars is too_few_bars
+                failure = None if data else reasons.get(symbol) or LiveDataFetcher._short_reason(histories.get(symbol))
+                if failure:
+                    METRICS.inc('rfactor_fetch_failures_total', reason=failure)
+                yield symbol, data, failure
+    
+    @staticmethod
+    def fetch_multiple_stocks(symbols, progress_bar=None, bulk=False, chunk_size=50,
+                              max_workers=FETCH_WORKERS, errors=None, provider=None):
+        """
+        Fetch data for multiple stocks with progress tracking
+        errors: optional dict filled with {symbol: reason} for failed stocks
+        """
+        results = []
+        failed_stocks = {}
+        total = len(symbols)
+        
+        stream = LiveDataFetcher.iter_stock_data(symbols, bulk, chunk_size, max_workers, provider)
+        for done, (symbol, data, reason) in enumerate(stream, start=1):
+            if data:
+                results.append(data)
+            else:
+                failed_stocks[symbol] = reason
+            
+            # Update progress
+            if progress_bar:
+                progress_bar.progress(done / total, 
+                                     text=f"Fetching {symbol}... ({done}/{total}) | Success: {len(results)}")
+        
+        # Keep the input order regardless of completion order
+        order = {symbol: idx for idx, symbol in enumerate(symbols)}
+        results.sort(key=lambda data: order[data['symbol']])
+        
+        if errors is not None:
+            errors.update(failed_stocks)
+        
+        return results
+    
+    @staticmethod
+    def fetch_multiple_stocks_bulk(symbols, progress_bar=None, chunk_size=50, errors=None, provider=None):
+        """
+        Fetch data for multiple stocks with one bulk download request per chunk
+        Returns: same list of dicts as fetch_multiple_stocks
+        """
+        return LiveDataFetcher.fetch_multiple_stocks(
+            symbols, progress_bar, bulk=True, chunk_size=chunk_size, errors=errors, provider=provider
+        )
+    
+    @staticmethod
+    def _download_chunk_with_retry(symbols, limiter=None, max_retries=FETCH_MAX_RETRIES, provider=None):
+        """
+        Download one chunk, retrying transient errors with jittered exponential backoff
+        Only the symbols that failed transiently (the whole request, or one ticker) are requested again
+        Returns: ({symbol: hist}, {symbol: reason} for the symbols left out)
+        """
+        limiter = limiter or RATE_LIMITER
+        histories = {}
+        reasons = {}
+        pending = list(symbols)
+        
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            errors = {}
+            try:
+                with METRICS.timer('rfactor_fetch_seconds', mode='chunk'):
+                    histories.update(LiveDataFetcher._download_chunk(pending, provider, errors))
+            except Exception as e:
+                reason = FetchError.classify(e)
+                errors = {symbol: reason for symbol in pending}
+            
+            reasons.update(errors)
+            for symbol in histories:
+                reasons.pop(symbol, None)
+            pending = [symbol for symbol in pending if errors.get(symbol) in FetchError.TRANSIENT]
+            if not pending or attempt == max_retries:
+                break
+            METRICS.inc('rfactor_fetch_retries_total', reason=errors[pending[0]])
+            
+            time.sleep(random.uniform(0, FETCH_BACKOFF_BASE * (2 ** attempt)))
+        
+        return histories, reasons
+    
+    @staticmethod
+    def _download_chunk(symbols, provider=None, errors=None):
+        """
+        1 month of daily bars for a chunk of symbols, split per symbol
+        With the bar store, fresh symbols are skipped and stored ones only get the missing range
+        errors: filled with {symbol: reason} for the symbols left out (see DataProvider.download)
+        """
+        provider = LiveDataFetcher.get_provider(provider)
+        store = LiveDataFetcher.get_store()
+        if store is None:
+            return provider.download(symbols, period="1mo", errors=errors)
+        
+        stale = [symbol for symbol in symbols if not store.is_fresh(symbol, STORE_MAX_AGE)]
+        last_dates = {symbol: store.last_date(symbol) for symbol in stale}
+        new = [symbol for symbol in stale if last_dates[symbol] is None]
+        known = [symbol for symbol in stale if last_dates[symbol] is not None]
+        
+        downloaded = {}
+        if new:
+            downloaded.update(provider.download(new, period="1mo", errors=errors))
+        if known:
+            start = min(last_dates[symbol] for symbol in known)
+            downloaded.update(provider.download(known, start=start, errors=errors))
+        for symbol, hist in downloaded.items():
+            store.merge(symbol, hist)
+        
+        # A stale symbol this download missed fails - its stored bars would be scored as fresh
+        return {
+            symbol: store.load(symbol, months=1)
+            for symbol in symbols
+            if symbol not in last_dates or symbol in downloaded
+        }
+
+def format_failed(failed_stocks):
+    """Summary line for stocks that could not be fetched, grouped by reason"""
+    names = list(failed_stocks)
+    reasons = {}
+    for reason in failed_stocks.values():
+        reasons[reason] = reasons.get(reason, 0) + 1
+    breakdown = ", ".join(f"{reason}: {count}" for reason, count in sorted(reasons.items()))
+    
+    return (f"⚠️ Could not fetch data for {len(names)} stocks ({breakdown}): {', '.join(names[:10])}" + 
+            (f" and {len(names)-10} more..." if len(names) > 10 else ""))
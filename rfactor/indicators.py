@@ -0,0 +1,234 @@
+"""
+Vectorized indicator kernels over (symbols x bars) NumPy panels
+
+Every function accepts a 1-D array (one symbol) or a 2-D array where each row
+is a symbol and each column a bar, oldest first. Missing bars and not-yet-listed
+periods are NaN; they are skipped rather than poisoning the whole row.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def as_panel(values):
+    """Return values as a float64 2-D array (a 1-D input becomes one row)"""
+    panel = np.asarray(values, dtype=np.float64)
+    if panel.ndim == 1:
+        panel = panel[np.newaxis, :]
+    return panel
+
+
+def forward_fill(values):
+    """Carry the last valid value of each row over later NaN gaps"""
+    values = as_panel(values)
+    valid = ~np.isnan(values)
+    
+    idx = np.where(valid, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = np.take_along_axis(values, idx, axis=1)
+    
+    # Leading gaps have nothing to carry
+    return np.where(np.logical_or.accumulate(valid, axis=1), filled, np.nan)
+
+
+def true_range(high, low, close):
+    """
+    True range per bar: max(H-L, |H-prevC|, |L-prevC|)
+    prevC is the last available close, so a missing bar does not void the next one
+    Returns: panel with the first bar NaN (no previous close)
+    """
+    high, low, close = as_panel(high), as_panel(low), as_panel(close)
+    
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = forward_fill(close)[:, :-1]
+    
+    hl = high - low
+    hc = np.abs(high - prev_close)
+    lc = np.abs(low - prev_close)
+    
+    tr = np.maximum(hl, np.maximum(hc, lc))
+    if tr.shape[1]:
+        tr[:, 0] = np.nan
+    return tr
+
+
+def right_align(values):
+    """
+    Shift each row's valid (non-NaN) values to the right end, keeping their order
+    Returns: (aligned panel, count of valid values per row)
+    """
+    values = as_panel(values)
+    valid = ~np.isnan(values)
+    
+    # Stable sort puts invalid slots first without reordering the valid ones
+    order = np.argsort(valid, axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1), valid.sum(axis=1)
+
+
+def last_mean(values, window, min_periods=1, fill=np.nan):
+    """
+    Mean of the last `window` valid values in each row
+    Rows with fewer than min_periods valid values get `fill`
+    """
+    aligned, count = right_align(values)
+    tail = aligned[:, -window:]
+    
+    used = np.minimum(count, window)
+    total = np.where(np.isnan(tail), 0.0, tail).sum(axis=1)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = total / used
+    return np.where(used >= max(1, min_periods), result, fill)
+
+
+def simple_atr(high, low, close, period=14):
+    """
+    Latest ATR as the mean of the last `period` true ranges
+    Symbols with fewer bars use every true range they have (0 if none)
+    """
+    return last_mean(true_range(high, low, close), period, min_periods=1, fill=0.0)
+
+
+def simple_atr_series(high, low, close, period=14):
+    """
+    simple_atr() as of every bar: mean of the trailing `period` true ranges
+    Returns: panel aligned with the input, NaN until the first true range
+    """
+    return rolling_mean(true_range(high, low, close), period, min_periods=1)
+
+
+def wilder_atr(high, low, close, period=14):
+    """
+    Wilder's smoothed ATR series
+    Seeded with the mean of the first `period` true ranges, then
+    ATR = (prev ATR * (period - 1) + TR) / period. Missing bars carry the previous value.
+    Returns: panel aligned with the input, NaN until the seed is available
+    """
+    tr = true_range(high, low, close)
+    n_symbols, n_bars = tr.shape
+    atr = np.full_like(tr, np.nan)
+    
+    state = np.full(n_symbols, np.nan)
+    seen = np.zeros(n_symbols, dtype=np.int64)
+    seed_sum = np.zeros(n_symbols)
+    
+    # Bars are sequential by definition; every symbol advances together
+    for t in range(n_bars):
+        value = tr[:, t]
+        valid = ~np.isnan(value)
+        
+        seeding = valid & (seen < period)
+        seed_sum[seeding] += value[seeding]
+        seen[valid] += 1
+        
+        seeded = seeding & (seen == period)
+        state[seeded] = seed_sum[seeded] / period
+        
+        smoothing = valid & ~seeding
+        state[smoothing] = (state[smoothing] * (period - 1) + value[smoothing]) / period
+        
+        atr[:, t] = state
+    
+    return atr
+
+
+def rolling_mean(values, window, min_periods=None):
+    """
+    Trailing rolling mean over the bar axis, ignoring NaN
+    A window needs min_periods valid values (default: the full window)
+    """
+    values = as_panel(values)
+    min_periods = window if min_periods is None else min_periods
+    
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    
+    # Window sums from cumulative sums, padded with a leading zero column
+    pad = np.zeros((values.shape[0], 1))
+    csum = np.concatenate([pad, np.cumsum(filled, axis=1)], axis=1)
+    ccount = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    
+    start = np.maximum(np.arange(values.shape[1]) + 1 - window, 0)
+    end = np.arange(values.shape[1]) + 1
+    total = csum[:, end] - csum[:, start]
+    count = ccount[:, end] - ccount[:, start]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = total / count
+    return np.where(count >= max(1, min_periods), result, np.nan)
+
+
+def average_volume(volume, window=20, min_periods=None):
+    """
+    Latest rolling average volume per symbol
+    NaN unless the last `window` bars hold min_periods valid values (default: all of them)
+    """
+    volume = as_panel(volume)
+    min_periods = window if min_periods is None else min_periods
+    
+    tail = volume[:, -window:]
+    count = (~np.isnan(tail)).sum(axis=1)
+    total = np.nansum(tail, axis=1)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = total / count
+    return np.where(count >= max(1, min_periods), result, np.nan)
+
+
+def build_panel(histories, fields=('High', 'Low', 'Close', 'Volume')):
+    """
+    Align {symbol: OHLCV DataFrame} on a shared date index
+    Returns: (symbols, index, {field: (symbols x bars) array}) - missing bars are NaN
+    """
+    symbols = [symbol for symbol, hist in histories.items() if hist is not None and not hist.empty]
+    if not symbols:
+        return [], pd.DatetimeIndex([]), {field: np.empty((0, 0)) for field in fields}
+    
+    index = histories[symbols[0]].index
+    for symbol in symbols[1:]:
+        index = index.union(histories[symbol].index)
+    
+    # One reindex per symbol for every field: (symbols x bars x fields)
+    values = np.stack([
+        histories[symbol][list(fields)].reindex(index).to_numpy(dtype=np.float64)
+        for symbol in symbols
+    ])
+    panels = {field: np.ascontiguousarray(values[:, :, i]) for i, field in enumerate(fields)}
+    
+    return symbols, index, panels
+
+
+def resample_bars(panels, starts):
+    """
+    Aggregate runs of consecutive bars into coarser bars
+    First Open, highest High, lowest Low, last Close and summed Volume of each run, skipping missing bars
+    panels: {field: (symbols x bars) array}; starts: sorted position of each coarse bar's first bar
+    Returns: {field: (symbols x coarse bars) array} - NaN where a symbol has no bar in the run
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    resampled = {}
+    for field, values in panels.items():
+        values = as_panel(values)
+        if not len(starts):
+            resampled[field] = np.empty((values.shape[0], 0))
+            continue
+        
+        valid = ~np.isnan(values)
+        present = np.add.reduceat(valid, starts, axis=1) > 0
+        ends = np.append(starts[1:], values.shape[1]) - 1
+        
+        if field == 'Open':
+            # Backward fill, so each run's first position holds its first valid open
+            bars = forward_fill(values[:, ::-1])[:, ::-1][:, starts]
+        elif field == 'High':
+            bars = np.fmax.reduceat(values, starts, axis=1)
+        elif field == 'Low':
+            bars = np.fmin.reduceat(values, starts, axis=1)
+        elif field == 'Volume':
+            bars = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=1)
+        else:
+            bars = forward_fill(values)[:, ends]
+        
+        resampled[field] = np.where(present, bars, np.nan)
+    
+    return resampled
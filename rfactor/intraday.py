@@ -0,0 +1,341 @@
+"""
+Intraday streaming mode - R-Factor kept current bar by bar (or trade by trade)
+
+Each symbol is seeded once from its completed daily bars. After that every
+minute bar or trade updates it in constant time:
+
+- ATR: Wilder's ATR as of the previous close, blended with today's forming
+  true range (session high/low against the previous close)
+- Volume ratio: today's cumulative volume against what an average session
+  (ring buffer of the last 20 session volumes, kept as a running sum) has
+  traded by this time of day
+
+A refresh only feeds bars newer than the last one seen, instead of downloading
+and re-scoring a month of daily bars for every symbol.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from rfactor import fetcher, indicators
+from rfactor.calculator import RFactorCalculator
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.processing import process_stock_data
+
+# NSE cash session, exchange-local time
+SESSION_OPEN = "09:15"
+SESSION_CLOSE = "15:30"
+SESSION_TZ = "Asia/Kolkata"
+
+INTRADAY_ATR_PERIOD = 14
+INTRADAY_VOLUME_SESSIONS = 20    # Sessions averaged for the expected volume
+INTRADAY_MIN_ELAPSED = 60        # Seconds - floor so the first trade does not divide by ~0
+INTRADAY_SEED_PERIOD = "6mo"     # Daily history used to seed Wilder's ATR
+
+
+def exchange_time(index):
+    """DatetimeIndex as naive exchange-local time (tz-aware input is converted to SESSION_TZ)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert(SESSION_TZ).tz_localize(None)
+    return index
+
+
+def _seconds(clock):
+    """'HH:MM' -> seconds since midnight"""
+    hours, minutes = clock.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+class RingBuffer:
+    """Last `size` values with a running sum - push and mean are O(1)"""
+    
+    def __init__(self, size, values=()):
+        self.size = int(size)
+        self.values = [0.0] * self.size
+        self.count = 0
+        self.pos = 0
+        self.total = 0.0
+        for value in list(values)[-self.size:]:
+            self.push(value)
+    
+    def push(self, value):
+        """Append a value, evicting the oldest once full"""
+        value = float(value)
+        if self.count == self.size:
+            self.total -= self.values[self.pos]
+        else:
+            self.count += 1
+        
+        self.values[self.pos] = value
+        self.total += value
+        self.pos = (self.pos + 1) % self.size
+        
+        if self.pos == 0:
+            # Re-sum once per lap so rounding error cannot build up
+            self.total = math.fsum(self.values)
+    
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+
+class IntradayState:
+    """
+    Incremental R-Factor inputs for one symbol
+    prev_atr is Wilder's ATR as of prev_close; volumes are recent full-session volumes
+    """
+    
+    def __init__(self, symbol, prev_close, prev_atr, volumes=(), period=INTRADAY_ATR_PERIOD,
+                 volume_sessions=INTRADAY_VOLUME_SESSIONS):
+        self.symbol = symbol
+        self.prev_close = float(prev_close)
+        self.prev_atr = float(prev_atr)
+        self.period = period
+        self.volumes = RingBuffer(volume_sessions, volumes)
+        
+        # Forming session
+        self.session = None
+        self.high = self.low = self.last = math.nan
+        self.cum_volume = 0.0
+        self.bar_volume = 0.0
+        self.updated = None
+    
+    def update(self, price, volume=0.0, timestamp=None, high=None, low=None, revise=False):
+        """
+        Apply one trade or bar: last price, volume traded since the previous update
+        revise=True replaces the previous update's volume (a still-forming bar seen again)
+        An update on a new date first rolls the finished session into the daily state
+        """
+        session = timestamp.date() if timestamp is not None else self.session
+        if self.session is not None and session != self.session:
+            self.roll()
+            revise = False
+        self.session = session
+        
+        price = float(price)
+        high = price if high is None else float(high)
+        low = price if low is None else float(low)
+        volume = float(volume) if volume == volume else 0.0
+        
+        if not high <= self.high:
+            self.high = high
+        if not low >= self.low:
+            self.low = low
+        self.last = price
+        
+        if revise:
+            self.cum_volume -= self.bar_volume
+        self.cum_volume += volume
+        self.bar_volume = volume
+        self.updated = timestamp
+    
+    def roll(self):
+        """Close the session: its true range enters the ATR, its volume the ring buffer"""
+        if not math.isnan(self.last):
+            self.prev_atr = self.atr
+            self.volumes.push(self.cum_volume)
+            self.prev_close = self.last
+        
+        self.high = self.low = self.last = math.nan
+        self.cum_volume = 0.0
+        self.bar_volume = 0.0
+    
+    @property
+    def true_range(self):
+        """True range of the forming session (NaN before its first update)"""
+        if math.isnan(self.last):
+            return math.nan
+        return max(self.high, self.prev_close) - min(self.low, self.prev_close)
+    
+    @property
+    def atr(self):
+        """Wilder's ATR with the forming session as the newest bar"""
+        tr = self.true_range
+        if math.isnan(tr):
+            return self.prev_atr
+        return (self.prev_atr * (self.period - 1) + tr) / self.period
+    
+    def expected_volume(self, fraction=1.0):
+        """Volume an average session has traded after `fraction` of the day"""
+        return self.volumes.mean() * fraction
+    
+    def record(self, fraction=1.0):
+        """
+        Fetch-style record (see LiveDataFetcher._build_stock_record) for process_stock_data
+        avg_volume is the volume expected by now, so Vol Ratio is session-relative
+        """
+        return {
+            'symbol': self.symbol,
+            'current_price': self.last,
+            'prev_close': self.prev_close,
+            'atr': self.atr,
+            'current_volume': self.cum_volume,
+            'avg_volume': self.expected_volume(fraction),
+            'success': True,
+            'timestamp': self.updated
+        }
+    
+    def score(self, fraction=1.0):
+        """calculate_rfactor() result for the current state"""
+        return RFactorCalculator.calculate_rfactor(
+            self.last, self.prev_close, self.atr, self.cum_volume, self.expected_volume(fraction)
+        )
+
+
+class IntradayEngine:
+    """
+    Live intraday state for many symbols
+    
+        engine = IntradayEngine()
+        engine.seed_from(provider, symbols)
+        engine.poll(provider)                       # new minute bars for everyone
+        engine.update('TCS', 3890.5, 1200, ts)      # or single trades
+        df = engine.snapshot()
+    
+    Timestamps are exchange-local (see exchange_time)
+    """
+    
+    def __init__(self, session_open=SESSION_OPEN, session_close=SESSION_CLOSE, bar_seconds=60,
+                 period=INTRADAY_ATR_PERIOD, volume_sessions=INTRADAY_VOLUME_SESSIONS):
+        self.open_seconds = _seconds(session_open)
+        self.session_seconds = _seconds(session_close) - self.open_seconds
+        self.bar_seconds = bar_seconds
+        self.period = period
+        self.volume_sessions = volume_sessions
+        self.states = {}
+        self.skipped = {}    # symbol -> session date it could not be seeded for (not downloaded again that day)
+    
+    def seed(self, histories, session_date=None):
+        """
+        Seed symbols from {symbol: daily OHLCV} (needs period + 1 completed days)
+        Bars dated session_date (default: today) or later are dropped - that session is built from updates
+        Returns: symbols with too little history to seed
+        """
+        if session_date is None:
+            session_date = pd.Timestamp.now(tz=SESSION_TZ).date()
+        session_date = pd.Timestamp(session_date).normalize()
+        
+        completed = {
+            symbol: hist[exchange_time(hist.index).normalize() < session_date]
+            for symbol, hist in histories.items()
+            if hist is not None and not hist.empty
+        }
+        symbols, _, panels = indicators.build_panel(completed)
+        
+        # One pass over the (symbols x days) panel instead of a Wilder loop per symbol
+        skipped = [symbol for symbol in histories if symbol not in symbols]
+        if symbols:
+            atr = indicators.wilder_atr(panels['High'], panels['Low'], panels['Close'], self.period)[:, -1]
+            prev_close = indicators.forward_fill(panels['Close'])[:, -1]
+            volumes, counts = indicators.right_align(panels['Volume'])
+            
+            for i, symbol in enumerate(symbols):
+                if np.isnan(atr[i]):
+                    # Fewer than period + 1 days
+                    skipped.append(symbol)
+                    continue
+                
+                recent = volumes[i, volumes.shape[1] - min(counts[i], self.volume_sessions):]
+                self.states[symbol] = IntradayState(
+                    symbol, prev_close[i], atr[i], recent, self.period, self.volume_sessions
+                )
+        
+        return skipped
+    
+    def seed_from(self, provider, symbols, period=INTRADAY_SEED_PERIOD, session_date=None):
+        """
+        Seed from one bulk daily download
+        Returns: symbols that could not be seeded
+        """
+        histories = provider.download(list(symbols), period=period)
+        skipped = self.seed(histories, session_date)
+        return skipped + [symbol for symbol in symbols if symbol not in histories]
+    
+    def session_fraction(self, timestamp):
+        """Share of the session elapsed at `timestamp`, counting the bar that starts then"""
+        elapsed = (timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+                   - self.open_seconds + self.bar_seconds)
+        return min(1.0, max(elapsed, INTRADAY_MIN_ELAPSED) / self.session_seconds)
+    
+    def update(self, symbol, price, volume=0.0, timestamp=None, high=None, low=None):
+        """
+        Apply one trade or bar and rescore the symbol in O(1)
+        Returns: calculate_rfactor() result, None for symbols that were never seeded
+        """
+        state = self.states.get(symbol)
+        if state is None:
+            return None
+        
+        state.update(price, volume, timestamp, high, low)
+        return state.score(self.session_fraction(timestamp) if timestamp is not None else 1.0)
+    
+    def feed(self, symbol, bars):
+        """
+        Apply a symbol's intraday OHLCV bars, skipping the ones already seen
+        The last bar seen before is re-applied as a revision - it may have been still forming
+        Returns: number of bars applied
+        """
+        state = self.states.get(symbol)
+        if state is None or bars is None or bars.empty:
+            return 0
+        
+        bars = bars.dropna(subset=['Close'])
+        index = exchange_time(bars.index)
+        start = index.searchsorted(state.updated) if state.updated is not None else 0
+        
+        columns = (bars[field].to_numpy(np.float64)[start:] for field in ('High', 'Low', 'Close', 'Volume'))
+        applied = 0
+        for timestamp, high, low, close, volume in zip(index[start:], *columns):
+            state.update(close, volume, timestamp, high, low, revise=timestamp == state.updated)
+            applied += 1
+        return applied
+    
+    def poll(self, provider, interval="1m", symbols=None):
+        """
+        Fetch today's bars for the seeded symbols (default: all) in one request and apply the new ones
+        Returns: {symbol: bars applied}
+        """
+        symbols = [symbol for symbol in (symbols or self.states) if symbol in self.states]
+        if not symbols:
+            return {}
+        bars = provider.intraday(symbols, interval=interval)
+        return {symbol: self.feed(symbol, frame) for symbol, frame in bars.items()}
+    
+    def records(self, now=None, symbols=None):
+        """
+        Fetch-style records for symbols (default: all) that traded this session
+        now: one clock for every symbol's expected volume (default: each symbol's last update)
+        """
+        records = []
+        for symbol in (symbols or self.states):
+            state = self.states.get(symbol)
+            if state is None or math.isnan(state.last):
+                continue
+            clock = now if now is not None else state.updated
+            records.append(state.record(self.session_fraction(clock) if clock is not None else 1.0))
+        return records
+    
+    def snapshot(self, now=None, symbols=None):
+        """Scanner table (process_stock_data) of the current state"""
+        return process_stock_data(self.records(now, symbols))
+    
+    def scan(self, symbols, interval="1m", provider=None):
+        """
+        RefreshScheduler scan_fn: seed symbols seen for the first time, apply new bars, score
+        Returns: (scanner table, {symbol: reason}) like processing.scan_symbols
+        """
+        provider = LiveDataFetcher.get_provider(provider)
+        today = pd.Timestamp.now(tz=SESSION_TZ).date()
+        
+        # Symbols without enough daily bars won't have more until the session closes - one try per day
+        new = [symbol for symbol in symbols if symbol not in self.states and self.skipped.get(symbol) != today]
+        if new:
+            fetcher.RATE_LIMITER.acquire()
+            self.skipped.update(dict.fromkeys(self.seed_from(provider, new), today))
+        failed = {symbol: 'empty_history' for symbol in symbols if self.skipped.get(symbol) == today}
+        
+        fetcher.RATE_LIMITER.acquire()
+        self.poll(provider, interval, symbols)
+        return self.snapshot(symbols=symbols), failed
@@ -0,0 +1,221 @@
+"""
+In-process metrics for the scan pipeline
+
+One registry per process (METRICS), shared by the fetch workers, the refresh
+scheduler thread and every Streamlit session:
+
+- rfactor_stage_seconds{stage}            histogram - network, parse, indicators, score, scan, render, publish
+- rfactor_fetch_seconds{mode}             histogram - one provider request (mode: symbol / chunk / quote)
+- rfactor_fetch_retries_total{reason}     counter
+- rfactor_fetch_failures_total{reason}    counter
+- rfactor_http_connections_total{result}  counter - chart requests on a new or a reused keep-alive connection
+- rfactor_cache_total{layer,result}       counter - st_cache / bar_store / snapshot / view / service hits and misses
+- rfactor_shards_total{result}            counter - coordinator shards: done / duplicate / retried / failed
+- rfactor_refresh_symbols_total           counter - symbols re-scanned by the adaptive refresh
+- rfactor_threshold_crossings_total       counter - WAIT -> ACTIVE crossings it picked up
+- rfactor_alerts_total{kind,result}       counter - alert transitions: sent / duplicate / rate_limited
+- rfactor_alert_deliveries_total{sink,result}  counter - alert batches per sink: sent / failed
+- rfactor_rows_scored_total               counter
+- rfactor_scan_rows_per_second            gauge - last scan_symbols() or coordinator run
+
+Exported as Prometheus text format (.prom) or JSON (.json, or one line per
+export appended to a .jsonl log).
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds - covers a cached lookup up to a slow bulk download
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    'rfactor_stage_seconds': "Time spent per pipeline stage",
+    'rfactor_fetch_seconds': "Latency of one provider request",
+    'rfactor_fetch_retries_total': "Fetch retries by failure reason",
+    'rfactor_fetch_failures_total': "Symbols that could not be fetched, by failure reason",
+    'rfactor_http_connections_total': "Chart endpoint requests by connection (new / reused)",
+    'rfactor_cache_total': "Cache lookups by layer and result",
+    'rfactor_shards_total': "Scan coordinator shards by outcome",
+    'rfactor_refresh_symbols_total': "Symbols re-scanned by the adaptive refresh scheduler",
+    'rfactor_threshold_crossings_total': "R-Factor ACTIVE threshold crossings seen by the adaptive refresh",
+    'rfactor_alerts_total': "Alert transitions by kind and outcome",
+    'rfactor_alert_deliveries_total': "Alert batches delivered per sink",
+    'rfactor_rows_scored_total': "Rows scored by process_stock_data",
+    'rfactor_scan_rows_per_second': "Rows scored per second of the last full scan",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus layout)"""
+    
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating linearly inside the bucket (None if empty)"""
+        if not self.count:
+            return None
+        
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms keyed by (name, labels)"""
+    
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+            self.started_at = time.time()
+    
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+    
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+    
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def stage(self, stage):
+        """Shorthand for timer('rfactor_stage_seconds', stage=...)"""
+        return self.timer('rfactor_stage_seconds', stage=stage)
+    
+    def counter_values(self, name):
+        """{label pairs: value} for one counter"""
+        with self._lock:
+            return {labels: value for (key, labels), value in self.counters.items() if key == name}
+    
+    def snapshot(self):
+        """Everything as plain JSON-able data"""
+        with self._lock:
+            def rows(items, render):
+                return [
+                    {'name': name, 'labels': dict(labels), **render(value)}
+                    for (name, labels), value in sorted(items.items())
+                ]
+            
+            return {
+                'timestamp': time.time(),
+                'started_at': self.started_at,
+                'counters': rows(self.counters, lambda value: {'value': value}),
+                'gauges': rows(self.gauges, lambda value: {'value': value}),
+                'histograms': rows(self.histograms, lambda histogram: histogram.to_dict()),
+            }
+    
+    def to_json(self):
+        return json.dumps(self.snapshot())
+    
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                       for _, value in pairs)
+            return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+        
+        with self._lock:
+            families = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                families.setdefault((name, 'counter'), []).append(f"{name}{labels_text(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                families.setdefault((name, 'gauge'), []).append(f"{name}{labels_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                lines = families.setdefault((name, 'histogram'), [])
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{labels_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{labels_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{labels_text(labels)} {histogram.count}")
+        
+        out = []
+        for (name, kind), lines in sorted(families.items()):
+            if name in METRIC_HELP:
+                out.append(f"# HELP {name} {METRIC_HELP[name]}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+    
+    def write(self, path):
+        """Export by extension: .prom (Prometheus text), .jsonl (append one line), else JSON"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        if path.endswith('.prom'):
+            text, mode = self.to_prometheus(), 'w'
+        elif path.endswith('.jsonl'):
+            text, mode = self.to_json() + '\n', 'a'
+        else:
+            text, mode = json.dumps(self.snapshot(), indent=2), 'w'
+        
+        if mode == 'w':
+            # node_exporter's textfile collector may read at any time - never expose a half-written file
+            tmp = f"{path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, path)
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(text)
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,120 @@
+"""
+Turn fetch results into the scored scanner table
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from rfactor.calculator import RFactorCalculator, SIGNAL_LABELS, DIRECTION_LABELS, RECOMMENDATION_LABELS
+from rfactor.fetcher import FETCH_WORKERS, LiveDataFetcher
+from rfactor.metrics import METRICS
+
+# ============================================================================
+# DATA PROCESSING
+# ============================================================================
+
+DISPLAY_LABELS = {
+    'Signal': SIGNAL_LABELS,
+    'Direction': DIRECTION_LABELS,
+    'Recommendation': RECOMMENDATION_LABELS,
+}
+
+def process_stock_data(stock_data_list):
+    """
+    Process fetched stock data and calculate R-Factor
+    Returns: typed scanner table - float32 metrics, nullable Int64 volumes, Categorical codes for
+    Signal/Direction/Recommendation, datetime64 Timestamp (see to_display)
+    """
+    stock_data_list = [stock_data for stock_data in stock_data_list if stock_data]
+    if not stock_data_list:
+        return pd.DataFrame()
+    
+    with METRICS.stage('score'):
+        data = pd.DataFrame(stock_data_list)
+        
+        # Calculate R-Factor for every stock in one pass
+        result = RFactorCalculator.calculate_rfactor_batch(data, labels=False)
+        
+        # Combine data
+        df = pd.DataFrame({
+            'Symbol': data['symbol'],
+            'LTP': data['current_price'],
+            'Prev Close': data['prev_close'],
+            'Change %': result['pct_change'].astype('float32'),
+            'ATR': data['atr'],
+            'ATR %': result['atr_pct'].astype('float32'),
+            # Nullable: the 20-bar average is NaN for stocks with 14-19 bars
+            'Volume': np.trunc(data['current_volume']).astype('Int64'),
+            'Avg Volume': np.trunc(data['avg_volume']).astype('Int64'),
+            'Vol Ratio': result['volume_ratio'].astype('float32'),
+            'R-Factor': result['rfactor'].astype('float32'),
+            'K Factor': result['k_factor'].astype('float32'),
+            'Signal': result['signal'],
+            'Direction': result['direction'],
+            'Recommendation': result['recommendation'],
+            'Timestamp': pd.to_datetime(data['timestamp'])
+        })
+    
+    METRICS.inc('rfactor_rows_scored_total', len(df))
+    return df
+
+def to_display(df):
+    """
+    Scanner table as shown to users and in CSV exports:
+    emoji labels, 2-decimal float64 metrics and HH:MM:SS timestamps
+    """
+    display = df.copy(deep=False)
+    
+    for column in display.columns:
+        # 'Signal 1W' and the other timeframe columns (see rfactor.timeframes) label like 'Signal'
+        mapping = DISPLAY_LABELS.get(column.split(' ')[0])
+        if mapping is not None and isinstance(display[column].dtype, pd.CategoricalDtype):
+            display[column] = display[column].cat.rename_categories(mapping)
+    
+    for column in display.columns:
+        if display[column].dtype == 'float32':
+            display[column] = display[column].astype('float64').round(2)
+    
+    if 'Timestamp' in display and pd.api.types.is_datetime64_any_dtype(display['Timestamp']):
+        # A scan spans a handful of distinct seconds - format each once, not every row
+        codes, uniques = pd.factorize(display['Timestamp'].dt.floor('s'))
+        labels = uniques.strftime('%H:%M:%S').take(codes, allow_fill=True, fill_value=np.nan)
+        display['Timestamp'] = pd.Series(labels, index=display.index)
+    
+    return display
+
+def scan_symbols(symbols, bulk=True, chunk_size=50, max_workers=FETCH_WORKERS, provider=None):
+    """
+    Fetch and score a universe without touching Streamlit (safe off the script thread)
+    Returns: (scored DataFrame, {symbol: reason} for failed stocks)
+    """
+    errors = {}
+    started = time.perf_counter()
+    with METRICS.stage('scan'):
+        stock_data_list = LiveDataFetcher.fetch_multiple_stocks(
+            symbols,
+            bulk=bulk,
+            chunk_size=chunk_size,
+            max_workers=max_workers,
+            errors=errors,
+            provider=provider
+        )
+        df = process_stock_data(stock_data_list)
+    
+    METRICS.set('rfactor_scan_rows_per_second', round(len(df) / max(time.perf_counter() - started, 1e-9), 1))
+    return df, errors
+
+def filter_results(df, signal_filter, direction_filter):
+    """
+    Apply the Signal / Direction filters and sort by R-Factor (highest first)
+    Filters hold codes: ACTIVE/WAIT and UPSIDE/DOWNSIDE
+    """
+    df_filtered = df[
+        (df['Signal'].isin(signal_filter)) &
+        (df['Direction'].isin(direction_filter))
+    ]
+    
+    # Sort by R-Factor descending (highest first - regardless of direction)
+    return df_filtered.sort_values('R-Factor', ascending=False)
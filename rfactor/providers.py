@@ -0,0 +1,687 @@
+"""
+Market-data providers
+
+LiveDataFetcher asks a provider for daily OHLCV bars instead of calling
+yfinance directly, so scans can also run from recorded files or from
+generated data (benchmarks, load tests, air-gapped boxes).
+
+Every provider returns DataFrames indexed by date with Open/High/Low/Close/Volume
+columns, oldest first, and raises FetchError for failures.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from urllib.parse import quote, urlencode
+
+import numpy as np
+import pandas as pd
+
+from rfactor.chart import (
+    CHART_CONNECTIONS,
+    CHART_PATH,
+    CHART_TIMEOUT,
+    CHART_URL,
+    CHART_USER_AGENT,
+    AsyncHTTPClient,
+    bars_frame,
+    parse_chart,
+)
+from rfactor.fetcher import FetchError
+from rfactor.metrics import METRICS
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60}
+
+
+def period_start(last, period):
+    """First date of a yfinance-style period ('5d', '1mo', '6mo', '1y', 'max') ending at `last`"""
+    if period in (None, 'max'):
+        return None
+    
+    count = int(''.join(ch for ch in period if ch.isdigit()) or 1)
+    unit = period.lstrip('0123456789')
+    offsets = {
+        'd': pd.DateOffset(days=count),
+        'wk': pd.DateOffset(weeks=count),
+        'mo': pd.DateOffset(months=count),
+        'y': pd.DateOffset(years=count),
+    }
+    if unit not in offsets:
+        raise ValueError(f"Unsupported period: {period}")
+    return last - offsets[unit]
+
+
+def slice_history(hist, period="1mo", start=None):
+    """Bars from `start`, or the trailing `period` before the newest bar"""
+    if hist.empty:
+        return hist
+    if start is not None:
+        return hist[hist.index >= pd.Timestamp(start)]
+    
+    first = period_start(hist.index[-1], period)
+    return hist if first is None else hist[hist.index > first]
+
+
+class DataProvider:
+    """Base provider - subclasses implement history(); download() loops over it"""
+    
+    name = "base"
+    
+    def history(self, symbol, period="1mo", start=None):
+        """
+        Daily bars for one symbol (trailing `period`, or from `start`)
+        Raises: FetchError
+        """
+        raise NotImplementedError
+    
+    def download(self, symbols, period="1mo", start=None, errors=None):
+        """
+        Daily bars for many symbols in one request where the source allows it
+        errors: filled with {symbol: reason} for the symbols left out; without it a transient
+        failure of any symbol raises FetchError
+        Returns: {symbol: DataFrame} - symbols without data are left out
+        """
+        histories = {}
+        for symbol in symbols:
+            try:
+                hist = self.history(symbol, period, start)
+            except FetchError as e:
+                if errors is not None:
+                    errors[symbol] = e.reason
+                elif e.transient:
+                    raise
+                continue
+            if not hist.empty:
+                histories[symbol] = hist
+            elif errors is not None:
+                errors[symbol] = 'empty_history'
+        return histories
+    
+    def quotes(self, symbols):
+        """
+        Newest daily bar of many symbols - the session so far while the market is open
+        One "1d" download instead of a month of bars per symbol (see rfactor.baseline)
+        Returns: DataFrame indexed by symbol with Date and OHLCV - symbols without data are left out
+        """
+        names, dates, rows = [], [], []
+        with METRICS.stage('parse'):
+            for symbol, hist in self.download(list(symbols), period="1d").items():
+                # Plain arrays - pandas row access would cost more than the request saves
+                values = np.column_stack([hist[column].to_numpy(np.float64) for column in COLUMNS])
+                closed = np.flatnonzero(~np.isnan(values[:, 3]))
+                if len(closed):
+                    names.append(symbol)
+                    dates.append(hist.index[closed[-1]])
+                    rows.append(values[closed[-1]])
+            
+            quotes = pd.DataFrame(np.reshape(rows, (-1, len(COLUMNS))), index=names, columns=COLUMNS)
+            quotes.insert(0, 'Date', pd.DatetimeIndex(dates) if dates else pd.DatetimeIndex([]))
+        return quotes
+    
+    def intraday(self, symbols, interval="1m", period="1d"):
+        """
+        Session bars at `interval` over the trailing `period` (default: today's session) for many symbols
+        Returns: {symbol: DataFrame} indexed by bar start time - symbols without data are left out
+        """
+        raise NotImplementedError(f"{self.name} provider has no intraday bars")
+    
+    def settings(self):
+        """
+        Public constructor settings (seed, directory, base URL, ...) - with the name, they tell
+        apart providers that return different bars (see SnapshotCache.universe_key)
+        """
+        return {name: value for name, value in sorted(vars(self).items()) if not name.startswith('_')}
+    
+    def __getstate__(self):
+        # Locks do not pickle - process pools (backtest shards) get their own
+        state = self.__dict__.copy()
+        state.pop('_lock', None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class _TickerErrorLog(logging.Handler):
+    """Collects the per-ticker errors yf.download() logs as "['TCS.NS', ...]: message" lines"""
+    
+    PATTERN = re.compile(r"^\[([^\]]*)\]: (.*)", re.S)
+    
+    def __init__(self, tickers):
+        super().__init__(logging.ERROR)
+        self.tickers = set(map(str.upper, tickers))
+        self.messages = {}
+    
+    def emit(self, record):
+        match = self.PATTERN.match(record.getMessage())
+        if match is None:
+            return
+        for ticker in re.findall(r"'([^']+)'", match.group(1)):
+            if ticker.upper() in self.tickers:
+                self.messages[ticker.upper()] = match.group(2)
+
+
+class YFinanceProvider(DataProvider):
+    """Yahoo Finance via yfinance (NSE symbols get the .NS suffix)"""
+    
+    name = "yfinance"
+    
+    def __init__(self, suffix=".NS"):
+        self.suffix = suffix
+    
+    @staticmethod
+    def _yfinance():
+        """Import yfinance on first use - it is slow to import and unused offline"""
+        import yfinance
+        return yfinance
+    
+    def history(self, symbol, period="1mo", start=None):
+        range_args = {'period': period} if start is None else {'start': pd.Timestamp(start).strftime('%Y-%m-%d')}
+        try:
+            ticker = self._yfinance().Ticker(f"{symbol}{self.suffix}")
+            with METRICS.stage('network'):
+                return ticker.history(raise_errors=True, **range_args)
+        except Exception as e:
+            reason = FetchError.classify(e)
+            if reason == 'error' and 'no data found' in str(e).lower():
+                reason = 'empty_history'
+            raise FetchError(reason, str(e)) from e
+    
+    def download(self, symbols, period="1mo", start=None, errors=None):
+        range_args = {'period': period} if start is None else {'start': pd.Timestamp(start).strftime('%Y-%m-%d')}
+        return self._download(symbols, errors, **range_args)
+    
+    def intraday(self, symbols, interval="1m", period="1d"):
+        return self._download(symbols, period=period, interval=interval)
+    
+    def _download(self, symbols, errors=None, **download_args):
+        """
+        yf.download() of many symbols, with its per-ticker errors as reasons
+        yf.download() never raises: a throttled or timed-out ticker is only logged and left out
+        """
+        symbols = list(symbols)
+        tickers = [f"{symbol}{self.suffix}" for symbol in symbols]
+        yfinance = self._yfinance()
+        
+        log = _TickerErrorLog(tickers)
+        logger = logging.getLogger('yfinance')
+        logger.addHandler(log)
+        try:
+            with METRICS.stage('network'):
+                data = yfinance.download(
+                    tickers,
+                    group_by="ticker",
+                    auto_adjust=True,
+                    threads=True,
+                    progress=False,
+                    **download_args
+                )
+        finally:
+            logger.removeHandler(log)
+        
+        # Older yfinance also keeps them in shared._ERRORS
+        shared = getattr(getattr(yfinance, 'shared', None), '_ERRORS', None) or {}
+        messages = {ticker: str(shared[ticker]) for ticker in map(str.upper, tickers) if ticker in shared}
+        messages.update(log.messages)
+        
+        histories = self._split(data, symbols, tickers)
+        failed = {}
+        for symbol, ticker in zip(symbols, tickers):
+            if symbol in histories and not histories[symbol].empty:
+                continue
+            message = messages.get(ticker.upper())
+            if message is not None:
+                failed[symbol] = self._error_reason(message)
+            else:
+                # An all-NaN column is a symbol without bars; a missing one is unexplained
+                failed[symbol] = 'empty_history' if symbol in histories else 'error'
+            histories.pop(symbol, None)
+        
+        if errors is not None:
+            errors.update(failed)
+        else:
+            transient = [symbol for symbol, reason in failed.items() if reason in FetchError.TRANSIENT]
+            if transient:
+                raise FetchError(failed[transient[0]], f"{len(transient)} of {len(symbols)} tickers failed: "
+                                 f"{messages.get(f'{transient[0]}{self.suffix}'.upper())}")
+        return histories
+    
+    @staticmethod
+    def _error_reason(message):
+        """Reason code of one of yfinance's per-ticker error messages"""
+        lower = message.lower()
+        if 'no data found' in lower or 'no price data found' in lower or 'delisted' in lower:
+            return 'empty_history'
+        if 'too many requests' in lower or 'rate limit' in lower:
+            return 'rate_limited'
+        if 'timeout' in lower or 'timed out' in lower:
+            return 'timeout'
+        if 'connection' in lower:
+            return 'connection'
+        return 'error'
+    
+    @staticmethod
+    def _split(data, symbols, tickers):
+        """Per-symbol frames from a group_by="ticker" download"""
+        if data is None or data.empty:
+            return {}
+        
+        histories = {}
+        with METRICS.stage('parse'):
+            if isinstance(data.columns, pd.MultiIndex):
+                available = set(data.columns.get_level_values(0))
+                for symbol, ticker_symbol in zip(symbols, tickers):
+                    if ticker_symbol in available:
+                        # Drop the padding rows other tickers introduced
+                        histories[symbol] = data[ticker_symbol].dropna(subset=['Close'])
+            elif len(symbols) == 1:
+                # Older yfinance returns flat columns for a single ticker
+                histories[symbols[0]] = data.dropna(subset=['Close'])
+        
+        return histories
+
+
+class ChartProvider(DataProvider):
+    """
+    Yahoo's chart endpoint over pooled keep-alive connections (see rfactor.chart)
+    All requests of a download() are in flight together on the provider's event loop thread;
+    history() calls from fetch threads share the same loop and connection pool
+    base_url: endpoint root - a ChartServer URL for tests and benchmarks
+    record_dir: also save every payload as <dir>/<TICKER>-<interval>.json (ChartServer serves them)
+    """
+    
+    name = "chart"
+    
+    def __init__(self, base_url=CHART_URL, suffix=".NS", connections=CHART_CONNECTIONS,
+                 timeout=CHART_TIMEOUT, record_dir=None):
+        self.base_url = base_url.rstrip('/')
+        self.suffix = suffix
+        self.connections = connections
+        self.timeout = timeout
+        self.record_dir = record_dir
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+    
+    def __getstate__(self):
+        # Event loops and sockets stay behind; a process pool worker opens its own
+        state = super().__getstate__()
+        state['_loop'] = state['_client'] = None
+        return state
+    
+    def _run(self, coro):
+        """Run a coroutine on the provider's event loop thread (started on first use)"""
+        with self._lock:
+            if self._loop is None:
+                self._client = AsyncHTTPClient(self.connections, self.timeout, {'User-Agent': CHART_USER_AGENT})
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='rfactor-chart', daemon=True).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    
+    def close(self):
+        """Close pooled connections and stop the event loop thread"""
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is not None:
+            loop.call_soon_threadsafe(client.close)
+            loop.call_soon_threadsafe(loop.stop)
+    
+    def _url(self, symbol, params):
+        return f"{self.base_url}{CHART_PATH}{quote(symbol + self.suffix)}?{urlencode(params)}"
+    
+    @staticmethod
+    def _params(period="1mo", start=None, interval="1d"):
+        if start is None:
+            return {'range': period, 'interval': interval}
+        # From a day early - bars are stamped at the session open, in exchange time
+        first = int(pd.Timestamp(start).timestamp()) - 86400
+        return {'period1': first, 'period2': int(time.time()) + 86400, 'interval': interval}
+    
+    async def _get_all(self, symbols, params):
+        return await asyncio.gather(
+            *(self._client.get(self._url(symbol, params)) for symbol in symbols),
+            return_exceptions=True
+        )
+    
+    @staticmethod
+    def _request_error(exc):
+        """FetchError for an exception raised by the HTTP client"""
+        reason = FetchError.classify(exc)
+        if reason == 'error' and isinstance(exc, OSError):
+            # DNS and TLS failures - the network, not the symbol
+            reason = 'connection'
+        return FetchError(reason, str(exc) or type(exc).__name__)
+    
+    def _frame(self, symbol, response, params, start=None):
+        """DataFrame of one response - Raises: FetchError"""
+        hist = bars_frame(parse_chart(self._body(symbol, response, params)), intraday=params['interval'] != '1d')
+        return hist if start is None else slice_history(hist, start=start)
+    
+    def _body(self, symbol, response, params):
+        """Payload of one successful response - Raises: FetchError"""
+        if isinstance(response, Exception):
+            raise self._request_error(response) from response
+        status, body = response
+        
+        if status == 429:
+            raise FetchError('rate_limited', f"{symbol}: HTTP 429")
+        if status >= 500:
+            raise FetchError('connection', f"{symbol}: HTTP {status}")
+        if status == 404:
+            raise FetchError('empty_history', f"{symbol}: no data found, symbol may be delisted")
+        if status != 200:
+            raise FetchError('error', f"{symbol}: HTTP {status}")
+        
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(os.path.join(self.record_dir, f"{symbol}{self.suffix}-{params['interval']}.json"), 'wb') as f:
+                f.write(body)
+        return body
+    
+    def _download(self, symbols, params, start=None, errors=None):
+        """
+        Every symbol's request in flight together, then parsed in this thread
+        errors: filled with {symbol: reason} for the symbols left out, and the rest returned - a
+        throttled symbol costs one request on retry, not the whole chunk's
+        Without it, like DataProvider.download(), a transient failure of any symbol fails the whole call
+        """
+        symbols = list(symbols)
+        with METRICS.stage('network'):
+            responses = self._run(self._get_all(symbols, params))
+        
+        histories = {}
+        transient = None
+        with METRICS.stage('parse'):
+            for symbol, response in zip(symbols, responses):
+                try:
+                    hist = self._frame(symbol, response, params, start)
+                except FetchError as e:
+                    if errors is not None:
+                        errors[symbol] = e.reason
+                    elif e.transient and transient is None:
+                        transient = e
+                    continue
+                if not hist.empty:
+                    histories[symbol] = hist
+                elif errors is not None:
+                    errors[symbol] = 'empty_history'
+        
+        if transient is not None:
+            raise transient
+        return histories
+    
+    def history(self, symbol, period="1mo", start=None):
+        params = self._params(period, start)
+        with METRICS.stage('network'):
+            response = self._run(self._get_all([symbol], params))[0]
+        with METRICS.stage('parse'):
+            return self._frame(symbol, response, params, start)
+    
+    def download(self, symbols, period="1mo", start=None, errors=None):
+        return self._download(symbols, self._params(period, start), start, errors)
+    
+    def intraday(self, symbols, interval="1m", period="1d"):
+        return self._download(symbols, self._params(period, interval=interval))
+    
+    def quotes(self, symbols):
+        # Straight from the parsed arrays - no DataFrame per symbol
+        symbols = list(symbols)
+        params = self._params("1d")
+        with METRICS.stage('network'):
+            responses = self._run(self._get_all(symbols, params))
+        
+        names, dates, rows = [], [], []
+        transient = None
+        with METRICS.stage('parse'):
+            for symbol, response in zip(symbols, responses):
+                try:
+                    bars = parse_chart(self._body(symbol, response, params))
+                except FetchError as e:
+                    if e.transient and transient is None:
+                        transient = e
+                    continue
+                closed = np.flatnonzero(~np.isnan(bars.close))
+                if len(closed):
+                    last = closed[-1]
+                    names.append(symbol)
+                    dates.append((bars.timestamps[last] + bars.gmtoffset) // 86400 * 86400)
+                    rows.append([bars.open[last], bars.high[last], bars.low[last], bars.close[last], bars.volume[last]])
+        
+        if transient is not None:
+            raise transient
+        quotes = pd.DataFrame(np.reshape(rows, (-1, len(COLUMNS))), index=names, columns=COLUMNS)
+        quotes.insert(0, 'Date', pd.DatetimeIndex(np.asarray(dates, dtype='datetime64[s]')))
+        return quotes
+
+
+class ReplayProvider(DataProvider):
+    """
+    Serves recorded bars from <directory>/<SYMBOL>.csv or .parquet
+    as_of: replay the market as it was on that date (later bars are hidden)
+    """
+    
+    name = "replay"
+    
+    def __init__(self, directory, as_of=None):
+        self.directory = directory
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else None
+        self._cache = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def record(directory, symbol, hist):
+        """Write one symbol's bars in the layout ReplayProvider reads"""
+        os.makedirs(directory, exist_ok=True)
+        frame = hist[COLUMNS].copy()
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        frame.index = index.rename('Date')
+        frame.to_csv(os.path.join(directory, f"{symbol}.csv"))
+    
+    def symbols(self):
+        """Symbols with a recording in the directory"""
+        names = {
+            os.path.splitext(name)[0]
+            for name in os.listdir(self.directory)
+            if name.endswith(('.csv', '.parquet'))
+        }
+        return sorted(names)
+    
+    def _load(self, symbol):
+        with self._lock:
+            if symbol in self._cache:
+                return self._cache[symbol]
+        
+        base = os.path.join(self.directory, symbol)
+        if os.path.exists(base + '.parquet'):
+            frame = pd.read_parquet(base + '.parquet')
+        elif os.path.exists(base + '.csv'):
+            frame = pd.read_csv(base + '.csv', index_col=0)
+        else:
+            frame = None
+        
+        if frame is not None:
+            frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index), name='Date')
+            frame = frame[COLUMNS].sort_index()
+            if self.as_of is not None:
+                frame = frame[frame.index <= self.as_of]
+        
+        with self._lock:
+            self._cache[symbol] = frame
+        return frame
+    
+    def history(self, symbol, period="1mo", start=None):
+        frame = self._load(symbol)
+        if frame is None or frame.empty:
+            raise FetchError('empty_history', f"{symbol}: no recording in {self.directory}")
+        return slice_history(frame, period, start)
+
+
+class SyntheticProvider(DataProvider):
+    """
+    Random-walk daily bars for any symbol, deterministic per (seed, symbol)
+    latency: seconds per request (plus up to 50% jitter)
+    failure_rate: share of requests failing with timeout / rate_limited / empty history
+    """
+    
+    name = "synthetic"
+    
+    def __init__(self, bars=260, seed=0, latency=0.0, failure_rate=0.0, end=None):
+        self.bars = int(bars)
+        self.seed = int(seed)
+        self.latency = float(latency)
+        self.failure_rate = float(failure_rate)
+        self.end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+        self._index = pd.bdate_range(end=self.end, periods=self.bars, name='Date')
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def universe(n, prefix="SYN"):
+        """N synthetic symbol names"""
+        width = max(5, len(str(n)))
+        return [f"{prefix}{i:0{width}d}" for i in range(1, n + 1)]
+    
+    def bars_for(self, symbol):
+        """Full generated history for one symbol (no latency or failures)"""
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        n = self.bars
+        
+        start_price = rng.uniform(50, 5000)
+        drift = rng.normal(0.0003, 0.0005)
+        vol = rng.uniform(0.01, 0.035)
+        returns = rng.normal(drift, vol, n)
+        close = start_price * np.exp(np.cumsum(returns))
+        
+        # Open near the previous close, range scaled by the day's volatility
+        open_ = np.concatenate([[start_price], close[:-1]]) * np.exp(rng.normal(0, vol / 4, n))
+        spread = np.abs(rng.normal(0, vol, n)) * close
+        high = np.maximum(open_, close) + spread * rng.uniform(0.2, 1.0, n)
+        low = np.minimum(open_, close) - spread * rng.uniform(0.2, 1.0, n)
+        
+        base_volume = rng.uniform(2e5, 2e7)
+        volume = np.round(base_volume * np.exp(rng.normal(0, 0.4, n) + 8 * np.abs(returns)))
+        
+        return pd.DataFrame(
+            {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+            index=self._index
+        )
+    
+    def _request(self, what):
+        """Simulate one network round trip: latency, then maybe a failure"""
+        with self._lock:
+            jitter = self._rng.uniform(0, 0.5)
+            roll = self._rng.random()
+            kind = self._rng.choice(('timeout', 'rate_limited', 'empty_history'))
+        
+        if self.latency > 0:
+            with METRICS.stage('network'):
+                time.sleep(self.latency * (1 + jitter))
+        if roll < self.failure_rate:
+            raise FetchError(kind, f"synthetic {kind} for {what}")
+    
+    def history(self, symbol, period="1mo", start=None):
+        self._request(symbol)
+        return slice_history(self.bars_for(symbol), period, start)
+    
+    def download(self, symbols, period="1mo", start=None, errors=None):
+        # One request for the whole chunk, like yf.download()
+        self._request(f"{len(symbols)} symbols")
+        return {symbol: slice_history(self.bars_for(symbol), period, start) for symbol in symbols}
+    
+    def minute_bars_for(self, symbol, minutes=375, open_time="09:15"):
+        """
+        One generated NSE session of minute bars on the last daily bar's date
+        Starts from the previous daily close; prices and volumes are independent of the daily bar
+        """
+        daily = self.bars_for(symbol)
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), 1])
+        
+        prev_close = daily['Close'].iloc[-2] if len(daily) > 1 else daily['Close'].iloc[-1]
+        vol = rng.uniform(0.0005, 0.002)
+        returns = rng.normal(0, vol, minutes)
+        close = prev_close * np.exp(rng.normal(0, vol * 5) + np.cumsum(returns))
+        open_ = np.concatenate([[prev_close], close[:-1]])
+        spread = np.abs(rng.normal(0, vol, minutes)) * close
+        high = np.maximum(open_, close) + spread
+        low = np.minimum(open_, close) - spread
+        
+        base_volume = daily['Volume'].iloc[:-1].mean() / minutes if len(daily) > 1 else 1e4
+        volume = np.round(base_volume * np.exp(rng.normal(0, 0.5, minutes)))
+        
+        start = pd.Timestamp(f"{self._index[-1].date()} {open_time}")
+        index = pd.date_range(start, periods=minutes, freq='min', name='Datetime')
+        return pd.DataFrame(
+            {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+            index=index
+        )
+    
+    def session_bars_for(self, symbol, interval="60m", period="6mo", open_time="09:15", minutes=375):
+        """
+        Bars at `interval` splitting every daily bar of the trailing `period`
+        Each session's bars add back up to its daily bar: first open, high, low, last close and volume
+        """
+        daily = slice_history(self.bars_for(symbol), period)
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), 2])
+        step = INTERVAL_MINUTES[interval]
+        n_days, n_bars = len(daily), -(-minutes // step)
+        
+        open_, high, low, close = (daily[column].to_numpy()[:, np.newaxis] for column in ('Open', 'High', 'Low', 'Close'))
+        
+        # Brownian bridge from the open to the close, kept inside the day's range
+        walk = np.cumsum(rng.normal(0, 1, (n_days, n_bars)), axis=1)
+        share = np.arange(1, n_bars + 1) / n_bars
+        bridge = walk - share * walk[:, -1:]
+        closes = open_ + (close - open_) * share + bridge * (high - low) / (4 * np.sqrt(n_bars))
+        closes = np.clip(closes, low, high)
+        closes[:, -1] = close[:, 0]
+        opens = np.concatenate([open_, closes[:, :-1]], axis=1)
+        
+        # The day's extremes land in one bar each
+        highs = np.maximum(opens, closes)
+        lows = np.minimum(opens, closes)
+        days = np.arange(n_days)
+        highs[days, rng.integers(0, n_bars, n_days)] = high[:, 0]
+        lows[days, rng.integers(0, n_bars, n_days)] = low[:, 0]
+        
+        weights = rng.gamma(2.0, size=(n_days, n_bars))
+        volumes = np.floor(daily['Volume'].to_numpy()[:, np.newaxis] * weights / weights.sum(axis=1, keepdims=True))
+        volumes[:, -1] += daily['Volume'].to_numpy() - volumes.sum(axis=1)
+        
+        offsets = pd.to_timedelta(open_time + ':00') + pd.to_timedelta(np.arange(n_bars) * step, unit='min')
+        index = pd.DatetimeIndex((daily.index.to_numpy()[:, np.newaxis] + offsets.to_numpy()).ravel(), name='Datetime')
+        return pd.DataFrame(
+            {'Open': opens.ravel(), 'High': highs.ravel(), 'Low': lows.ravel(), 'Close': closes.ravel(),
+             'Volume': volumes.ravel()},
+            index=index
+        )
+    
+    def intraday(self, symbols, interval="1m", period="1d"):
+        if period == "1d":
+            if interval != "1m":
+                raise ValueError(f"Synthetic intraday bars of today's session are 1m only, got {interval}")
+            self._request(f"{len(symbols)} symbols intraday")
+            return {symbol: self.minute_bars_for(symbol) for symbol in symbols}
+        
+        if interval not in INTERVAL_MINUTES:
+            raise ValueError(f"Unsupported synthetic interval: {interval}")
+        self._request(f"{len(symbols)} symbols {interval}")
+        return {symbol: self.session_bars_for(symbol, interval, period) for symbol in symbols}
+
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'chart': ChartProvider,
+    'replay': ReplayProvider,
+    'synthetic': SyntheticProvider,
+}
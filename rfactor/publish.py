@@ -0,0 +1,183 @@
+"""
+Versioned Arrow/Parquet snapshots of completed scans, for systems outside the dashboard
+
+Every universe (symbol set and provider, see SnapshotCache.universe_id) has
+its own subdirectory of the publish directory, so a 3-stock test scan never
+replaces the full universe's answer. Each published scan is written there as
+scan-<version>.arrow (uncompressed Arrow IPC, which readers memory-map without
+copying) and scan-<version>.parquet (compressed, for pandas / DuckDB / Spark).
+Then that universe's LATEST is atomically pointed at it. The typed scanner
+table is written as is: float32 metrics, dictionary-encoded Signal / Direction
+/ Recommendation, and a timestamp column. Versions are completion times
+(YYYYmmddTHHMMSSffffff), so they sort in publish order. The metadata names
+the universe and the scan mode (daily, intraday, quotes, adaptive, timeframes).
+
+    PUBLISHER.publish(snapshot, mode='intraday')
+    published_universes("data/published")      # {universe: LATEST metadata}
+    table, meta = read_latest("data/published/yfinance-0123456789abcdef")
+
+pyarrow is imported on first use; without it publishing is skipped.
+"""
+
+import json
+import os
+import threading
+
+from rfactor.metrics import METRICS
+
+PUBLISH_DIR = os.environ.get("RFACTOR_PUBLISH_DIR", os.path.join("data", "published"))
+PUBLISH_KEEP = 20            # Versions kept on disk
+LATEST_FILE = "LATEST"       # JSON pointer to the newest version, replaced atomically
+
+
+def _replace(path, write):
+    """write(tmp_path), then atomically move it over path"""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class SnapshotPublisher:
+    """
+    Writes scheduler / snapshot-cache Snapshots as versioned Arrow + Parquet files
+    directory=None (or "") disables publishing
+    """
+    
+    def __init__(self, directory=PUBLISH_DIR, keep=PUBLISH_KEEP, parquet=True):
+        self.directory = directory
+        self.keep = keep
+        self.parquet = parquet
+        self.last_error = None
+        self._lock = threading.Lock()
+    
+    def publish(self, snapshot, universe=None, mode='daily', provider=None):
+        """
+        Write one Snapshot and point its universe's LATEST at it; best effort, like the snapshot cache
+        universe: subdirectory name (default: SnapshotCache.universe_id of the snapshot's symbols and `provider`)
+        mode: how the table was scored - daily, intraday, quotes, adaptive, timeframes, ...
+        Returns: the version written (None if disabled, empty or the write failed - see last_error)
+        """
+        if not self.directory or snapshot.df is None or snapshot.df.empty:
+            return None
+        
+        try:
+            if universe is None:
+                # Imported here - the scan pipeline imports this module
+                from rfactor.snapshots import SnapshotCache
+                universe = SnapshotCache.universe_id(snapshot.symbols, provider)
+            with METRICS.stage('publish'), self._lock:
+                version = self._write(snapshot, universe, mode)
+        except (ImportError, OSError, ValueError, TypeError) as e:
+            self.last_error = str(e)
+            return None
+        
+        self.last_error = None
+        return version
+    
+    def _write(self, snapshot, universe, mode):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        version = snapshot.created_at.strftime('%Y%m%dT%H%M%S%f')
+        meta = {
+            'version': version,
+            'universe': universe,
+            'mode': mode,
+            'created_at': snapshot.created_at.isoformat(),
+            'rows': len(snapshot.df),
+            'symbols': len(snapshot.symbols),
+            'failed': dict(snapshot.failed),
+            'duration': round(snapshot.duration, 3),
+            'arrow': f"scan-{version}.arrow",
+            'parquet': f"scan-{version}.parquet" if self.parquet else None,
+        }
+        
+        table = pa.Table.from_pandas(snapshot.df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'rfactor': json.dumps(meta).encode(),
+        })
+        
+        directory = os.path.join(self.directory, universe)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, meta['arrow'])
+        
+        def write_arrow(tmp):
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        
+        _replace(path, write_arrow)
+        if self.parquet:
+            _replace(os.path.join(directory, meta['parquet']), lambda tmp: pq.write_table(table, tmp))
+        
+        # Readers switch versions only once every file of this one is in place
+        def write_latest(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+        
+        _replace(os.path.join(directory, LATEST_FILE), write_latest)
+        self._prune(directory)
+        return version
+    
+    def _prune(self, directory):
+        """Remove all but the newest `keep` versions of one universe (open memory maps stay valid)"""
+        versions = sorted(
+            name[len('scan-'):-len('.arrow')] for name in os.listdir(directory)
+            if name.startswith('scan-') and name.endswith('.arrow')
+        )
+        for version in versions[:-self.keep] if self.keep else []:
+            for suffix in ('arrow', 'parquet'):
+                try:
+                    os.remove(os.path.join(directory, f"scan-{version}.{suffix}"))
+                except OSError:
+                    pass
+
+
+def latest_meta(directory):
+    """Metadata of the newest published version of one universe directory (None if nothing was published)"""
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_version(directory, meta):
+    """Memory-mapped Arrow table of one published version (columns are zero-copy views of the file)"""
+    import pyarrow as pa
+    
+    # The table's buffers keep the map open; it is unmapped once they are released
+    source = pa.memory_map(os.path.join(directory, meta['arrow']), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def published_universes(directory=PUBLISH_DIR):
+    """Returns: {universe: metadata of its newest version} of every universe published under `directory`"""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return {}
+    universes = {}
+    for name in names:
+        meta = latest_meta(os.path.join(directory, name))
+        if meta is not None:
+            universes[name] = meta
+    return universes
+
+
+def read_latest(directory):
+    """
+    Newest published scan of one universe directory (<publish directory>/<universe>)
+    Returns: (pyarrow Table, metadata dict), or (None, None) if nothing was published
+    """
+    meta = latest_meta(directory)
+    if meta is None:
+        return None, None
+    return read_version(directory, meta), meta
+
+
+PUBLISHER = SnapshotPublisher()
@@ -0,0 +1,339 @@
+"""
+Background refresh schedulers
+
+Re-run a scan on a daemon thread and publish each result as an immutable,
+versioned Snapshot. The UI only reads the latest snapshot, so filtering and
+sorting never wait on the network.
+
+RefreshScheduler re-scans the whole universe every interval.
+PriorityRefreshScheduler spends a fixed number of symbol fetches per minute.
+Each short cycle it re-scans the symbols with the highest priority: close to
+the ACTIVE threshold, volatile, with accelerating volume, or stale. It merges
+them into the previous table, so names about to cross are seen minutes
+earlier under the same rate limit.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rfactor.metrics import METRICS
+
+PRIORITY_BUDGET = 120        # Symbol fetches per minute
+PRIORITY_CYCLE = 15          # Seconds between adaptive cycles
+PRIORITY_THRESHOLD = 4.0     # R-Factor of RFactorCalculator's ACTIVE signal
+
+# Weights of the priority terms, each roughly 0..1 for a typical symbol
+PRIORITY_WEIGHTS = {
+    'proximity': 2.0,        # 1 at the threshold, 0.5 one point away
+    'volatility': 0.5,       # ATR % relative to the universe median (capped at 3)
+    'acceleration': 1.0,     # Vol Ratio gained since the previous refresh (capped at 3)
+    'staleness': 1.0,        # Age / time a full round-robin pass takes at this budget
+}
+
+# df: scored DataFrame, failed: {symbol: reason}, created_at: datetime of completion
+Snapshot = namedtuple('Snapshot', ['version', 'df', 'symbols', 'failed', 'created_at', 'duration'])
+
+
+class RefreshScheduler:
+    """Daemon thread that re-scans a universe every `interval` seconds"""
+    
+    def __init__(self, scan_fn, interval=300, idle_timeout=None, on_snapshot=None):
+        """
+        scan_fn(symbols, **scan_args) -> (DataFrame, {symbol: reason})
+        idle_timeout: stop after this many seconds without a latest() call
+                      (default: 3 intervals) so abandoned sessions don't keep scanning
+        on_snapshot: called with every new Snapshot after it is published (e.g. PUBLISHER.publish)
+        """
+        self.scan_fn = scan_fn
+        self.on_snapshot = on_snapshot
+        self.interval = float(interval)
+        self.idle_timeout = idle_timeout
+        self.symbols = []
+        self.scan_args = {}
+        self.last_error = None
+        
+        self._snapshot = None
+        self._version = 0
+        self._last_read = time.monotonic()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def configure(self, symbols, interval=None, **scan_args):
+        """Change the universe, interval or scan options; applies from the next cycle"""
+        with self._lock:
+            self.symbols = list(symbols)
+            if interval is not None:
+                self.interval = float(interval)
+            self.scan_args = scan_args
+    
+    def start(self):
+        """Start the worker thread (no-op if already running)"""
+        if self.running:
+            return
+        
+        self._stop.clear()
+        self._last_read = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="rfactor-refresh", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Ask the worker to exit after the current scan"""
+        self._stop.set()
+        self._wake.set()
+    
+    def trigger(self):
+        """Run the next scan now instead of waiting for the interval"""
+        self._wake.set()
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def latest(self):
+        """Most recent snapshot (None before the first scan completes)"""
+        self._last_read = time.monotonic()
+        return self._snapshot
+    
+    def scan_once(self):
+        """Run one scan on the calling thread and publish it"""
+        with self._lock:
+            symbols = list(self.symbols)
+            scan_args = dict(self.scan_args)
+        
+        if not symbols:
+            return None
+        
+        started = time.monotonic()
+        df, failed = self.scan_fn(symbols, **scan_args)
+        
+        with self._lock:
+            self._version += 1
+            # Publishing swaps one reference; readers never see a half-built snapshot
+            self._snapshot = Snapshot(
+                version=self._version,
+                df=df,
+                symbols=tuple(symbols),
+                failed=dict(failed),
+                created_at=datetime.now(),
+                duration=time.monotonic() - started
+            )
+            snapshot = self._snapshot
+        
+        if self.on_snapshot is not None:
+            self.on_snapshot(snapshot)
+        return snapshot
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            
+            idle_timeout = self.idle_timeout if self.idle_timeout is not None else 3 * self.interval
+            if time.monotonic() - self._last_read > idle_timeout:
+                break
+            
+            try:
+                self.scan_once()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the previous snapshot; try again next cycle
+                self.last_error = str(e)
+
+
+class PriorityRefreshScheduler(RefreshScheduler):
+    """
+    Adaptive refresh: each cycle re-scans the `budget * cycle / 60` highest-priority symbols
+    and merges them into the previous table (see module docstring)
+    Symbols never scanned come first, so a new universe is covered within N / budget minutes;
+    seed() hands over a table that is already loaded instead.
+    """
+    
+    def __init__(self, scan_fn, budget=PRIORITY_BUDGET, cycle=PRIORITY_CYCLE, threshold=PRIORITY_THRESHOLD,
+                 weights=None, idle_timeout=None, on_snapshot=None):
+        """
+        scan_fn(symbols, **scan_args) -> (DataFrame, {symbol: reason}), called with one cycle's symbols
+        budget: symbol fetches per minute
+        cycle: seconds between cycles (the base class interval)
+        """
+        super().__init__(scan_fn, interval=cycle, idle_timeout=idle_timeout, on_snapshot=on_snapshot)
+        self.budget = float(budget)
+        self.threshold = float(threshold)
+        self.weights = {**PRIORITY_WEIGHTS, **(weights or {})}
+        self.last_cycle = None
+        
+        self._table = pd.DataFrame()
+        self._failed = {}
+        self._refreshed = {}        # symbol -> monotonic time of the last attempt
+        self._prev_ratio = {}       # symbol -> Vol Ratio before the last refresh
+    
+    def configure(self, symbols, interval=None, budget=None, **scan_args):
+        """Change the universe, cycle length, budget or scan options; applies from the next cycle"""
+        with self._lock:
+            if budget is not None:
+                self.budget = float(budget)
+        super().configure(symbols, interval, **scan_args)
+    
+    def seed(self, df, age=0.0):
+        """Start from an already scored table, scanned `age` seconds ago"""
+        if df is None or df.empty:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._table = df.reset_index(drop=True)
+            self._refreshed.update(dict.fromkeys(df['Symbol'], now - age))
+    
+    # ------------------------------------------------------------------------
+    # Priorities
+    # ------------------------------------------------------------------------
+    
+    @property
+    def per_cycle(self):
+        """Symbols re-scanned per cycle"""
+        return max(1, int(round(self.budget * self.interval / 60)))
+    
+    def priorities(self, symbols, now=None):
+        """
+        Priority of every symbol (higher refreshes sooner; never scanned: inf)
+        Returns: float64 array aligned with symbols
+        """
+        now = time.monotonic() if now is None else now
+        table = self._table.set_index('Symbol') if not self._table.empty else None
+        n = len(symbols)
+        
+        if table is not None:
+            rows = table.reindex(symbols)
+            rfactor = rows['R-Factor'].to_numpy(dtype=np.float64, na_value=np.nan)
+            atr_pct = rows['ATR %'].to_numpy(dtype=np.float64, na_value=np.nan)
+            ratio = rows['Vol Ratio'].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            rfactor = atr_pct = ratio = np.full(n, np.nan)
+        
+        prev_ratio = np.array([self._prev_ratio.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+        refreshed = np.array([self._refreshed.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+        
+        # A full pass over the universe at this budget - staleness 1 means "due on round-robin"
+        full_pass = max(n / max(self.budget, 1e-9) * 60, self.interval)
+        median_atr = np.nanmedian(atr_pct) if np.isfinite(atr_pct).any() else np.nan
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            proximity = 1 / (1 + np.abs(rfactor - self.threshold))
+            volatility = np.clip(atr_pct / median_atr, 0, 3)
+            acceleration = np.clip(ratio - prev_ratio, 0, 3)
+            staleness = (now - refreshed) / full_pass
+        
+        weights = self.weights
+        priority = (
+            weights['proximity'] * np.nan_to_num(proximity)
+            + weights['volatility'] * np.nan_to_num(volatility)
+            + weights['acceleration'] * np.nan_to_num(acceleration)
+            + weights['staleness'] * np.nan_to_num(staleness)
+        )
+        # Never scanned (or not scored yet) - nothing to compare, go first
+        priority[np.isnan(refreshed)] = np.inf
+        return priority
+    
+    def select(self, symbols, now=None):
+        """The per_cycle highest-priority symbols, highest first"""
+        priority = self.priorities(symbols, now)
+        k = min(self.per_cycle, len(symbols))
+        top = np.argpartition(-priority, k - 1)[:k] if k < len(symbols) else np.arange(len(symbols))
+        return [symbols[i] for i in top[np.argsort(-priority[top], kind='stable')]]
+    
+    # ------------------------------------------------------------------------
+    # Cycles
+    # ------------------------------------------------------------------------
+    
+    def apply(self, symbols, picked, df, failed, now=None):
+        """
+        Merge one cycle's scan of `picked` into the table (limited to `symbols`)
+        Returns: (merged table ranked by R-Factor, symbols that crossed the threshold upwards)
+        """
+        now = time.monotonic() if now is None else now
+        old = self._table
+        
+        if not old.empty:
+            before = old.set_index('Symbol')['R-Factor'].reindex(picked).to_dict()
+            ratios = old.set_index('Symbol')['Vol Ratio'].reindex(picked).to_dict()
+            self._prev_ratio.update({symbol: ratios[symbol] for symbol in picked if pd.notna(ratios[symbol])})
+        else:
+            before = {}
+        
+        scanned = set(df['Symbol']) if df is not None and not df.empty else set()
+        wanted = set(symbols)
+        parts = [old[old['Symbol'].isin(wanted) & ~old['Symbol'].isin(scanned)]] if not old.empty else []
+        if scanned:
+            parts.append(df)
+        parts = [part for part in parts if not part.empty]
+        table = (
+            pd.concat(parts, ignore_index=True).sort_values('R-Factor', ascending=False, kind='stable')
+            .reset_index(drop=True) if parts else pd.DataFrame()
+        )
+        
+        crossed = []
+        if scanned:
+            after = df.set_index('Symbol')['R-Factor']
+            for symbol, value in after.items():
+                previous = before.get(symbol)
+                if previous is not None and pd.notna(previous) and previous < self.threshold <= value:
+                    crossed.append(symbol)
+        
+        # Failed symbols keep their last row and wait their turn again rather than being retried every cycle
+        self._refreshed.update(dict.fromkeys(picked, now))
+        self._failed = {
+            symbol: reason for symbol, reason in {**self._failed, **failed}.items()
+            if symbol in wanted and symbol not in scanned
+        }
+        self._table = table
+        
+        METRICS.inc('rfactor_refresh_symbols_total', len(picked))
+        if crossed:
+            METRICS.inc('rfactor_threshold_crossings_total', len(crossed))
+        return table, crossed
+    
+    def scan_once(self):
+        """Re-scan one cycle's symbols on the calling thread, merge and publish"""
+        with self._lock:
+            symbols = list(self.symbols)
+            scan_args = dict(self.scan_args)
+        
+        if not symbols:
+            return None
+        
+        started = time.monotonic()
+        ages = [started - self._refreshed[symbol] for symbol in symbols if symbol in self._refreshed]
+        picked = self.select(symbols, started)
+        df, failed = self.scan_fn(picked, **scan_args)
+        table, crossed = self.apply(symbols, picked, df, failed, time.monotonic())
+        
+        # oldest: age of the stalest symbol when the cycle started
+        self.last_cycle = {
+            'refreshed': len(picked),
+            'crossed': crossed,
+            'oldest': round(max(ages), 1) if ages else None,
+            'pending': sum(symbol not in self._refreshed for symbol in symbols),
+        }
+        
+        with self._lock:
+            self._version += 1
+            self._snapshot = Snapshot(
+                version=self._version,
+                df=table,
+                symbols=tuple(symbols),
+                failed=dict(self._failed),
+                created_at=datetime.now(),
+                duration=time.monotonic() - started
+            )
+            snapshot = self._snapshot
+        
+        if self.on_snapshot is not None:
+            self.on_snapshot(snapshot)
+        return snapshot
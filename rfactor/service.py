@@ -0,0 +1,316 @@
+"""
+Read-only HTTP/JSON query service over published scans (see rfactor.publish)
+
+Answers queries from the newest published version of one universe (see
+rfactor.publish), memory-mapped from its Arrow file. The scan pipeline and Streamlit are never imported. Filters are
+masks over the dictionary codes, the top N comes from a partial selection, and
+each distinct query is encoded once per version. A busy poller therefore costs
+a dict lookup, or a bodiless 304 when it sends back the last ETag.
+
+    GET /v1/scan?top=20&direction=DOWNSIDE&signal=ACTIVE      top N by R-Factor
+    GET /v1/scan?symbols=TCS,INFY&columns=Symbol,LTP,R-Factor
+    GET /v1/snapshot                                          version metadata
+    GET /v1/universes                                         every published universe
+    GET /healthz
+
+Every answer names its universe and scan mode (daily, intraday, quotes, ...).
+
+Filters take the raw values (ACTIVE / WAIT, UPSIDE / DOWNSIDE), comma separated.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from rfactor.metrics import METRICS
+from rfactor.publish import LATEST_FILE, PUBLISH_DIR, latest_meta, published_universes, read_version
+
+SERVICE_TOP = 20             # Rows per /v1/scan answer unless ?top= says otherwise (0: all matches)
+SERVICE_CACHE_SIZE = 256     # Encoded answers kept for the current version
+SERVICE_CHECK = 1.0          # Seconds between checks for a newer published version
+
+# One published version, prepared for querying
+Published = namedtuple('Published', 'meta table rfactor codes categories positions')
+
+
+class QueryError(ValueError):
+    """Bad query parameters (answered with 400)"""
+
+
+def _json(value):
+    return json.dumps(value, default=lambda v: v.isoformat(), separators=(',', ':')).encode()
+
+
+def _split(text):
+    return [part.strip() for part in text.split(',') if part.strip()]
+
+
+class QueryService:
+    """
+    Query engine over the newest version of `universe` in `directory`, plus a small threaded HTTP server
+    Usable without HTTP: respond(path, params) -> (status, body bytes, etag)
+    """
+    
+    FILTERS = ('Signal', 'Direction')
+    UNIVERSE_FIELDS = ('universe', 'mode', 'version', 'created_at', 'rows', 'symbols')
+    
+    def __init__(self, directory=PUBLISH_DIR, universe=None, check_interval=SERVICE_CHECK,
+                 cache_size=SERVICE_CACHE_SIZE, host='127.0.0.1', port=0):
+        self.root = directory
+        self.universe = universe
+        self.directory = os.path.join(directory, universe) if universe else directory
+        self.check_interval = check_interval
+        self.cache_size = cache_size
+        self.host = host
+        self.port = port
+        self._published = None
+        self._checked = 0.0
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._answers = OrderedDict()
+        self._server = None
+    
+    # ------------------------------------------------------------------------
+    # Versions
+    # ------------------------------------------------------------------------
+    
+    def current(self):
+        """Newest published version (None before the first publish), reloaded when LATEST changes"""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval and self._published is not None:
+            return self._published
+        
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(os.path.join(self.directory, LATEST_FILE))
+                stamp = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                return self._published
+            if stamp == self._stamp:
+                return self._published
+            
+            meta = latest_meta(self.directory)
+            if meta is None or (self._published is not None and meta['version'] == self._published.meta['version']):
+                self._stamp = stamp
+                return self._published
+            try:
+                published = self._prepare(meta, read_version(self.directory, meta))
+            except (OSError, ValueError, KeyError):
+                # Pruned or half-written - keep serving the previous version, retry next check
+                return self._published
+            
+            self._stamp = stamp
+            self._published = published
+            self._answers.clear()
+            return published
+    
+    @staticmethod
+    def _prepare(meta, table):
+        """Query arrays of one version - R-Factor values, filter codes, symbol positions"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        rfactor = table.column('R-Factor').to_numpy().astype(np.float64)
+        
+        codes, categories = {}, {}
+        for name in QueryService.FILTERS:
+            column = table.column(name).combine_chunks()
+            if not pa.types.is_dictionary(column.type):
+                column = pc.dictionary_encode(column)
+            # Missing values get code -1
+            codes[name] = pc.fill_null(column.indices, -1).to_numpy(zero_copy_only=False)
+            categories[name] = column.dictionary.to_pylist()
+        
+        # JSON view: float32 metrics as float64 rounded to 4 places (no float32 noise like 4.039999961)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_float32(field.type):
+                table = table.set_column(i, field.name, pc.round(table.column(i).cast(pa.float64()), 4))
+        
+        positions = {symbol: i for i, symbol in enumerate(table.column('Symbol').to_pylist())}
+        return Published(meta, table, rfactor, codes, categories, positions)
+    
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+    
+    def _mask(self, published, name, values):
+        """Rows whose `name` is one of `values` - a lookup on the dictionary codes"""
+        # Code -1 (missing) indexes the trailing False
+        allowed = np.append(np.isin(published.categories[name], [value.upper() for value in values]), False)
+        return allowed[published.codes[name]]
+    
+    def select(self, published, params):
+        """Row positions answering `params`, best R-Factor first"""
+        rows = len(published.rfactor)
+        mask = np.ones(rows, dtype=bool)
+        
+        for name in self.FILTERS:
+            values = _split(params.get(name.lower(), ''))
+            if values:
+                mask &= self._mask(published, name, values)
+        
+        if params.get('symbols'):
+            wanted = [published.positions[symbol] for symbol in _split(params['symbols'].upper())
+                      if symbol in published.positions]
+            keep = np.zeros(rows, dtype=bool)
+            keep[wanted] = True
+            mask &= keep
+        
+        if params.get('min_rfactor'):
+            try:
+                minimum = float(params['min_rfactor'])
+            except ValueError:
+                raise QueryError(f"min_rfactor is not a number: {params['min_rfactor']}")
+            with np.errstate(invalid='ignore'):
+                mask &= published.rfactor >= minimum
+        
+        try:
+            top = int(params.get('top', SERVICE_TOP))
+        except ValueError:
+            raise QueryError(f"top is not an integer: {params['top']}")
+        if top < 0:
+            raise QueryError("top must be >= 0")
+        
+        candidates = np.flatnonzero(mask)
+        values = np.where(np.isnan(published.rfactor), -np.inf, published.rfactor)
+        if top and len(candidates) > top:
+            candidates = candidates[np.argpartition(-values[candidates], top - 1)[:top]]
+        return candidates[np.argsort(-values[candidates], kind='stable')], int(mask.sum())
+    
+    def _scan_answer(self, published, params):
+        positions, matched = self.select(published, params)
+        table = published.table
+        if params.get('columns'):
+            columns = _split(params['columns'])
+            unknown = [column for column in columns if column not in table.column_names]
+            if unknown:
+                raise QueryError(f"Unknown columns: {', '.join(unknown)}")
+            table = table.select(columns)
+        
+        return {
+            'universe': published.meta.get('universe'),
+            'mode': published.meta.get('mode'),
+            'version': published.meta['version'],
+            'created_at': published.meta['created_at'],
+            'total': table.num_rows,
+            'matched': matched,
+            'rows': table.take(positions).to_pylist(),
+        }
+    
+    def respond(self, path, params, etag=None):
+        """
+        Answer one GET
+        Returns: (status code, JSON body bytes, ETag) - 304 with an empty body if etag still matches
+        """
+        if path == '/healthz':
+            return 200, b'{"ok":true}', None
+        if path == '/v1/universes':
+            universes = published_universes(self.root)
+            return 200, _json({
+                'serving': self.universe,
+                'universes': [{**{field: meta.get(field) for field in self.UNIVERSE_FIELDS}, 'universe': name}
+                              for name, meta in universes.items()],
+            }), None
+        if path not in ('/v1/scan', '/v1/snapshot'):
+            return 404, _json({'error': f"Unknown path {path}"}), None
+        
+        published = self.current()
+        if published is None:
+            return 503, _json({'error': "No scan has been published yet"}), None
+        
+        key = (path, tuple(sorted(params.items())))
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None and answer[0] is published:
+                self._answers.move_to_end(key)
+        hit = answer is not None and answer[0] is published
+        METRICS.inc('rfactor_cache_total', layer='service', result='hit' if hit else 'miss')
+        
+        if not hit:
+            try:
+                if path == '/v1/scan':
+                    body = _json(self._scan_answer(published, params))
+                else:
+                    body = _json({**published.meta, 'columns': published.table.column_names})
+            except QueryError as e:
+                return 400, _json({'error': str(e)}), None
+            
+            answer = (published, body, f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+            with self._lock:
+                self._answers[key] = answer
+                while len(self._answers) > self.cache_size:
+                    self._answers.popitem(last=False)
+        
+        _, body, tag = answer
+        if etag == tag:
+            return 304, b'', tag
+        return 200, body, tag
+    
+    # ------------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------------
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        """Serve on a daemon thread (port 0 picks a free port)"""
+        self._server = _ServiceHTTPServer((self.host, self.port), _ServiceHandler)
+        self._server.service = self
+        threading.Thread(target=self._server.serve_forever, name='rfactor-service', daemon=True).start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """Keep-alive GET-only handler answering via server.service.respond()"""
+    
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes - without this every answer waits on a delayed ACK
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        status, body, etag = self.server.service.respond(parts.path, params, self.headers.get('If-None-Match'))
+        
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
+            if etag:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class _ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
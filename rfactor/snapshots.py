@@ -0,0 +1,293 @@
+"""
+Shared scan snapshots - one scan per universe per time bucket, for every session
+
+SnapshotCache keys scored tables by universe (the symbol set, and the provider
+with its settings), the scan arguments and a time bucket (SNAPSHOT_BUCKET
+seconds). The first caller for a universe runs the scan; callers asking for
+the same universe while it runs join that in-flight scan (single flight)
+instead of starting a duplicate. Finished
+snapshots are shared by every session in the process and written to
+SNAPSHOT_DIR, so other processes (more Streamlit workers, cron scans) reuse
+them too; an O_EXCL lock file extends the single flight across processes.
+Files on disk are Arrow IPC with the rest of the Snapshot as JSON in the
+schema metadata - loading one never runs code from the shared directory.
+
+Snapshots are shared objects - readers must treat snapshot.df as read-only.
+Each scan this process runs is also handed to the publisher (rfactor.publish)
+for consumers outside the dashboard, under its universe_id().
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.metrics import METRICS
+from rfactor.processing import scan_symbols
+from rfactor.publish import PUBLISHER
+from rfactor.scheduler import Snapshot
+
+SNAPSHOT_DIR = os.environ.get("RFACTOR_SNAPSHOT_DIR", os.path.join("data", "snapshots"))
+SNAPSHOT_BUCKET = 60         # Seconds - a snapshot serves the bucket it was finished in
+SNAPSHOT_KEEP = 5            # Buckets kept on disk per universe
+SNAPSHOT_LOCK_TIMEOUT = 900  # Seconds before another process's scan lock counts as dead
+SNAPSHOT_POLL = 0.5          # Seconds between checks while another process scans
+
+
+class SnapshotCache:
+    """
+    Process-wide snapshot store with single-flight scans
+    directory=None keeps snapshots in memory only (no cross-process sharing)
+    publisher: SnapshotPublisher that gets every scan this cache runs (None: no publishing)
+    Snapshot.version is the time bucket the scan finished in
+    """
+    
+    def __init__(self, directory=SNAPSHOT_DIR, bucket=SNAPSHOT_BUCKET, keep=SNAPSHOT_KEEP,
+                 lock_timeout=SNAPSHOT_LOCK_TIMEOUT, publisher=None):
+        self.directory = directory
+        self.publisher = publisher
+        self.bucket = bucket
+        self.keep = keep
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._snapshots = {}   # universe key -> newest Snapshot
+        self._inflight = {}    # universe key -> Future of the running scan
+    
+    @staticmethod
+    def universe_id(symbols, provider=None):
+        """
+        Order-independent name of a universe: the symbol set and the provider with its settings
+        provider=None is the fetcher's default provider; also the publish subdirectory (rfactor.publish)
+        """
+        provider = LiveDataFetcher.get_provider(provider)
+        settings = provider.settings() if hasattr(provider, 'settings') else {}
+        digest = hashlib.sha1(f"{sorted(set(symbols))!r}{settings!r}".encode()).hexdigest()[:16]
+        return f"{getattr(provider, 'name', 'default')}-{digest}"
+    
+    @staticmethod
+    def universe_key(symbols, provider=None, **scan_args):
+        """Cache key: universe_id() plus a digest of the scan arguments"""
+        scan = hashlib.sha1(repr(sorted(scan_args.items())).encode()).hexdigest()[:8]
+        return f"{SnapshotCache.universe_id(symbols, provider)}-{scan}"
+    
+    def current_bucket(self, now=None):
+        return int((time.time() if now is None else now) // self.bucket)
+    
+    def get(self, symbols, provider=None, **scan_args):
+        """
+        Snapshot of `symbols` scanned with `scan_args` in the current bucket, from memory or disk
+        (None if not scanned yet)
+        """
+        key = self.universe_key(symbols, provider, **scan_args)
+        bucket = self.current_bucket()
+        
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.version == bucket:
+            return snapshot
+        
+        snapshot = self._load(key, bucket)
+        if snapshot is not None:
+            self._remember(key, snapshot)
+        return snapshot
+    
+    def latest(self, symbols=None, provider=None):
+        """
+        Newest snapshot held in memory - of `symbols` (scanned with any arguments) if given,
+        else of any universe (None if there is none)
+        """
+        prefix = self.universe_id(symbols, provider) + '-' if symbols is not None else ''
+        with self._lock:
+            snapshots = [snapshot for key, snapshot in self._snapshots.items() if key.startswith(prefix)]
+        return max(snapshots, key=lambda snapshot: snapshot.created_at, default=None)
+    
+    def get_or_scan(self, symbols, scan_fn=scan_symbols, provider=None, **scan_args):
+        """
+        Current snapshot of `symbols`, scanning only if this bucket has none
+        scan_fn(symbols, provider=provider, **scan_args) -> (DataFrame, {symbol: reason})
+        Callers arriving while the universe is being scanned wait for that scan
+        Returns: (Snapshot, source) - source is 'hit', 'scan' or 'joined'
+        """
+        key = self.universe_key(symbols, provider, **scan_args)
+        
+        snapshot = self.get(symbols, provider, **scan_args)
+        if snapshot is not None:
+            METRICS.inc('rfactor_cache_total', layer='snapshot', result='hit')
+            return snapshot, 'hit'
+        
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        
+        if not leader:
+            METRICS.inc('rfactor_cache_total', layer='snapshot', result='joined')
+            return flight.result(), 'joined'
+        
+        try:
+            snapshot, source = self._scan(key, symbols, scan_fn, provider, scan_args)
+            flight.set_result(snapshot)
+        except BaseException as e:
+            # Followers see the same failure; nothing is cached
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        
+        METRICS.inc('rfactor_cache_total', layer='snapshot', result='miss' if source == 'scan' else source)
+        return snapshot, source
+    
+    def scan(self, symbols, scan_fn=scan_symbols, provider=None, **scan_args):
+        """get_or_scan() with scan_symbols' return shape - a drop-in RefreshScheduler scan_fn"""
+        snapshot, _ = self.get_or_scan(symbols, scan_fn, provider, **scan_args)
+        return snapshot.df, snapshot.failed
+    
+    def _scan(self, key, symbols, scan_fn, provider, scan_args):
+        """Run the scan under the cross-process lock, or pick up another process's result"""
+        lock_path = self._path(key, 'lock') if self.directory else None
+        if lock_path:
+            while not self._try_lock(lock_path):
+                # Another process is scanning this universe
+                snapshot = self._load(key, self.current_bucket())
+                if snapshot is not None:
+                    self._remember(key, snapshot)
+                    return snapshot, 'joined'
+                time.sleep(SNAPSHOT_POLL)
+        
+        try:
+            # It may have finished between our first look and taking the lock
+            snapshot = self._load(key, self.current_bucket()) if lock_path else None
+            if snapshot is not None:
+                self._remember(key, snapshot)
+                return snapshot, 'hit'
+            
+            started = time.monotonic()
+            df, failed = scan_fn(symbols, provider=provider, **scan_args)
+            snapshot = Snapshot(
+                version=self.current_bucket(),
+                df=df,
+                symbols=tuple(symbols),
+                failed=dict(failed),
+                created_at=datetime.now(),
+                duration=time.monotonic() - started
+            )
+            
+            # An empty scan (network down) is returned but not shared - the next caller retries
+            if not df.empty:
+                self._remember(key, snapshot)
+                self._save(key, snapshot)
+                if self.publisher is not None:
+                    self.publisher.publish(snapshot, universe=self.universe_id(symbols, provider))
+            return snapshot, 'scan'
+        finally:
+            if lock_path:
+                self._unlock(lock_path)
+    
+    def _remember(self, key, snapshot):
+        with self._lock:
+            current = self._snapshots.get(key)
+            if current is None or snapshot.version >= current.version:
+                self._snapshots[key] = snapshot
+    
+    # ------------------------------------------------------------------------
+    # Disk layout: <directory>/<key>-<bucket>.arrow plus <key>.lock while scanning
+    # ------------------------------------------------------------------------
+    
+    def _path(self, key, suffix, bucket=None):
+        name = key if bucket is None else f"{key}-{bucket}"
+        return os.path.join(self.directory, f"{name}.{suffix}")
+    
+    def _load(self, key, bucket):
+        if not self.directory:
+            return None
+        path = self._path(key, 'arrow', bucket)
+        if not os.path.exists(path):
+            return None
+        try:
+            import pyarrow as pa
+            with pa.OSFile(path, 'rb') as source:
+                table = pa.ipc.open_file(source).read_all()
+            meta = json.loads(table.schema.metadata[b'rfactor'])
+            return Snapshot(
+                version=meta['version'],
+                df=table.to_pandas(),
+                symbols=tuple(meta['symbols']),
+                failed=meta['failed'],
+                created_at=datetime.fromisoformat(meta['created_at']),
+                duration=meta['duration']
+            )
+        except Exception:
+            # Half-deleted, from an incompatible version or no pyarrow - scan again
+            return None
+    
+    def _save(self, key, snapshot):
+        if not self.directory:
+            return
+        try:
+            import pyarrow as pa
+            
+            meta = {
+                'version': snapshot.version,
+                'symbols': list(snapshot.symbols),
+                'failed': dict(snapshot.failed),
+                'created_at': snapshot.created_at.isoformat(),
+                'duration': snapshot.duration,
+            }
+            table = pa.Table.from_pandas(snapshot.df)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                b'rfactor': json.dumps(meta).encode(),
+            })
+            
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key, 'arrow', snapshot.version)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except (ImportError, OSError, ValueError, TypeError):
+            # Sharing across processes is best effort; this process still has it in memory
+            return
+        
+        prefix = f"{key}-"
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith('.arrow'):
+                bucket = name[len(prefix):-len('.arrow')]
+                if bucket.isdigit() and int(bucket) <= snapshot.version - self.keep:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+    
+    def _try_lock(self, path):
+        """Take the scan lock file; a lock older than lock_timeout is taken over"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > self.lock_timeout:
+                    os.remove(path)
+            except OSError:
+                pass
+            return False
+        except OSError:
+            # Read-only or missing directory - scan without cross-process dedup
+            return True
+    
+    @staticmethod
+    def _unlock(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+SNAPSHOTS = SnapshotCache(publisher=PUBLISHER)
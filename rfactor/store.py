@@ -0,0 +1,180 @@
+"""
+Persistent daily OHLCV bar store (SQLite, keyed by symbol and date)
+
+Keeps every bar fetched so far so scans only download the missing range
+and a restarted dashboard can fill from disk without touching the network.
+Also remembers symbols that keep failing (the fetcher's negative cache).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class BarStore:
+    """SQLite-backed daily bar store, safe to share between fetch threads"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY,
+                    last_date TEXT,
+                    fetched_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS failures (
+                    symbol TEXT PRIMARY KEY,
+                    reason TEXT,
+                    count INTEGER,
+                    checked_at REAL
+                )
+            """)
+    
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def last_date(self, symbol):
+        """Date of the newest stored bar (None if the symbol was never stored)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT last_date FROM symbols WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+    
+    def fetched_at(self, symbol):
+        """Epoch seconds of the last network refresh (None if never stored)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at FROM symbols WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def is_fresh(self, symbol, max_age):
+        """True if the symbol was refreshed from the network within max_age seconds"""
+        fetched_at = self.fetched_at(symbol)
+        return fetched_at is not None and time.time() - fetched_at < max_age
+    
+    def symbols(self):
+        """All symbols with stored bars"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT symbol FROM symbols ORDER BY symbol")]
+    
+    def touch(self, symbol):
+        """Mark a stored symbol as just fetched without changing its bars"""
+        with self.lock, self._connect() as conn:
+            conn.execute("UPDATE symbols SET fetched_at = ? WHERE symbol = ?", (time.time(), symbol))
+    
+    def merge(self, symbol, hist):
+        """
+        Upsert a fetched history; bars on existing dates are replaced
+        (the latest bar keeps changing intraday)
+        An empty history (nothing new since the last bar) only refreshes fetched_at
+        """
+        frame = None if hist is None or hist.empty else hist[COLUMNS].dropna(subset=['Close'])
+        if frame is None or frame.empty:
+            self.touch(symbol)
+            return
+        
+        dates = pd.DatetimeIndex(frame.index).strftime('%Y-%m-%d')
+        rows = [
+            (symbol, date, *map(float, values))
+            for date, values in zip(dates, frame.itertuples(index=False, name=None))
+        ]
+        
+        with self.lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                """
+                INSERT INTO symbols VALUES (?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    last_date = MAX(COALESCE(last_date, ''), excluded.last_date),
+                    fetched_at = excluded.fetched_at
+                """,
+                (symbol, max(dates), time.time())
+            )
+    
+    def load(self, symbol, start=None, months=None):
+        """
+        Stored bars for one symbol, oldest first
+        start: first date to include; months: only the last N months up to the newest bar
+        """
+        if months is not None:
+            last = self.last_date(symbol)
+            if last is None:
+                return pd.DataFrame(columns=COLUMNS)
+            start = last - pd.DateOffset(months=months)
+        
+        query = "SELECT date, open, high, low, close, volume FROM bars WHERE symbol = ?"
+        params = [symbol]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        query += " ORDER BY date"
+        
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        frame = pd.DataFrame(rows, columns=['Date'] + COLUMNS)
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('Date')), name='Date')
+        return frame
+    
+    def record_failure(self, symbol, reason):
+        """Count one more consecutive failure of symbol (reset by clear_failures)"""
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO failures VALUES (?, ?, 1, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    reason = excluded.reason,
+                    count = count + 1,
+                    checked_at = excluded.checked_at
+                """,
+                (symbol, reason, time.time())
+            )
+    
+    def clear_failures(self, symbols):
+        """Forget the failure history of symbols that fetched fine again"""
+        symbols = list(symbols)
+        if not symbols:
+            return
+        with self.lock, self._connect() as conn:
+            conn.executemany("DELETE FROM failures WHERE symbol = ?", [(symbol,) for symbol in symbols])
+    
+    def failures(self):
+        """{symbol: (reason, consecutive failures, epoch seconds of the last check)}"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT symbol, reason, count, checked_at FROM failures").fetchall()
+        return {symbol: (reason, count, checked_at) for symbol, reason, count, checked_at in rows}
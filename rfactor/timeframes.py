@@ -0,0 +1,214 @@
+"""
+Multi-timeframe R-Factor from one download of the finest bars
+
+R-Factor on hourly and weekly bars confirms (or contradicts) the daily signal.
+Separate history requests per interval would multiply the scan, so a
+multi-timeframe scan downloads one interval only: TIMEFRAME_INTERVAL bars over
+TIMEFRAME_PERIOD, one bulk request per chunk. Every timeframe is built from
+those bars in memory, with indicators.resample_bars over the whole
+(symbols x bars) panel: first open, highest high, lowest low, last close and
+summed volume. ATR and the RFactorCalculator batch then score every timeframe
+of the chunk together.
+
+The daily timeframe is the scanner table, the same columns as a daily scan.
+Every other timeframe adds columns suffixed with its label:
+
+    Change % 1H, Vol Ratio 1H, R-Factor 1H, Signal 1H, Direction 1H
+    Change % 1W, Vol Ratio 1W, R-Factor 1W, Signal 1W, Direction 1W
+    
+    df, failed = scan_timeframes(symbols, timeframes=('1h', '1wk'))
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rfactor import indicators
+from rfactor.baseline import _with_retry
+from rfactor.calculator import RFactorCalculator
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.intraday import SESSION_OPEN, _seconds, exchange_time
+from rfactor.metrics import METRICS
+from rfactor.processing import process_stock_data
+from rfactor.providers import COLUMNS, INTERVAL_MINUTES
+
+TIMEFRAME_INTERVAL = "60m"   # Finest bars downloaded - Yahoo keeps 60m bars for 730 days, 1m for 7
+TIMEFRAME_PERIOD = "6mo"     # 26 weekly bars: enough for the 14-bar ATR and 20-bar average volume
+TIMEFRAME_ATR_PERIOD = 14    # Same windows as LiveDataFetcher._build_stock_record
+TIMEFRAME_VOLUME_WINDOW = 20
+TIMEFRAME_CHUNK = 50         # Symbols per bulk request
+
+# Timeframe -> column suffix; '1d' is the scanner table itself
+TIMEFRAMES = {
+    '1h': '1H',
+    '1d': '1D',
+    '1wk': '1W',
+}
+
+# Added per extra timeframe: (column, calculate_rfactor_batch key)
+TIMEFRAME_COLUMNS = (
+    ('Change %', 'pct_change'),
+    ('Vol Ratio', 'volume_ratio'),
+    ('R-Factor', 'rfactor'),
+    ('Signal', 'signal'),
+    ('Direction', 'direction'),
+)
+
+INPUTS = ('current_price', 'prev_close', 'atr', 'current_volume', 'avg_volume')
+
+
+def bar_starts(index, timeframe):
+    """
+    Position of the first bar of each `timeframe` bar in a sorted index of finer bars
+    Hourly bars start at the session open (09:15, 10:15, ...) like Yahoo's 60m bars; weeks start on Monday
+    """
+    local = exchange_time(index)
+    if timeframe == '1h':
+        anchor = pd.Timedelta(minutes=_seconds(SESSION_OPEN) // 60 % 60)
+        keys = (local - anchor).floor('h')
+    elif timeframe == '1d':
+        keys = local.normalize()
+    elif timeframe == '1wk':
+        keys = local.normalize() - pd.to_timedelta(local.weekday, unit='D')
+    else:
+        raise ValueError(f"Unsupported timeframe: {timeframe} (one of {', '.join(TIMEFRAMES)})")
+    
+    keys = keys.asi8
+    if not len(keys):
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+
+
+def latest_bars(panels, period=TIMEFRAME_ATR_PERIOD, window=TIMEFRAME_VOLUME_WINDOW):
+    """
+    R-Factor inputs of every symbol's newest bar, as LiveDataFetcher._build_stock_record takes them
+    from one symbol's bars
+    Returns: {input: array} for INPUTS, plus 'bars' (bars per symbol)
+    """
+    close = indicators.as_panel(panels['Close'])
+    valid = ~np.isnan(close)
+    
+    # A symbol's missing bars move to the front, so its last two columns are its last two bars
+    order = np.argsort(valid, axis=1, kind='stable')
+    high, low, close, volume = (
+        np.take_along_axis(indicators.as_panel(panels[field]), order, axis=1)
+        for field in ('High', 'Low', 'Close', 'Volume')
+    )
+    
+    n_symbols = close.shape[0]
+    missing = np.full(n_symbols, np.nan)
+    return {
+        'current_price': close[:, -1] if close.shape[1] else missing,
+        'prev_close': close[:, -2] if close.shape[1] > 1 else missing,
+        'atr': indicators.simple_atr(high, low, close, period),
+        'current_volume': volume[:, -1] if volume.shape[1] else missing,
+        'avg_volume': indicators.average_volume(volume, window),
+        'bars': valid.sum(axis=1),
+    }
+
+
+def score_timeframes(histories, timeframes=('1h', '1wk'), now=None):
+    """
+    Scanner table of the daily bars resampled from `histories`, plus the columns of each extra timeframe
+    histories: {symbol: OHLCV DataFrame} of bars no coarser than any timeframe
+    Returns: (process_stock_data table, symbols without enough daily bars)
+    """
+    timeframes = [timeframe for timeframe in dict.fromkeys(timeframes) if timeframe != '1d']
+    symbols, index, panels = indicators.build_panel(histories, fields=COLUMNS)
+    if not symbols:
+        return pd.DataFrame(), []
+    
+    with METRICS.stage('indicators'):
+        inputs = {
+            timeframe: latest_bars(indicators.resample_bars(panels, bar_starts(index, timeframe)))
+            for timeframe in ['1d'] + timeframes
+        }
+    
+    # Same checks as _build_stock_record
+    daily = inputs['1d']
+    with np.errstate(invalid='ignore'):
+        scored = (
+            (daily['bars'] >= TIMEFRAME_ATR_PERIOD)
+            & ~np.isnan(daily['current_price']) & ~np.isnan(daily['prev_close'])
+            & (daily['current_price'] != 0)
+        )
+    rows = np.flatnonzero(scored)
+    
+    timestamp = now or datetime.now()
+    records = [
+        {
+            'symbol': symbols[row],
+            **{key: float(daily[key][row]) for key in INPUTS},
+            'success': True,
+            'timestamp': timestamp
+        }
+        for row in rows
+    ]
+    df = process_stock_data(records)
+    short = [symbols[row] for row in np.flatnonzero(~scored)]
+    if df.empty or not timeframes:
+        return df, short
+    
+    # Every extra timeframe in one batch: row block i is timeframes[i]
+    with METRICS.stage('score'):
+        result = RFactorCalculator.calculate_rfactor_batch(
+            **{key: np.concatenate([inputs[timeframe][key][rows] for timeframe in timeframes]) for key in INPUTS},
+            labels=False
+        )
+    
+    n = len(rows)
+    for i, timeframe in enumerate(timeframes):
+        block = result.iloc[i * n:(i + 1) * n]
+        # Too few bars on this timeframe (e.g. weekly on a recent listing) - leave it blank
+        enough = inputs[timeframe]['bars'][rows] >= TIMEFRAME_ATR_PERIOD
+        label = TIMEFRAMES[timeframe]
+        for column, key in TIMEFRAME_COLUMNS:
+            values = block[key].astype('float32') if key not in ('signal', 'direction') else block[key]
+            df[f'{column} {label}'] = values.set_axis(df.index).where(enough)
+    
+    return df, short
+
+
+def scan_timeframes(symbols, timeframes=('1h', '1wk'), provider=None, chunk_size=TIMEFRAME_CHUNK,
+                    interval=TIMEFRAME_INTERVAL, period=TIMEFRAME_PERIOD):
+    """
+    Download `interval` bars once per chunk and score the daily table plus every timeframe from them
+    Returns: (scanner table, {symbol: reason}) like processing.scan_symbols
+    Raises: ValueError for an unknown timeframe or an interval that does not divide one
+    """
+    unknown = [timeframe for timeframe in timeframes if timeframe not in TIMEFRAMES]
+    if unknown:
+        raise ValueError(f"Unsupported timeframes: {', '.join(unknown)} (one of {', '.join(TIMEFRAMES)})")
+    if interval not in INTERVAL_MINUTES:
+        raise ValueError(f"Unsupported bar interval: {interval} (one of {', '.join(INTERVAL_MINUTES)})")
+    if 60 % INTERVAL_MINUTES[interval]:
+        raise ValueError(f"{interval} bars do not add up to hours")
+    
+    provider = LiveDataFetcher.get_provider(provider)
+    symbols = list(dict.fromkeys(symbols))
+    failed = {}
+    tables = []
+    started = time.perf_counter()
+    
+    with METRICS.stage('scan'):
+        for start in range(0, len(symbols), max(1, int(chunk_size))):
+            chunk = symbols[start:start + chunk_size]
+            histories, reason = _with_retry(
+                lambda: provider.intraday(chunk, interval=interval, period=period), 'chunk', {}
+            )
+            df, short = score_timeframes(histories, timeframes)
+            tables.append(df)
+            failed.update({symbol: 'too_few_bars' for symbol in short})
+            failed.update({symbol: reason or 'empty_history' for symbol in chunk
+                           if symbol not in histories and symbol not in failed})
+        
+        tables = [df for df in tables if not df.empty]
+        df = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    
+    for reason in failed.values():
+        METRICS.inc('rfactor_fetch_failures_total', reason=reason)
+    
+    METRICS.set('rfactor_scan_rows_per_second', round(len(df) / max(time.perf_counter() - started, 1e-9), 1))
+    return df, failed
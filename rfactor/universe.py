@@ -0,0 +1,134 @@
+"""
+Scan universes - the NSE F&O stock list
+
+Universe files (fno_data.csv or any other .csv / one-per-line .txt) are read
+and normalised once at load time: exchange suffix stripped, upper-cased,
+renamed tickers mapped to their current symbol, malformed entries and
+duplicates dropped. Symbols that keep failing at runtime are tracked by the
+fetcher's negative cache (see BarStore.record_failure), not here.
+"""
+
+import csv
+import os
+import re
+
+# Yahoo tickers of the F&O segment shipped with the app (one "symbol" column)
+FNO_DATA_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fno_data.csv")
+
+# NSE symbols: letters, digits, '&' and '-' (M&M, BAJAJ-AUTO)
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9&\-]{0,19}$")
+
+# Old ticker -> current ticker, for lists that predate a rename
+RENAMED_SYMBOLS = {
+    "GMRINFRA": "GMRAIRPORT",   # GMR Infrastructure -> GMR Airports Infrastructure (2024)
+    "ZOMATO": "ETERNAL",        # Zomato -> Eternal (2025)
+}
+
+# ============================================================================
+# NSE F&O STOCK LIST (220+ STOCKS) - EXACT SYMBOLS
+# ============================================================================
+BUILTIN_FNO_STOCKS = [
+    "360ONE", "AARTIIND", "ABB", "ABBOTINDIA", "ABCAPITAL", "ACC", "ADANIENSOL",
+    "ADANIENT", "ADANIGREEN", "ADANIPORTS", "ADANIPOWER", "ALKEM", "AMBERENTERP",
+    "AMBUJACEM", "ANGELONE", "APOLLOHOSP", "APOLLOTYRE", "ASHOKLEY", "ASIANPAINT",
+    "ASTRAL", "ATGL", "ATUL", "AUBANK", "AUROPHARMA", "AXISBANK", "BAJAJ-AUTO",
+    "BAJAJFINSV", "BAJFINANCE", "BALKRISIND", "BANDHANBNK", "BANKBARODA", "BATAINDIA",
+    "BEL", "BERGEPAINT", "BHARATFORG", "BHARTIARTL", "BHEL", "BIOCON", "BOSCHLTD",
+    "BPCL", "BRITANNIA", "BSE", "BSOFT", "CANBK", "CANFINHOME", "CHAMBLFERT",
+    "CHOLAFIN", "CIPLA", "COALINDIA", "COFORGE", "COLPAL", "CONCOR", "COROMANDEL",
+    "CROMPTON", "CUB", "CUMMINSIND", "CYIENT", "DABUR", "DALBHARAT", "DEEPAKNTR",
+    "DELHIVERY", "DIVISLAB", "DIXON", "DLF", "DMART", "DRREDDY", "EICHERMOT",
+    "ESCORTS", "EXIDEIND", "FEDERALBNK", "GAIL", "GLENMARK", "GMRAIRPORT", "GNFC",
+    "GODREJCP", "GODREJPROP", "GRASIM", "GUJGASLTD", "HAL", "HAVELLS",
+    "HCLTECH", "HDFCAMC", "HDFCBANK", "HDFCLIFE", "HEROMOTOCO", "HINDALCO",
+    "HINDCOPPER", "HINDPETRO", "HINDUNILVR", "HINDZINC", "ICICIBANK", "ICICIGI",
+    "ICICIPRULI", "IDEA", "IDFCFIRSTB", "IEX", "IGL", "INDHOTEL", "INDIAMART",
+    "INDIANB", "INDIGO", "INDUSINDBK", "INDUSTOWER", "INFY", "IOC", "IPCALAB",
+    "IRB", "IRCTC", "IRFC", "ITC", "JINDALSTEL", "JIOFIN", "JKCEMENT", "JSL",
+    "JSWENERGY", "JSWSTEEL", "JUBLFOOD", "KAJARIACER", "KAYNES", "KEI", "KFINTECH",
+    "KOTAKBANK", "KPITTECH", "LALPATHLAB", "LAURUSLABS", "LICHSGFIN", "LICI",
+    "LTIM", "LT", "LTTS", "LUPIN", "M&M", "M&MFIN", "MANAPPURAM", "MARICO",
+    "MARUTI", "MAXHEALTH", "MCX", "METROPOLIS", "MFSL", "MGL", "MOTHERSON",
+    "MPHASIS", "MRF", "MUTHOOTFIN", "NATIONALUM", "NAUKRI", "NAVINFLUOR",
+    "NESTLEIND", "NHPC", "NMDC", "NTPC", "OBEROIRLTY", "OFSS", "OIL", "ONGC",
+    "PAGEIND", "PAYTM", "PEL", "PERSISTENT", "PETRONET", "PFC", "PGEL",
+    "PIDILITIND", "PIIND", "PNB", "POLICYBZR", "POLYCAB", "POWERGRID", "PRESTIGE",
+    "PVRINOX", "RAMCOCEM", "RBLBANK", "RECLTD", "RELIANCE", "SAIL", "SBICARD",
+    "SBILIFE", "SBIN", "SHREECEM", "SHRIRAMFIN", "SIEMENS", "SJVN", "SONACOMS",
+    "SONATSOFTW", "STARHEALTH", "SUNPHARMA", "SUNTV", "SYNGENE", "TATACHEM",
+    "TATACOMM", "TATACONSUM", "TATAELXSI", "TATAMOTORS", "TATAPOWER", "TATASTEEL",
+    "TCS", "TECHM", "TIINDIA", "TITAN", "TORNTPHARM", "TRENT", "TVSMOTOR",
+    "UBL", "ULTRACEMCO", "UNIONBANK", "UPL", "VBL", "VEDL", "VOLTAS", "WIPRO",
+    "YESBANK", "ZEEL", "ETERNAL", "ZYDUSLIFE"
+]
+
+def normalize_symbol(symbol, suffix=".NS"):
+    """
+    Canonical NSE symbol: trimmed, upper-cased, exchange suffix stripped, renames applied
+    Returns: the symbol, or None if it is not a valid NSE symbol
+    """
+    symbol = str(symbol or '').strip().upper()
+    if suffix and symbol.endswith(suffix):
+        symbol = symbol[:-len(suffix)]
+    symbol = RENAMED_SYMBOLS.get(symbol, symbol)
+    return symbol if SYMBOL_PATTERN.match(symbol) else None
+
+
+def normalize_symbols(symbols, suffix=".NS", rejected=None):
+    """
+    Normalise a symbol list, keeping the first occurrence of each symbol
+    rejected: optional dict filled with {raw entry: reason} ('invalid' / 'duplicate')
+    """
+    seen = {}
+    for raw in symbols:
+        symbol = normalize_symbol(raw, suffix)
+        if symbol is None:
+            if rejected is not None and str(raw or '').strip():
+                rejected[raw] = 'invalid'
+        elif symbol in seen:
+            if rejected is not None:
+                rejected[raw] = 'duplicate'
+        else:
+            seen[symbol] = True
+    return list(seen)
+
+
+def load_universe(path, column="symbol", suffix=".NS", rejected=None):
+    """
+    Symbols from a universe file: CSV with a `column` header, else one symbol per line
+    ('#' starts a comment), normalised with normalize_symbols
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            if column not in (reader.fieldnames or []):
+                raise ValueError(f"{path} has no '{column}' column")
+            raw = [row.get(column) for row in reader]
+        else:
+            raw = [line.split('#', 1)[0].strip() for line in f]
+    return normalize_symbols(raw, suffix, rejected)
+
+
+def load_csv(path=FNO_DATA_CSV, column="symbol", suffix=".NS"):
+    """Symbols from a CSV universe file, exchange suffix stripped, duplicates dropped"""
+    return load_universe(path, column, suffix)
+
+
+# The shipped universe file, or the built-in list if it is missing or unreadable
+try:
+    FNO_STOCKS = load_universe(FNO_DATA_CSV) or normalize_symbols(BUILTIN_FNO_STOCKS)
+except (OSError, ValueError):
+    FNO_STOCKS = normalize_symbols(BUILTIN_FNO_STOCKS)
+
+# Total stocks in F&O
+TOTAL_FNO_STOCKS = len(FNO_STOCKS)
+
+# Verification examples used by "Test 3 Stocks"
+TEST_STOCKS = ["TATAELXSI", "HDFCAMC", "SHRIRAMFIN"]
+
+# Named universes for headless scans
+UNIVERSES = {
+    "test": TEST_STOCKS,
+    "quick": FNO_STOCKS[:50],
+    "fno": FNO_STOCKS,
+}
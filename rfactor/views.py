@@ -0,0 +1,147 @@
+"""
+Memoized scanner views - filtered table, headline stats and top-N panels
+
+Every Streamlit rerun (any widget click) redraws the whole page. A ScanView is
+built once per (scored frame, filters) and reused by every rerun until a new
+scan or snapshot replaces the frame. Scored frames are never modified in place,
+so the frame object itself is the data version.
+
+Within a view, the top-N panels use partial selection (argpartition) instead
+of a full sort; the sorted table, its display labels and the CSV export are
+only built the first time they are asked for.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from rfactor.metrics import METRICS
+from rfactor.processing import to_display
+
+VIEW_TOP_N = 10              # Rows per top-signals panel
+VIEW_CACHE_SIZE = 32         # Views kept per process (sessions share snapshot frames)
+
+
+def _isin(column, values):
+    """Boolean mask of column.isin(values) - a lookup on the category codes for Categoricals"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Code -1 (missing) indexes the trailing False
+        allowed = np.append(column.cat.categories.isin(list(values)), False)
+        return allowed[column.cat.codes.to_numpy()]
+    return column.isin(list(values)).to_numpy()
+
+
+def top_positions(values, candidates, n):
+    """
+    Positions of the n largest values among `candidates`, largest first (NaN never selected)
+    O(len(candidates) + n log n) - only the selected rows are sorted
+    """
+    candidates = candidates[~np.isnan(values[candidates])]
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(-values[candidates], n - 1)[:n]]
+    return candidates[np.argsort(-values[candidates], kind='stable')]
+
+
+class ScanView:
+    """One filtered view of a scored scanner table (see processing.process_stock_data)"""
+    
+    def __init__(self, df, signal_filter, direction_filter, top_n=VIEW_TOP_N):
+        self.source = df
+        self.top_n = top_n
+        
+        if df.empty:
+            self.rfactor = np.empty(0)
+            self.positions = np.empty(0, dtype=np.intp)
+            self.upside = self.downside = np.zeros(0, dtype=bool)
+            active = 0
+        else:
+            self.rfactor = df['R-Factor'].to_numpy(np.float64)
+            mask = _isin(df['Signal'], signal_filter) & _isin(df['Direction'], direction_filter)
+            self.positions = np.flatnonzero(mask)
+            self.upside = _isin(df['Direction'], ['UPSIDE'])
+            self.downside = _isin(df['Direction'], ['DOWNSIDE'])
+            active = int(np.count_nonzero(_isin(df['Signal'], ['ACTIVE'])[self.positions]))
+        
+        filtered = self.rfactor[self.positions]
+        valid = filtered[~np.isnan(filtered)]
+        self.stats = {
+            'total': len(df),
+            'filtered': len(self.positions),
+            'active': active,
+            'avg_rfactor': float(valid.mean()) if len(valid) else 0.0,
+            'upside': int(np.count_nonzero(self.upside[self.positions])),
+            'downside': int(np.count_nonzero(self.downside[self.positions])),
+        }
+        
+        # Re-entrant: csv() builds table(), which builds df
+        self._lock = threading.RLock()
+        self._memo = {}
+    
+    def _memoized(self, key, build):
+        """build() once per key - views are shared by sessions and their script threads"""
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = build()
+            return self._memo[key]
+    
+    def top(self, direction):
+        """Display rows of the top_n filtered signals in one direction ('UPSIDE' / 'DOWNSIDE'), best first"""
+        def build():
+            side = self.upside if direction == 'UPSIDE' else self.downside
+            rows = top_positions(self.rfactor, self.positions[side[self.positions]], self.top_n)
+            return to_display(self.source.iloc[rows])
+        return self._memoized(('top', direction), build)
+    
+    @property
+    def df(self):
+        """Filtered rows sorted by R-Factor (highest first), typed columns"""
+        def build():
+            order = np.argsort(-self.rfactor[self.positions], kind='stable')
+            return self.source.iloc[self.positions[order]]
+        return self._memoized('df', build)
+    
+    def table(self, columns=None):
+        """Display-labelled sorted table, optionally limited to `columns`"""
+        columns = tuple(columns) if columns is not None else None
+        
+        def build():
+            df = self.df if columns is None else self.df[list(columns)]
+            return to_display(df)
+        return self._memoized(('table', columns), build)
+    
+    def csv(self):
+        """CSV export of the sorted table - built on first call (e.g. a deferred download)"""
+        return self._memoized('csv', lambda: self.table().to_csv(index=False))
+
+
+class ViewCache:
+    """LRU of ScanViews keyed by (scored frame, filters), shared by every session in the process"""
+    
+    def __init__(self, size=VIEW_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._views = OrderedDict()
+    
+    def get(self, df, signal_filter, direction_filter, top_n=VIEW_TOP_N):
+        """Cached ScanView, built on a miss"""
+        # The entry holds the frame, so its id() cannot be reused while it is cached
+        key = (id(df), tuple(sorted(signal_filter)), tuple(sorted(direction_filter)), top_n)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None and view.source is df:
+                self._views.move_to_end(key)
+                METRICS.inc('rfactor_cache_total', layer='view', result='hit')
+                return view
+        
+        METRICS.inc('rfactor_cache_total', layer='view', result='miss')
+        view = ScanView(df, signal_filter, direction_filter, top_n)
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > self.size:
+                self._views.popitem(last=False)
+        return view
+
+
+VIEWS = ViewCache()
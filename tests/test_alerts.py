@@ -0,0 +1,147 @@
+"""
+AlertEngine transitions, dedup and rate limits, delivered over HTTP to an AlertReceiver
+"""
+
+import pandas as pd
+import pytest
+
+from rfactor import alerts
+from rfactor.alerts import AlertEngine, AlertReceiver, WebhookSink
+
+
+class Clock:
+    """Stands in for time.time() in rfactor.alerts - dedup and rate limits run on it"""
+    
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(alerts, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def receiver():
+    with AlertReceiver() as receiver:
+        yield receiver
+
+
+def scan(rows):
+    """Typed scanner table of {symbol: (R-Factor, Signal, Direction)}"""
+    return pd.DataFrame({
+        'Symbol': list(rows),
+        'LTP': 100.0,
+        'Change %': [1.0 if row[2] == 'UPSIDE' else -1.0 for row in rows.values()],
+        'R-Factor': [row[0] for row in rows.values()],
+        'Signal': pd.Categorical([row[1] for row in rows.values()], categories=['ACTIVE', 'WAIT', 'ERROR']),
+        'Direction': pd.Categorical([row[2] for row in rows.values()], categories=['UPSIDE', 'DOWNSIDE', 'N/A']),
+    })
+
+
+def received(receiver):
+    return sorted((event['kind'], event['symbol']) for event in receiver.events)
+
+
+FIRST = {
+    'WAKE': (3.0, 'WAIT', 'UPSIDE'),
+    'CROSS': (5.0, 'ACTIVE', 'UPSIDE'),
+    'FLIP': (4.5, 'ACTIVE', 'UPSIDE'),
+    'QUIET': (2.0, 'WAIT', 'DOWNSIDE'),
+    'STRONG': (7.0, 'ACTIVE', 'UPSIDE'),
+}
+
+SECOND = {
+    'WAKE': (4.5, 'ACTIVE', 'UPSIDE'),      # WAIT -> ACTIVE
+    'CROSS': (6.5, 'ACTIVE', 'UPSIDE'),     # crossed 6.0
+    'FLIP': (4.5, 'ACTIVE', 'DOWNSIDE'),    # direction flip while ACTIVE
+    'QUIET': (2.5, 'WAIT', 'UPSIDE'),       # flip, but never ACTIVE
+    'STRONG': (7.2, 'ACTIVE', 'UPSIDE'),    # already above 6.0
+    'NEW': (8.0, 'ACTIVE', 'UPSIDE'),       # first seen - sets its state only
+}
+
+
+def test_only_transitions_reach_the_receiver(clock, receiver):
+    engine = AlertEngine([WebhookSink(receiver.url)])
+    
+    assert engine.process(scan(FIRST)) == []
+    delivered = engine.process(scan(SECOND))
+    
+    expected = [('active', 'WAKE'), ('direction', 'FLIP'), ('strong', 'CROSS')]
+    assert sorted((event.kind, event.symbol) for event in delivered) == expected
+    assert receiver.wait(len(expected))
+    assert received(receiver) == expected
+    
+    # Same scan again - nothing changed, nothing sent
+    assert engine.process(scan(SECOND)) == []
+    assert len(receiver.events) == len(expected)
+
+
+def test_display_labels_diff_like_codes(clock):
+    engine = AlertEngine()
+    labelled = scan(SECOND)
+    labelled['Signal'] = labelled['Signal'].cat.rename_categories(alerts.SIGNAL_LABELS)
+    labelled['Direction'] = labelled['Direction'].cat.rename_categories(alerts.DIRECTION_LABELS)
+    
+    engine.process(scan(FIRST))
+    assert sorted((event.kind, event.symbol) for event in engine.process(labelled)) == [
+        ('active', 'WAKE'), ('direction', 'FLIP'), ('strong', 'CROSS')
+    ]
+
+
+def test_repeat_within_dedup_window_is_dropped(clock, receiver):
+    engine = AlertEngine([WebhookSink(receiver.url)], dedup=1800)
+    wait = {'WAKE': (3.0, 'WAIT', 'UPSIDE')}
+    active = {'WAKE': (4.5, 'ACTIVE', 'UPSIDE')}
+    
+    engine.process(scan(wait))
+    assert [event.kind for event in engine.process(scan(active))] == ['active']
+    
+    # Back to WAIT and ACTIVE again ten minutes later - the same event, dropped
+    clock.now += 600
+    engine.process(scan(wait))
+    assert engine.process(scan(active)) == []
+    
+    # Once the dedup window has passed it is sent again
+    clock.now += 1800
+    engine.process(scan(wait))
+    assert [event.kind for event in engine.process(scan(active))] == ['active']
+    
+    assert receiver.wait(2)
+    assert received(receiver) == [('active', 'WAKE'), ('active', 'WAKE')]
+
+
+def test_rate_limit_caps_events_per_symbol(clock, receiver):
+    # No dedup, so only the rate limit stops a symbol flipping back and forth
+    engine = AlertEngine([WebhookSink(receiver.url)], dedup=0, rate=2, rate_window=600)
+    up = {'FLIP': (4.5, 'ACTIVE', 'UPSIDE')}
+    down = {'FLIP': (4.5, 'ACTIVE', 'DOWNSIDE')}
+    
+    engine.process(scan(up))
+    sent = [len(engine.process(scan(side))) for side in (down, up, down, up)]
+    assert sent == [1, 1, 0, 0]
+    
+    # The window slides - the next flip is sent
+    clock.now += 600
+    assert len(engine.process(scan(down))) == 1
+    
+    assert receiver.wait(3)
+    assert received(receiver) == [('direction', 'FLIP')] * 3
+
+
+def test_state_file_carries_dedup_across_restarts(clock, tmp_path):
+    path = str(tmp_path / 'alerts.json')
+    engine = AlertEngine(state_path=path)
+    engine.process(scan(FIRST))
+    assert len(engine.process(scan(SECOND))) == 3
+    
+    # A restarted engine diffs against the saved state and remembers what it sent
+    restarted = AlertEngine(state_path=path)
+    assert restarted.process(scan(SECOND)) == []
+    assert [(event.kind, event.symbol) for event in restarted.process(scan(FIRST))] == [('direction', 'FLIP')]
+    assert restarted.process(scan(SECOND)) == []
@@ -0,0 +1,98 @@
+"""
+Quote-only Baseline.scan must score like a full scan_symbols over the same daily bars
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rfactor.baseline import Baseline
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.processing import scan_symbols
+from rfactor.providers import SyntheticProvider
+
+SESSION = '2024-06-28'
+SYMBOLS = SyntheticProvider.universe(120)
+
+
+class Counting(SyntheticProvider):
+    """SyntheticProvider that records each download's period"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.periods = []
+    
+    def download(self, symbols, period="1mo", start=None, errors=None):
+        self.periods.append(period)
+        return super().download(symbols, period, start, errors)
+
+
+@pytest.fixture(autouse=True)
+def no_store(monkeypatch):
+    monkeypatch.setattr(LiveDataFetcher, 'store', None)
+
+
+@pytest.fixture
+def provider():
+    return Counting(bars=80, seed=9, end=SESSION)
+
+
+def assert_same_scores(actual, expected):
+    actual = actual.set_index('Symbol')
+    expected = expected.set_index('Symbol').loc[actual.index]
+    for column in ('LTP', 'Prev Close', 'ATR', 'Volume', 'Avg Volume'):
+        np.testing.assert_allclose(actual[column].astype('float64'), expected[column].astype('float64'),
+                                   rtol=1e-9, err_msg=column)
+    for column in ('Change %', 'ATR %', 'Vol Ratio', 'R-Factor', 'K Factor', 'Signal', 'Direction', 'Recommendation'):
+        assert actual[column].tolist() == expected[column].tolist(), column
+
+
+def test_quote_scan_matches_full_scan(provider):
+    expected, expected_failed = scan_symbols(SYMBOLS, provider=provider)
+    assert expected_failed == {}
+    
+    baseline = Baseline()
+    df, failed = baseline.scan(SYMBOLS, provider=provider, session_date=SESSION)
+    assert failed == {}
+    assert df['Symbol'].tolist() == SYMBOLS
+    assert_same_scores(df, expected)
+    
+    # Every symbol is in the baseline now - the next scan is quotes only
+    provider.periods.clear()
+    again, _ = baseline.scan(SYMBOLS, provider=provider, session_date=SESSION)
+    assert set(provider.periods) == {'1d'}
+    assert_same_scores(again, expected)
+
+
+def test_saved_baseline_scores_the_same(provider, tmp_path):
+    expected, _ = scan_symbols(SYMBOLS, provider=provider)
+    
+    eod = Baseline()
+    assert eod.build_from(provider, SYMBOLS, session_date=SESSION) == {}
+    path = eod.save(str(tmp_path / 'baseline.parquet'))
+    
+    provider.periods.clear()
+    df, failed = Baseline.load(path).scan(SYMBOLS, provider=provider, session_date=SESSION)
+    assert failed == {}
+    assert set(provider.periods) == {'1d'}
+    assert_same_scores(df, expected)
+
+
+def test_short_and_stale_symbols_fail(provider):
+    short = Counting(bars=10, seed=9, end=SESSION)
+    baseline = Baseline()
+    df, failed = baseline.scan(SYMBOLS[:3], provider=short, session_date=SESSION)
+    assert df.empty
+    assert failed == dict.fromkeys(SYMBOLS[:3], 'empty_history')
+    
+    # A baseline built after the close has today's bar in it - today's quote adds nothing new
+    baseline = Baseline()
+    baseline.build_from(provider, SYMBOLS[:3])
+    records, failed = baseline.records(provider.quotes(SYMBOLS[:3]))
+    assert records == []
+    assert failed == dict.fromkeys(SYMBOLS[:3], 'stale_quote')
+    
+    # A baseline more than BASELINE_MAX_GAP days older than the quote
+    baseline.table['Date'] = pd.Timestamp('2024-06-10')
+    _, failed = baseline.records(provider.quotes(SYMBOLS[:3]))
+    assert failed == dict.fromkeys(SYMBOLS[:3], 'stale_baseline')
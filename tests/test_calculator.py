@@ -0,0 +1,110 @@
+"""
+calculate_rfactor_batch must give the same numbers and labels as the scalar calculate_rfactor
+"""
+
+import numpy as np
+import pytest
+
+from rfactor.calculator import RFactorCalculator
+
+KEYS = ('rfactor', 'pct_change', 'atr_pct', 'volume_ratio', 'k_factor', 'direction', 'signal', 'recommendation')
+
+
+def scalar_rows(rows):
+    """calculate_rfactor of every (current_price, prev_close, atr, current_volume, avg_volume) row"""
+    return [RFactorCalculator.calculate_rfactor(*(float(value) for value in row)) for row in rows]
+
+
+def batch_rows(rows):
+    """calculate_rfactor_batch of the same rows, as one dict per row"""
+    columns = np.asarray(rows, dtype=np.float64).T
+    return RFactorCalculator.calculate_rfactor_batch(*columns).to_dict('records')
+
+
+def assert_same(rows):
+    for row, scalar, batch in zip(rows, scalar_rows(rows), batch_rows(rows)):
+        for key in KEYS:
+            assert batch[key] == scalar[key], (row, key, batch[key], scalar[key])
+
+
+# The dashboard's verification examples (expected R-Factor, % change, signal, recommendation). The
+# repo does not keep the market inputs, so these are inputs that reproduce the published figures,
+# one per K tier: >= 5% move, < 2.5% move, 2.5-5% move
+VERIFICATION = {
+    'TATAELXSI': ((5399.0, 5000.0, 150.0, 141000.0, 100000.0),
+                  6.06, 7.98, "🟢 ACTIVE", "⭐⭐⭐ STRONG CALL - High Probability"),
+    'HDFCAMC': ((3920.8, 4000.0, 200.0, 452100.0, 100000.0),
+                4.61, -1.98, "🟢 ACTIVE", "⭐⭐ PUT Option - Active Signal"),
+    'SHRIRAMFIN': ((622.26, 600.0, 18.67, 294600.0, 100000.0),
+                   4.56, 3.71, "🟢 ACTIVE", "⭐⭐ CALL Option - Active Signal"),
+}
+
+
+@pytest.mark.parametrize('symbol', list(VERIFICATION))
+def test_verification_examples(symbol):
+    inputs, rfactor, pct_change, signal, recommendation = VERIFICATION[symbol]
+    for result in (RFactorCalculator.calculate_rfactor(*inputs), batch_rows([inputs])[0]):
+        assert result['rfactor'] == rfactor
+        assert result['pct_change'] == pct_change
+        assert result['signal'] == signal
+        assert result['recommendation'] == recommendation
+    assert_same([inputs])
+
+
+def test_random_rows():
+    rng = np.random.default_rng(7)
+    n = 2000
+    prev = rng.uniform(10, 5000, n)
+    # Spread the moves over all three K tiers (< 2.5%, 2.5-5%, >= 5%)
+    price = prev * (1 + rng.uniform(-0.12, 0.12, n))
+    atr = prev * rng.uniform(0.005, 0.08, n)
+    avg = rng.uniform(1e4, 1e7, n)
+    volume = avg * rng.uniform(0.1, 6.0, n)
+    assert_same(np.column_stack([price, prev, atr, volume, avg]).round(2).tolist())
+
+
+def test_tier_boundaries():
+    # Exactly 2.5% and 5% moves, and R-Factor near the 3.0 / 4.0 / 6.0 cut-offs
+    assert_same([
+        [102.5, 100.0, 2.0, 1e5, 1e5],
+        [105.0, 100.0, 2.0, 1e5, 1e5],
+        [95.0, 100.0, 2.0, 1e5, 1e5],
+        [97.5, 100.0, 2.0, 1e5, 1e5],
+        [100.0, 100.0, 2.0, 1e5, 1e5],
+        [104.0, 100.0, 1.0, 1e5, 1e5],
+        [106.0, 100.0, 3.0, 4e5, 1e5],
+    ])
+
+
+@pytest.mark.parametrize('row', [
+    [110.0, 0.0, 2.0, 1e5, 1e5],     # prev_close 0
+    [0.0, 100.0, 2.0, 1e5, 1e5],     # current_price 0
+    [0.0, 0.0, 2.0, 1e5, 1e5],
+])
+def test_zero_price_is_an_error_row(row):
+    assert_same([row])
+    batch = batch_rows([row])[0]
+    assert batch['signal'] == "⚫ ERROR"
+    assert batch['direction'] == 'N/A'
+    assert batch['recommendation'] == "⚫ ERROR - invalid inputs"
+    assert RFactorCalculator.calculate_rfactor(*row)['error'] == "float division by zero"
+
+
+@pytest.mark.parametrize('avg_volume', [0.0, -1.0])
+def test_zero_avg_volume_uses_ratio_one(avg_volume):
+    rows = [
+        [103.0, 100.0, 2.0, 5e5, avg_volume],
+        [91.0, 100.0, 4.0, 0.0, avg_volume],
+        [100.5, 100.0, 1.5, 1e6, avg_volume],
+    ]
+    assert_same(rows)
+    assert all(batch['volume_ratio'] == 1.0 for batch in batch_rows(rows))
+
+
+def test_zero_rows_mixed_with_good_rows():
+    # An error row must not change its neighbours
+    assert_same([
+        [110.0, 100.0, 2.0, 2e5, 1e5],
+        [110.0, 0.0, 2.0, 2e5, 1e5],
+        [97.0, 100.0, 3.0, 1e5, 0.0],
+    ])
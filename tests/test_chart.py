@@ -0,0 +1,85 @@
+"""
+ChartProvider against a local ChartServer - payload round trip and per-symbol failures
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from rfactor import fetcher
+from rfactor.chart import ChartServer
+from rfactor.fetcher import FetchError, LiveDataFetcher
+from rfactor.providers import ChartProvider, SyntheticProvider
+
+
+class FlakySource(SyntheticProvider):
+    """Synthetic bars, except GONE (delisted) and THROTTLED (HTTP 429 for its first `throttled` requests)"""
+    
+    def __init__(self, throttled=1):
+        super().__init__()
+        self.throttled = throttled
+        self.requests = {}
+        self._count_lock = threading.Lock()
+    
+    def history(self, symbol, period="1mo", start=None):
+        with self._count_lock:
+            self.requests[symbol] = self.requests.get(symbol, 0) + 1
+            count = self.requests[symbol]
+        if symbol == 'GONE':
+            raise FetchError('empty_history', "No data found, symbol may be delisted")
+        if symbol == 'THROTTLED' and count <= self.throttled:
+            raise FetchError('rate_limited', "Too Many Requests")
+        return super().history(symbol, period, start)
+
+
+GOOD = ['RELIANCE', 'TCS', 'INFY', 'SBIN']
+
+
+@pytest.fixture
+def source():
+    return FlakySource()
+
+
+@pytest.fixture
+def provider(source):
+    with ChartServer(source) as server:
+        provider = ChartProvider(server.url)
+        yield provider
+        provider.close()
+
+
+def test_round_trip_matches_source(provider):
+    histories = provider.download(GOOD)
+    assert sorted(histories) == sorted(GOOD)
+    
+    expected = SyntheticProvider().history('TCS')
+    hist = histories['TCS']
+    assert len(hist) == len(expected)
+    for column in ('Open', 'High', 'Low', 'Close', 'Volume'):
+        np.testing.assert_allclose(hist[column].to_numpy(), expected[column].to_numpy(), rtol=1e-6)
+
+
+def test_partial_results_keep_good_histories(provider):
+    errors = {}
+    histories = provider.download(GOOD + ['THROTTLED', 'GONE'], errors=errors)
+    assert sorted(histories) == sorted(GOOD)
+    assert errors == {'THROTTLED': 'rate_limited', 'GONE': 'empty_history'}
+
+
+def test_transient_failure_raises_without_errors(provider):
+    with pytest.raises(FetchError) as e:
+        provider.download(GOOD + ['THROTTLED'])
+    assert e.value.reason == 'rate_limited'
+
+
+def test_chunk_retry_requests_only_the_failed_symbol(monkeypatch, source, provider):
+    monkeypatch.setattr(LiveDataFetcher, 'store', None)
+    monkeypatch.setattr(fetcher, 'FETCH_BACKOFF_BASE', 0.0)
+    
+    histories, reasons = LiveDataFetcher._download_chunk_with_retry(GOOD + ['THROTTLED', 'GONE'], provider=provider)
+    assert sorted(histories) == sorted(GOOD + ['THROTTLED'])
+    assert reasons == {'GONE': 'empty_history'}
+    
+    # One request per symbol, plus the retry of the throttled one; the delisted one is not retried
+    assert source.requests == {**{symbol: 1 for symbol in GOOD}, 'THROTTLED': 2, 'GONE': 1}
@@ -0,0 +1,95 @@
+"""
+ScanCoordinator must merge its shards into the table a single-process scan_symbols gives
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rfactor import fetcher
+from rfactor.coordinator import QueueExecutor, ScanCoordinator
+from rfactor.fetcher import LiveDataFetcher, TokenBucket
+from rfactor.processing import scan_symbols
+from rfactor.providers import SyntheticProvider
+
+SYMBOLS = SyntheticProvider.universe(60)[:30] + ['NEWLIST'] + SyntheticProvider.universe(60)[30:] + ['GONE']
+
+
+class Listings(SyntheticProvider):
+    """Synthetic bars, except NEWLIST (five sessions old) and GONE (no bars) - both fail to score"""
+    
+    def bars_for(self, symbol):
+        bars = super().bars_for(symbol)
+        if symbol == 'NEWLIST':
+            return bars.iloc[-5:]
+        if symbol == 'GONE':
+            return bars.iloc[:0]
+        return bars
+
+
+PROVIDER = Listings(bars=40, seed=17, end='2024-06-28')
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    # Workers get the parent's store and a share of its rate limit (see _worker_share)
+    monkeypatch.setattr(LiveDataFetcher, 'store', None)
+    monkeypatch.setattr(fetcher, 'RATE_LIMITER', TokenBucket(0, 1))
+
+
+@pytest.fixture
+def reference():
+    return scan_symbols(SYMBOLS, provider=PROVIDER, bulk=True, chunk_size=10)
+
+
+def assert_same_scan(merged, reference):
+    df, failed = merged
+    expected, expected_failed = reference
+    
+    # Ranked like filter_results; the rows and their scores are the single-process ones
+    assert df['R-Factor'].is_monotonic_decreasing
+    columns = [column for column in expected.columns if column != 'Timestamp']
+    by_symbol = df.set_index('Symbol').loc[expected['Symbol'], columns[1:]]
+    assert by_symbol.reset_index().equals(expected[columns].reset_index(drop=True))
+    assert df.dtypes.equals(expected.dtypes)
+    
+    assert failed == expected_failed == {'NEWLIST': 'too_few_bars', 'GONE': 'empty_history'}
+    assert list(failed) == list(expected_failed)
+
+
+@pytest.mark.parametrize('shard_size', [1, 7, 25, 100])
+def test_merged_shards_match_a_single_scan(reference, shard_size):
+    with ThreadPoolExecutor(4) as executor:
+        coordinator = ScanCoordinator(workers=4, executor=executor, shard_size=shard_size)
+        merged = coordinator.scan(SYMBOLS, provider=PROVIDER, bulk=True, chunk_size=10)
+    
+    assert_same_scan(merged, reference)
+    report = coordinator.last_report
+    assert report['shards'] == report['done'] == -(-len(SYMBOLS) // shard_size)
+    assert report['rows'] == len(reference[0])
+
+
+def test_one_worker_scans_inline(reference):
+    coordinator = ScanCoordinator(workers=1)
+    assert_same_scan(coordinator.scan(SYMBOLS, provider=PROVIDER, bulk=True, chunk_size=10), reference)
+    assert coordinator.executor is None
+
+
+def test_process_pool_matches_a_single_scan(reference):
+    coordinator = ScanCoordinator(workers=2)
+    try:
+        merged = coordinator.scan(SYMBOLS, provider=PROVIDER, bulk=True, chunk_size=10)
+    finally:
+        coordinator.close()
+    assert_same_scan(merged, reference)
+    assert len(coordinator.last_report['workers']) >= 1
+
+
+def test_queue_workers_match_a_single_scan(reference):
+    executor = QueueExecutor(address=('127.0.0.1', 0), local_workers=2)
+    try:
+        coordinator = ScanCoordinator(workers=2, executor=executor)
+        merged = coordinator.scan(SYMBOLS, provider=PROVIDER, bulk=True, chunk_size=10)
+    finally:
+        executor.shutdown()
+    assert_same_scan(merged, reference)
@@ -0,0 +1,105 @@
+"""
+Fetch failure reasons and the negative cache of symbols that keep failing
+"""
+
+import pandas as pd
+import pytest
+
+from rfactor import fetcher
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.providers import SyntheticProvider
+from rfactor.store import BarStore
+
+GOOD = ['RELIANCE', 'TCS', 'INFY']
+
+
+class Listings(SyntheticProvider):
+    """Synthetic bars, except NEWLIST (listed five sessions ago) and GONE (delisted, no bars)"""
+    
+    def bars_for(self, symbol):
+        bars = super().bars_for(symbol)
+        if symbol == 'NEWLIST':
+            return bars.iloc[-5:]
+        if symbol == 'GONE':
+            return bars.iloc[:0]
+        return bars
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = BarStore(str(tmp_path / 'bars.sqlite'))
+    monkeypatch.setattr(LiveDataFetcher, 'store', store)
+    monkeypatch.setattr(fetcher, 'STORE_MAX_AGE', 0)
+    monkeypatch.setattr(fetcher, 'FETCH_BACKOFF_BASE', 0.0)
+    return store
+
+
+def scan(bulk):
+    errors = {}
+    results = LiveDataFetcher.fetch_multiple_stocks(GOOD + ['NEWLIST', 'GONE'], bulk=bulk, errors=errors,
+                                                    provider=Listings())
+    return sorted(result['symbol'] for result in results), errors
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_too_few_bars_never_marks_a_symbol_dead(store, bulk):
+    for _ in range(fetcher.DEAD_AFTER + 1):
+        fetched, errors = scan(bulk)
+    
+    assert fetched == sorted(GOOD)
+    assert errors == {'NEWLIST': 'too_few_bars', 'GONE': 'dead_symbol'}
+    assert set(store.failures()) == {'GONE'}
+    assert LiveDataFetcher.dead_symbols() == {'GONE': 'empty_history'}
+
+
+@pytest.mark.parametrize('hist, reason', [
+    (None, 'error'),
+    (pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume']), 'empty_history'),
+    (SyntheticProvider(bars=13).bars_for('TCS'), 'too_few_bars'),
+])
+def test_short_reason(hist, reason):
+    assert LiveDataFetcher._short_reason(hist) == reason
+
+
+def test_dead_symbols_recheck_doubles_up_to_the_cap():
+    day = fetcher.DEAD_RECHECK
+    failures = {
+        'ONCE': ('empty_history', fetcher.DEAD_AFTER - 1, 0.0),
+        'DEAD': ('empty_history', fetcher.DEAD_AFTER, 0.0),
+        'RECHECKED': ('empty_history', fetcher.DEAD_AFTER + 1, 0.0),
+        'LONG_GONE': ('empty_history', fetcher.DEAD_AFTER + 20, 0.0),
+    }
+    
+    def dead(now):
+        return sorted(LiveDataFetcher.dead_symbols(failures, now=now))
+    
+    # A single failure is not enough; then 1 day, 2 days after one failed re-check, capped at DEAD_RECHECK_MAX
+    assert dead(0.0) == ['DEAD', 'LONG_GONE', 'RECHECKED']
+    assert dead(day - 1) == ['DEAD', 'LONG_GONE', 'RECHECKED']
+    assert dead(day) == ['LONG_GONE', 'RECHECKED']
+    assert dead(2 * day - 1) == ['LONG_GONE', 'RECHECKED']
+    assert dead(2 * day) == ['LONG_GONE']
+    assert dead(fetcher.DEAD_RECHECK_MAX - 1) == ['LONG_GONE']
+    assert dead(fetcher.DEAD_RECHECK_MAX) == []
+
+
+def test_expired_symbol_is_retried_and_cleared_when_it_recovers(monkeypatch, store):
+    for _ in range(fetcher.DEAD_AFTER):
+        scan(bulk=True)
+    assert LiveDataFetcher.dead_symbols() == {'GONE': 'empty_history'}
+    
+    # Past the re-check time GONE is requested again; it failing again doubles the next wait
+    checked_at = store.failures()['GONE'][2]
+    later = checked_at + fetcher.DEAD_RECHECK
+    monkeypatch.setattr(fetcher.time, 'time', lambda: later)
+    assert LiveDataFetcher.dead_symbols() == {}
+    assert scan(bulk=True)[1]['GONE'] == 'empty_history'
+    assert store.failures()['GONE'][1] == fetcher.DEAD_AFTER + 1
+    assert LiveDataFetcher.dead_symbols(now=later + 2 * fetcher.DEAD_RECHECK - 1) == {'GONE': 'empty_history'}
+    
+    # Relisted: the next re-check fetches it and forgets its failures
+    monkeypatch.setattr(Listings, 'bars_for', SyntheticProvider.bars_for)
+    monkeypatch.setattr(fetcher.time, 'time', lambda: later + 2 * fetcher.DEAD_RECHECK)
+    fetched, errors = scan(bulk=True)
+    assert 'GONE' in fetched and 'GONE' not in errors
+    assert store.failures() == {}
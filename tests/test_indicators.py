@@ -0,0 +1,158 @@
+"""
+Panel indicator kernels against the per-symbol loops they replaced, and bar resampling
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rfactor import indicators, timeframes
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.providers import SyntheticProvider, slice_history
+
+
+def loop_atr(high, low, close, period=14):
+    """The dashboard's original calculate_atr: mean of the last `period` true ranges"""
+    tr_list = []
+    for i in range(1, len(high)):
+        tr = max(
+            high[i] - low[i],
+            abs(high[i] - close[i-1]),
+            abs(low[i] - close[i-1])
+        )
+        tr_list.append(tr)
+    
+    if len(tr_list) >= period:
+        return np.mean(tr_list[-period:])
+    return np.mean(tr_list) if tr_list else 0
+
+
+def loop_wilder(high, low, close, period=14):
+    """Wilder's ATR bar by bar: seed with the mean of the first `period` true ranges, then smooth"""
+    atr = [np.nan]
+    tr_list = []
+    for i in range(1, len(high)):
+        tr_list.append(max(high[i] - low[i], abs(high[i] - close[i-1]), abs(low[i] - close[i-1])))
+        if len(tr_list) < period:
+            atr.append(np.nan)
+        elif len(tr_list) == period:
+            atr.append(np.mean(tr_list))
+        else:
+            atr.append((atr[-1] * (period - 1) + tr_list[-1]) / period)
+    return np.array(atr)
+
+
+@pytest.fixture
+def histories():
+    """Daily bars of different lengths and gaps, as a panel build would see them"""
+    source = SyntheticProvider(bars=60, seed=3, end='2024-06-28')
+    bars = {symbol: source.bars_for(symbol) for symbol in ('FULL', 'NEWLIST', 'GAPS', 'ONEBAR', 'HALTED')}
+    return {
+        'FULL': bars['FULL'],
+        'NEWLIST': bars['NEWLIST'].iloc[-10:],                # fewer than 14 true ranges
+        'GAPS': bars['GAPS'].drop(bars['GAPS'].index[[5, 6, 20, 41, 58]]),
+        'ONEBAR': bars['ONEBAR'].iloc[-1:],
+        'HALTED': bars['HALTED'].iloc[:40],                    # no bars for the last 20 sessions
+    }
+
+
+def columns(hist):
+    return hist['High'].to_numpy(), hist['Low'].to_numpy(), hist['Close'].to_numpy()
+
+
+def test_simple_atr_panel_matches_the_loop(histories):
+    symbols, index, panels = indicators.build_panel(histories)
+    atr = indicators.simple_atr(panels['High'], panels['Low'], panels['Close'])
+    
+    expected = [loop_atr(*columns(histories[symbol])) for symbol in symbols]
+    np.testing.assert_allclose(atr, expected, rtol=1e-12)
+    assert atr[symbols.index('ONEBAR')] == 0.0
+
+
+def test_calculate_atr_matches_the_loop(histories):
+    for hist in histories.values():
+        assert LiveDataFetcher.calculate_atr(*columns(hist)) == pytest.approx(loop_atr(*columns(hist)), rel=1e-12)
+
+
+def test_wilder_atr_panel_matches_the_loop(histories):
+    symbols, index, panels = indicators.build_panel(histories)
+    atr = indicators.wilder_atr(panels['High'], panels['Low'], panels['Close'])
+    assert atr.shape == (len(symbols), len(index))
+    
+    for row, symbol in enumerate(symbols):
+        hist = histories[symbol]
+        positions = index.get_indexer(hist.index)
+        np.testing.assert_allclose(atr[row, positions], loop_wilder(*columns(hist)), rtol=1e-12)
+        
+        # A missing bar carries the previous value; nothing before the symbol's first bar
+        carried = indicators.forward_fill(atr[row])[0]
+        np.testing.assert_allclose(atr[row, positions[0]:], carried[positions[0]:], rtol=1e-12)
+        assert np.isnan(atr[row, :positions[0]]).all()
+    
+    # Fewer than 14 true ranges never seed
+    assert np.isnan(atr[symbols.index('NEWLIST')]).all()
+    assert np.isnan(atr[symbols.index('ONEBAR')]).all()
+
+
+def test_wilder_atr_one_symbol_matches_its_panel_row(histories):
+    symbols, index, panels = indicators.build_panel(histories)
+    atr = indicators.wilder_atr(panels['High'], panels['Low'], panels['Close'])
+    
+    full = columns(histories['FULL'])
+    np.testing.assert_allclose(indicators.wilder_atr(*full)[0], atr[symbols.index('FULL')], rtol=1e-12)
+    np.testing.assert_allclose(indicators.wilder_atr(*full, period=5)[0], loop_wilder(*full, period=5), rtol=1e-12)
+
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def grouped(hist, keys):
+    """pandas reference for resample_bars: aggregate one symbol's own bars by key"""
+    return hist.groupby(keys).agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    )
+
+
+def test_resample_hourly_bars_adds_back_up_to_the_daily_bars():
+    source = SyntheticProvider(bars=30, seed=5, end='2024-06-28')
+    hourly = {symbol: source.session_bars_for(symbol, '60m', '1mo') for symbol in ('TCS', 'INFY')}
+    symbols, index, panels = indicators.build_panel(hourly, OHLCV)
+    
+    daily = indicators.resample_bars(panels, timeframes.bar_starts(index, '1d'))
+    for row, symbol in enumerate(symbols):
+        expected = slice_history(source.bars_for(symbol), '1mo')
+        assert daily['Close'].shape[1] == len(expected)
+        for field in OHLCV:
+            np.testing.assert_allclose(daily[field][row], expected[field].to_numpy(), rtol=1e-9)
+
+
+def test_resample_skips_missing_bars():
+    source = SyntheticProvider(bars=30, seed=5, end='2024-06-28')
+    bars = {symbol: source.bars_for(symbol) for symbol in ('FULL', 'GAPS', 'LATE')}
+    histories = {
+        'FULL': bars['FULL'],
+        # Missing sessions, including every session of the week of 2024-06-10
+        'GAPS': bars['GAPS'].drop(bars['GAPS'].loc['2024-06-10':'2024-06-14'].index.append(bars['GAPS'].index[[1, 22]])),
+        'LATE': bars['LATE'].loc['2024-06-19':],
+    }
+    symbols, index, panels = indicators.build_panel(histories, OHLCV)
+    starts = timeframes.bar_starts(index, '1wk')
+    weekly = indicators.resample_bars(panels, starts)
+    weeks = index[starts]
+    
+    for row, symbol in enumerate(symbols):
+        hist = histories[symbol]
+        expected = grouped(hist, hist.index.normalize() - pd.to_timedelta(hist.index.weekday, unit='D'))
+        present = weeks.isin(expected.index)
+        for field in OHLCV:
+            np.testing.assert_allclose(weekly[field][row, present], expected[field].to_numpy(), rtol=1e-12)
+            assert np.isnan(weekly[field][row, ~present]).all()
+    
+    # A symbol's empty week is NaN, not a zero-volume bar
+    assert not weeks[np.isnan(weekly['Volume'][symbols.index('GAPS')])].empty
+
+
+def test_resample_without_starts():
+    panels = {field: np.ones((3, 5)) for field in OHLCV}
+    resampled = indicators.resample_bars(panels, [])
+    assert all(values.shape == (3, 0) for values in resampled.values())
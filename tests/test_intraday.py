@@ -0,0 +1,106 @@
+"""
+IntradayEngine.feed against the daily bars its intraday bars add up to
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rfactor import indicators
+from rfactor.intraday import IntradayEngine
+from rfactor.providers import SyntheticProvider
+
+SYMBOLS = ['RELIANCE', 'TCS', 'INFY']
+SOURCE = SyntheticProvider(bars=60, seed=4, end='2024-06-28')
+
+
+def hourly(symbol, days=2):
+    """60m bars of the last `days` sessions - each session adds back up to its daily bar"""
+    bars = SOURCE.session_bars_for(symbol, interval='60m', period='1mo')
+    return bars[bars.index.normalize() >= SOURCE.bars_for(symbol).index[-days]]
+
+
+def seeded(days=2):
+    """Engine seeded with every daily bar before the last `days` sessions"""
+    engine = IntradayEngine(bar_seconds=3600)
+    daily = {symbol: SOURCE.bars_for(symbol) for symbol in SYMBOLS}
+    assert engine.seed(daily, session_date=daily[SYMBOLS[0]].index[-days]) == []
+    return engine
+
+
+def forming(bar, share=0.5):
+    """A bar seen `share` of the way through: part of its volume, a close inside its final range"""
+    bar = bar.copy()
+    bar['Close'] = bar['Open'] + (bar['Close'] - bar['Open']) * share
+    bar['High'] = max(bar['Open'], bar['Close'])
+    bar['Low'] = min(bar['Open'], bar['Close'])
+    bar['Volume'] = np.floor(bar['Volume'] * share)
+    return bar
+
+
+def assert_matches_daily(state, daily, period=14):
+    """State after a whole session equals the daily bars with that session as the newest one"""
+    atr = indicators.wilder_atr(daily['High'], daily['Low'], daily['Close'], period)[0, -1]
+    assert state.last == pytest.approx(daily['Close'].iloc[-1], rel=1e-12)
+    assert state.prev_close == pytest.approx(daily['Close'].iloc[-2], rel=1e-12)
+    assert state.high == pytest.approx(daily['High'].iloc[-1], rel=1e-12)
+    assert state.low == pytest.approx(daily['Low'].iloc[-1], rel=1e-12)
+    assert state.cum_volume == daily['Volume'].iloc[-1]
+    assert state.atr == pytest.approx(atr, rel=1e-9)
+    assert state.volumes.mean() == pytest.approx(daily['Volume'].iloc[-21:-1].mean(), rel=1e-12)
+
+
+def test_forming_bar_is_revised_not_added():
+    bars = hourly('TCS', days=1)
+    engine = seeded(days=1)
+    
+    # Poll 1 catches the third bar while it is still forming
+    first = bars.iloc[:3].copy()
+    first.iloc[-1] = forming(bars.iloc[2])
+    assert engine.feed('TCS', first) == 3
+    state = engine.states['TCS']
+    assert state.cum_volume == bars['Volume'].iloc[:2].sum() + first['Volume'].iloc[-1]
+    
+    # Poll 2 sees it finished, plus the rest: the third bar replaces its forming version
+    assert engine.feed('TCS', bars) == len(bars) - 2
+    assert_matches_daily(state, SOURCE.bars_for('TCS'))
+    
+    # The same bars again only re-apply the last one, changing nothing
+    before = state.score()
+    assert engine.feed('TCS', bars) == 1
+    assert state.score() == before
+    assert state.cum_volume == SOURCE.bars_for('TCS')['Volume'].iloc[-1]
+
+
+def test_polls_in_any_split_score_like_one_feed():
+    bars = hourly('INFY', days=1)
+    once, polled = seeded(days=1), seeded(days=1)
+    once.feed('INFY', bars)
+    
+    for end in range(1, len(bars) + 1):
+        seen = bars.iloc[:end].copy()
+        seen.iloc[-1] = forming(bars.iloc[end - 1], share=0.3)
+        polled.feed('INFY', seen)
+        polled.feed('INFY', bars.iloc[:end])
+    
+    assert polled.states['INFY'].score() == once.states['INFY'].score()
+    pd.testing.assert_frame_equal(polled.snapshot(symbols=['INFY']).drop(columns='Timestamp'),
+                                  once.snapshot(symbols=['INFY']).drop(columns='Timestamp'))
+
+
+def test_next_session_rolls_the_day_into_atr_and_volumes():
+    engine = seeded(days=2)
+    for symbol in SYMBOLS:
+        bars = hourly(symbol, days=2)
+        days = bars.index.normalize()
+        engine.feed(symbol, bars[days == days[0]])
+        engine.feed(symbol, bars[days == days[-1]])
+        assert_matches_daily(engine.states[symbol], SOURCE.bars_for(symbol))
+
+
+def test_unseeded_and_empty_feeds_apply_nothing():
+    engine = seeded(days=1)
+    assert engine.feed('UNKNOWN', hourly('TCS', days=1)) == 0
+    assert engine.feed('TCS', None) == 0
+    assert engine.feed('TCS', hourly('TCS', days=1).iloc[:0]) == 0
+    assert engine.records() == []
@@ -0,0 +1,133 @@
+"""
+QueryService answers against filter_results on the same published scan
+"""
+
+import json
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pytest
+
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.processing import filter_results, scan_symbols
+from rfactor.providers import SyntheticProvider
+from rfactor.publish import SnapshotPublisher
+from rfactor.scheduler import Snapshot
+from rfactor.service import QueryService
+
+SYMBOLS = SyntheticProvider.universe(200)
+
+
+@pytest.fixture(scope='module')
+def scored():
+    store = LiveDataFetcher.store
+    LiveDataFetcher.store = None
+    try:
+        df, _ = scan_symbols(SYMBOLS, provider=SyntheticProvider(bars=40, seed=21))
+    finally:
+        LiveDataFetcher.store = store
+    return df
+
+
+def publish(directory, df, universe='fno', mode='daily', created_at=None):
+    snapshot = Snapshot(version=1, df=df, symbols=tuple(df['Symbol']), failed={}, duration=1.0,
+                        created_at=created_at or datetime(2024, 6, 28, 15, 30))
+    return SnapshotPublisher(str(directory), parquet=False).publish(snapshot, universe=universe, mode=mode)
+
+
+@pytest.fixture
+def service(tmp_path, scored):
+    publish(tmp_path, scored)
+    return QueryService(str(tmp_path), universe='fno', check_interval=0)
+
+
+def get(service, path, **params):
+    status, body, _ = service.respond(path, params)
+    return status, json.loads(body) if body else None
+
+
+def assert_answers(service, expected, **params):
+    """The answer holds the rows of `expected`, in its R-Factor order (ties may come in either order)"""
+    status, answer = get(service, '/v1/scan', **params)
+    assert status == 200
+    rows = answer['rows']
+    assert [row['R-Factor'] for row in rows] == pytest.approx(expected['R-Factor'].tolist(), abs=1e-4)
+    
+    # Every row is one of the filtered rows, with its own R-Factor
+    rfactor = dict(zip(expected['Symbol'], expected['R-Factor']))
+    assert len({row['Symbol'] for row in rows}) == len(rows)
+    assert all(row['R-Factor'] == pytest.approx(rfactor[row['Symbol']], abs=1e-4) for row in rows)
+    return answer
+
+
+@pytest.mark.parametrize('signal, direction', [
+    ('ACTIVE', 'UPSIDE'), ('ACTIVE', 'DOWNSIDE'), ('WAIT', 'UPSIDE,DOWNSIDE'), ('active,wait', 'downside'),
+])
+@pytest.mark.parametrize('top', [5, 20, 0])
+def test_filters_match_filter_results(service, scored, signal, direction, top):
+    expected = filter_results(scored, signal.upper().split(','), direction.upper().split(','))
+    answer = assert_answers(service, expected.head(top) if top else expected,
+                            signal=signal, direction=direction, top=str(top))
+    assert answer['matched'] == len(expected)
+    assert answer['total'] == len(scored)
+    assert (answer['universe'], answer['mode']) == ('fno', 'daily')
+
+
+def test_symbols_min_rfactor_and_columns(service, scored):
+    # TCS is not in the universe - unknown symbols are ignored
+    wanted = ['TCS'] + SYMBOLS[:8]
+    expected = filter_results(scored[scored['Symbol'].isin(wanted)], ['ACTIVE', 'WAIT'], ['UPSIDE', 'DOWNSIDE'])
+    assert_answers(service, expected, symbols=','.join(wanted).lower())
+    
+    expected = filter_results(scored[scored['R-Factor'] >= 4.0], ['ACTIVE', 'WAIT'], ['UPSIDE', 'DOWNSIDE'])
+    assert_answers(service, expected, min_rfactor='4', top='0')
+    
+    _, answer = get(service, '/v1/scan', columns='Symbol,R-Factor', top='3')
+    assert [list(row) for row in answer['rows']] == [['Symbol', 'R-Factor']] * 3
+
+
+@pytest.mark.parametrize('params, error', [
+    ({'top': 'ten'}, "top is not an integer: ten"),
+    ({'top': '-1'}, "top must be >= 0"),
+    ({'min_rfactor': 'high'}, "min_rfactor is not a number: high"),
+    ({'columns': 'Symbol,Beta'}, "Unknown columns: Beta"),
+])
+def test_bad_parameters_are_400(service, params, error):
+    assert get(service, '/v1/scan', **params) == (400, {'error': error})
+
+
+def test_bad_top_over_http(service):
+    with service:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{service.url}/v1/scan?top=ten", timeout=10)
+        assert e.value.code == 400
+        assert json.loads(e.value.read()) == {'error': "top is not an integer: ten"}
+        
+        with urllib.request.urlopen(f"{service.url}/v1/scan?top=2", timeout=10) as response:
+            assert len(json.loads(response.read())['rows']) == 2
+
+
+def test_versions_etags_and_universes(tmp_path, scored):
+    service = QueryService(str(tmp_path), universe='fno', check_interval=0)
+    assert get(service, '/v1/scan')[0] == 503
+    assert get(service, '/v1/nothing')[0] == 404
+    
+    first = publish(tmp_path, scored)
+    status, body, etag = service.respond('/v1/scan', {'top': '5'})
+    assert status == 200
+    assert service.respond('/v1/scan', {'top': '5'}, etag) == (304, b'', etag)
+    
+    # A newer version of the universe replaces the answer; other universes are separate
+    second = publish(tmp_path, scored.iloc[::-1], mode='intraday', created_at=datetime(2024, 6, 28, 15, 31))
+    publish(tmp_path, scored.head(10), universe='nifty', mode='quotes', created_at=datetime(2024, 6, 28, 15, 32))
+    status, answer = get(service, '/v1/snapshot')
+    assert second != first
+    assert (answer['version'], answer['mode']) == (second, 'intraday')
+    assert service.respond('/v1/scan', {'top': '5'}, etag)[0] == 200
+    
+    _, listing = get(service, '/v1/universes')
+    assert listing['serving'] == 'fno'
+    assert {item['universe']: (item['mode'], item['rows']) for item in listing['universes']} == {
+        'fno': ('intraday', len(scored)), 'nifty': ('quotes', 10)
+    }
@@ -0,0 +1,151 @@
+"""
+SnapshotCache single flight - concurrent callers for one universe share one scan
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+from rfactor import snapshots
+from rfactor.metrics import METRICS
+from rfactor.providers import SyntheticProvider
+from rfactor.snapshots import SnapshotCache
+
+SYMBOLS = ['RELIANCE', 'TCS', 'INFY']
+PROVIDER = SyntheticProvider()
+DAY = 24 * 3600
+
+
+class GatedScan:
+    """scan_fn that holds every scan open until released, recording its calls"""
+    
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def __call__(self, symbols, provider=None, **scan_args):
+        self.calls.append((tuple(symbols), scan_args))
+        self.started.set()
+        assert self.release.wait(10)
+        if self.error is not None:
+            raise self.error
+        return pd.DataFrame({'Symbol': symbols, 'R-Factor': [4.5] * len(symbols)}), {'GONE': 'empty_history'}
+
+
+def in_thread(fn, *args, **kwargs):
+    """Start fn on a thread; returns (thread, outcome dict with 'result' or 'error')"""
+    outcome = {}
+    
+    def run():
+        try:
+            outcome['result'] = fn(*args, **kwargs)
+        except Exception as e:
+            outcome['error'] = e
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def joined():
+    counters = METRICS.counter_values('rfactor_cache_total')
+    return counters.get((('layer', 'snapshot'), ('result', 'joined')), 0)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_scan():
+    cache = SnapshotCache(directory=None, bucket=DAY)
+    scan_fn = GatedScan()
+    before = joined()
+    
+    leader, first = in_thread(cache.get_or_scan, SYMBOLS, scan_fn, provider=PROVIDER, bulk=True)
+    assert scan_fn.started.wait(10)
+    # Same universe in another order, same arguments - joins the running scan
+    follower, second = in_thread(cache.get_or_scan, SYMBOLS[::-1], scan_fn, provider=PROVIDER, bulk=True)
+    wait_for(lambda: joined() > before)
+    
+    scan_fn.release.set()
+    leader.join(10)
+    follower.join(10)
+    
+    assert len(scan_fn.calls) == 1
+    assert first['result'][1] == 'scan' and second['result'][1] == 'joined'
+    assert second['result'][0] is first['result'][0]
+    
+    # Later callers in the same bucket get the stored snapshot; scan() returns it as (df, failed)
+    assert cache.get_or_scan(SYMBOLS, scan_fn, provider=PROVIDER, bulk=True)[1] == 'hit'
+    df, failed = cache.scan(SYMBOLS, scan_fn, provider=PROVIDER, bulk=True)
+    assert df is first['result'][0].df and failed == {'GONE': 'empty_history'}
+    assert len(scan_fn.calls) == 1
+
+
+def test_other_scan_arguments_scan_separately():
+    cache = SnapshotCache(directory=None, bucket=DAY)
+    scan_fn = GatedScan()
+    scan_fn.release.set()
+    
+    cache.scan(SYMBOLS, scan_fn, provider=PROVIDER, bulk=True)
+    cache.scan(SYMBOLS, scan_fn, provider=PROVIDER, bulk=False)
+    cache.scan(SYMBOLS, scan_fn, provider=SyntheticProvider(seed=1), bulk=True)
+    assert [call[1] for call in scan_fn.calls] == [{'bulk': True}, {'bulk': False}, {'bulk': True}]
+
+
+def test_failed_scan_reaches_every_caller_and_is_not_cached():
+    cache = SnapshotCache(directory=None, bucket=DAY)
+    scan_fn = GatedScan(error=RuntimeError("provider down"))
+    before = joined()
+    
+    leader, first = in_thread(cache.scan, SYMBOLS, scan_fn, provider=PROVIDER)
+    assert scan_fn.started.wait(10)
+    follower, second = in_thread(cache.scan, SYMBOLS, scan_fn, provider=PROVIDER)
+    wait_for(lambda: joined() > before)
+    
+    scan_fn.release.set()
+    leader.join(10)
+    follower.join(10)
+    
+    assert str(first['error']) == str(second['error']) == "provider down"
+    assert len(scan_fn.calls) == 1
+    
+    # Nothing was stored - the next caller scans again
+    scan_fn.error = None
+    df, _ = cache.scan(SYMBOLS, scan_fn, provider=PROVIDER)
+    assert list(df['Symbol']) == SYMBOLS
+    assert len(scan_fn.calls) == 2
+
+
+def test_second_process_picks_up_the_scan_from_disk(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_POLL', 0.01)
+    scanning = SnapshotCache(directory=str(tmp_path), bucket=DAY)
+    waiting = SnapshotCache(directory=str(tmp_path), bucket=DAY)
+    scan_fn = GatedScan()
+    
+    loads = []
+    load = waiting._load
+    monkeypatch.setattr(waiting, '_load', lambda *args: loads.append(args) or load(*args))
+    
+    leader, first = in_thread(scanning.get_or_scan, SYMBOLS, scan_fn, provider=PROVIDER)
+    assert scan_fn.started.wait(10)
+    follower, second = in_thread(waiting.get_or_scan, SYMBOLS, scan_fn, provider=PROVIDER)
+    # The second cache finds the lock file taken and polls the directory for the result
+    wait_for(lambda: len(loads) >= 2)
+    
+    scan_fn.release.set()
+    leader.join(10)
+    follower.join(10)
+    
+    # Whether it reads the file while polling or just after taking the freed lock, it does not scan
+    assert len(scan_fn.calls) == 1
+    assert first['result'][1] == 'scan' and second['result'][1] in ('joined', 'hit')
+    pd.testing.assert_frame_equal(second['result'][0].df, first['result'][0].df)
+    assert second['result'][0].failed == {'GONE': 'empty_history'}
+    assert not list(tmp_path.glob('*.lock'))
@@ -0,0 +1,90 @@
+"""
+BarStore delta upserts and the fetcher's incremental refresh on top of it
+"""
+
+import pytest
+
+from rfactor import store as store_module
+from rfactor.fetcher import FetchError, LiveDataFetcher, STORE_MAX_AGE
+from rfactor.providers import SyntheticProvider
+from rfactor.store import BarStore
+
+
+class Clock:
+    """Stands in for time.time() in rfactor.store - fetched_at and is_fresh run on it"""
+    
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+
+class NothingNew(SyntheticProvider):
+    """Synthetic bars for a first fetch; a delta fetch (start=...) finds nothing new"""
+    
+    def __init__(self):
+        super().__init__(bars=60, end='2024-06-28')
+        self.requests = []
+    
+    def history(self, symbol, period="1mo", start=None):
+        self.requests.append(start)
+        if start is not None:
+            raise FetchError('empty_history', "No data found for this date range")
+        return super().history(symbol, period)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(store_module, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path / 'bars.sqlite'))
+
+
+def test_merge_replaces_the_last_bar(store):
+    bars = SyntheticProvider(bars=10, end='2024-06-28').bars_for('TCS')
+    store.merge('TCS', bars.iloc[:8])
+    assert store.last_date('TCS') == bars.index[7]
+    
+    # The delta starts at the last stored bar, which was still forming when first stored
+    delta = bars.iloc[7:].copy()
+    delta.loc[delta.index[0], 'Close'] += 10.0
+    store.merge('TCS', delta)
+    
+    loaded = store.load('TCS')
+    assert len(loaded) == len(bars)
+    assert list(loaded.index) == list(bars.index)
+    assert loaded['Close'].iloc[7] == pytest.approx(bars['Close'].iloc[7] + 10.0)
+    assert loaded['Close'].iloc[:7].tolist() == pytest.approx(bars['Close'].iloc[:7].tolist())
+    assert store.last_date('TCS') == bars.index[-1]
+
+
+def test_empty_delta_marks_the_symbol_fresh(monkeypatch, clock, store):
+    provider = NothingNew()
+    monkeypatch.setattr(LiveDataFetcher, 'store', store)
+    
+    first = LiveDataFetcher._get_history('TCS', provider=provider)
+    assert provider.requests == [None]
+    
+    # Stale: the delta fetch comes back empty, the stored bars are served and count as fresh again
+    clock.now += STORE_MAX_AGE + 1
+    assert not store.is_fresh('TCS', STORE_MAX_AGE)
+    again = LiveDataFetcher._get_history('TCS', provider=provider)
+    assert provider.requests == [None, store.last_date('TCS')]
+    assert again.equals(first)
+    assert store.is_fresh('TCS', STORE_MAX_AGE)
+    
+    # So the next scan inside STORE_MAX_AGE reads from disk without a request
+    LiveDataFetcher._get_history('TCS', provider=provider)
+    assert len(provider.requests) == 2
+
+
+def test_touch_ignores_unknown_symbols(store):
+    store.touch('NEVER')
+    assert store.fetched_at('NEVER') is None
+    assert store.symbols() == []
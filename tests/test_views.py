@@ -0,0 +1,97 @@
+"""
+ScanView must show the same rows, order and top-N panels as filter_results
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rfactor.fetcher import LiveDataFetcher
+from rfactor.processing import filter_results, scan_symbols, to_display
+from rfactor.providers import SyntheticProvider
+from rfactor.views import ScanView, ViewCache, top_positions
+
+SIGNALS = [['ACTIVE'], ['WAIT'], ['ACTIVE', 'WAIT'], []]
+DIRECTIONS = [['UPSIDE'], ['DOWNSIDE'], ['UPSIDE', 'DOWNSIDE']]
+
+
+@pytest.fixture(scope='module')
+def scored():
+    store = LiveDataFetcher.store
+    LiveDataFetcher.store = None
+    try:
+        df, _ = scan_symbols(SyntheticProvider.universe(300), provider=SyntheticProvider(bars=40, seed=11))
+    finally:
+        LiveDataFetcher.store = store
+    return df
+
+
+def assert_same_rows(actual, expected):
+    """Same rows in the same R-Factor order (rows tied on R-Factor may come in either order)"""
+    assert actual['R-Factor'].tolist() == expected['R-Factor'].tolist()
+    assert sorted(actual['Symbol']) == sorted(expected['Symbol'])
+
+
+def test_universe_covers_every_filter(scored):
+    assert len(scored) == 300
+    assert set(scored['Signal']) == {'ACTIVE', 'WAIT'}
+    assert set(scored['Direction']) == {'UPSIDE', 'DOWNSIDE'}
+
+
+@pytest.mark.parametrize('signal_filter, direction_filter', list(itertools.product(SIGNALS, DIRECTIONS)))
+def test_view_matches_filter_results(scored, signal_filter, direction_filter):
+    view = ScanView(scored, signal_filter, direction_filter, top_n=10)
+    expected = filter_results(scored, signal_filter, direction_filter)
+    
+    assert_same_rows(view.df, expected)
+    assert_same_rows(view.table(), to_display(expected))
+    assert view.csv() == view.table().to_csv(index=False)
+    
+    assert view.stats == {
+        'total': len(scored),
+        'filtered': len(expected),
+        'active': int((expected['Signal'] == 'ACTIVE').sum()),
+        'avg_rfactor': pytest.approx(float(expected['R-Factor'].mean()) if len(expected) else 0.0),
+        'upside': int((expected['Direction'] == 'UPSIDE').sum()),
+        'downside': int((expected['Direction'] == 'DOWNSIDE').sum()),
+    }
+    
+    for direction in ('UPSIDE', 'DOWNSIDE'):
+        side = filter_results(scored, signal_filter, [d for d in direction_filter if d == direction])
+        assert_same_rows(view.top(direction), to_display(side.head(10)))
+
+
+def test_view_of_plain_string_columns(scored):
+    # A table built by hand or read back from CSV has plain strings instead of Categoricals
+    plain = scored.astype({'Signal': object, 'Direction': object})
+    view = ScanView(plain, ['ACTIVE'], ['UPSIDE', 'DOWNSIDE'])
+    assert_same_rows(view.df, filter_results(scored, ['ACTIVE'], ['UPSIDE', 'DOWNSIDE']))
+
+
+def test_view_of_empty_scan():
+    view = ScanView(pd.DataFrame(), ['ACTIVE'], ['UPSIDE'])
+    assert view.stats['total'] == view.stats['filtered'] == 0
+    assert view.stats['avg_rfactor'] == 0.0
+    assert view.top('UPSIDE').empty
+
+
+def test_top_positions_skips_nan_and_keeps_order():
+    values = np.array([3.0, np.nan, 7.0, 1.0, 7.0, 5.0])
+    assert top_positions(values, np.arange(6), 3).tolist() == [2, 4, 5]
+    assert top_positions(values, np.array([1, 3]), 5).tolist() == [3]
+
+
+def test_view_cache_reuses_views_per_frame(scored):
+    cache = ViewCache(size=2)
+    view = cache.get(scored, ['ACTIVE', 'WAIT'], ['UPSIDE'])
+    assert cache.get(scored, ['WAIT', 'ACTIVE'], ['UPSIDE']) is view
+    
+    # A new scan is a new frame - never served the old view
+    rescan = scored.copy()
+    assert cache.get(rescan, ['ACTIVE', 'WAIT'], ['UPSIDE']) is not view
+    
+    # Least recently used views are evicted past `size`
+    cache.get(scored, ['ACTIVE'], ['UPSIDE'])
+    assert cache.get(scored, ['ACTIVE', 'WAIT'], ['UPSIDE']) is not view